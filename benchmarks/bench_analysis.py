@@ -0,0 +1,59 @@
+"""Stress-test analysis speed at 10k and 100k generations.
+
+Mirrors the three modes of ``scripts/prompt_stress_test.py``: expanding and
+tokenizing every prompt, the NumPy batch sampler, and the exact analytic
+frequencies (whose cost does not depend on the generation count).
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+
+from fixtures import SEED, TEMPLATES, close_engine, load_engine
+from harness import SkipBenchmark, benchmark
+from wildcard_analysis import ExactFrequencies, extract_words
+
+TEMPLATE = TEMPLATES["outfit_all"]
+COUNTS = (10_000, 100_000)
+
+
+def sampled_counts(engine, template: str, n: int) -> Counter:
+    counts: Counter = Counter()
+    for prompt in engine.iter_generate(template, n):
+        counts.update(extract_words(prompt))
+    return counts
+
+
+def _batch_setup():
+    try:
+        from wildcard_sampling import BatchSampler
+    except ImportError as exc:
+        raise SkipBenchmark(f"numpy is not installed: {exc}") from exc
+    engine = load_engine()
+    return engine, BatchSampler(engine, seed=SEED)
+
+
+def _batch_teardown(state) -> None:
+    close_engine(state[0])
+
+
+def _register(n: int) -> None:
+    label = f"{n // 1000}k"
+
+    @benchmark(f"sampled_{label}", setup=load_engine, teardown=close_engine, number=1)
+    def sampled(engine) -> None:
+        engine.rng.seed(SEED)
+        sampled_counts(engine, TEMPLATE, n)
+
+    @benchmark(f"batch_{label}", setup=_batch_setup, teardown=_batch_teardown, number=1)
+    def batch(state) -> None:
+        state[1].word_counts(TEMPLATE, n)
+
+
+for _n in COUNTS:
+    _register(_n)
+
+
+@benchmark(setup=load_engine, teardown=close_engine, fresh=True)
+def exact(engine) -> None:
+    ExactFrequencies(engine).word_counts(TEMPLATE)
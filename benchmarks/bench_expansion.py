@@ -0,0 +1,45 @@
+"""Index compilation and template expansion throughput.
+
+Cold runs start from nothing: compiling the whole tree, or loading the
+snapshot into a new engine and expanding a first prompt with an empty parse
+cache. Warm runs expand 1,000 prompts on an engine that has already seen the
+template.
+"""
+
+from __future__ import annotations
+
+from fixtures import SEED, TEMPLATES, WILDCARDS_ROOT, close_engine, load_engine, snapshot_path
+from harness import benchmark
+from wildcard_engine import WildcardEngine, WildcardIndex
+
+WARM_COUNT = 1000
+
+
+@benchmark(fresh=True)
+def compile_tree(_):
+    WildcardIndex.compile(WILDCARDS_ROOT)
+
+
+@benchmark(setup=snapshot_path)
+def load_snapshot(path):
+    WildcardIndex.load(path)
+
+
+def _register(name: str, template: str) -> None:
+    def warm_setup() -> WildcardEngine:
+        engine = load_engine()
+        engine.generate(template, 10)
+        engine.rng.seed(SEED)
+        return engine
+
+    @benchmark(f"cold_{name}", setup=load_engine, teardown=close_engine, fresh=True)
+    def cold(engine: WildcardEngine) -> None:
+        engine.expand(template)
+
+    @benchmark(f"warm_{name}_x{WARM_COUNT}", setup=warm_setup, teardown=close_engine)
+    def warm(engine: WildcardEngine) -> None:
+        engine.generate(template, WARM_COUNT)
+
+
+for _name, _template in TEMPLATES.items():
+    _register(_name, _template)
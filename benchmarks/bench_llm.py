@@ -0,0 +1,90 @@
+"""Client-side overhead of the LLM-bound tools, against the local mock server.
+
+With zero server latency the timings are pure client cost: request building,
+HTTP over a pooled keep-alive connection, response parsing and caching. The
+``concurrent`` benchmark adds a fixed latency to show how well calls overlap.
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from fixtures import scratch_dir
+from harness import SkipBenchmark, benchmark
+from llm_cache import ResponseCache
+from mock_llm import MockLLMServer
+from openrouter_inference import OpenRouterClient
+
+MESSAGES = [
+    {"role": "system", "content": "Reply with one word."},
+    {"role": "user", "content": "Artist: Alphonse Mucha"},
+]
+CONCURRENT_LINES = 32
+CONCURRENT_LATENCY = 0.02
+
+
+@lru_cache(maxsize=None)
+def mock_server() -> MockLLMServer:
+    server = MockLLMServer().start()
+    atexit.register(server.stop)
+    return server
+
+
+def _server(latency: float = 0.0) -> MockLLMServer:
+    server = mock_server()
+    server.latency = latency
+    return server
+
+
+def _openrouter_setup() -> OpenRouterClient:
+    return OpenRouterClient("mock", base_url=f"{_server().url}/api/v1", pool_size=1)
+
+
+@benchmark(setup=_openrouter_setup, teardown=OpenRouterClient.close)
+def openrouter_chat_completion(client: OpenRouterClient) -> None:
+    client.chat_completion(model="mock", messages=MESSAGES, max_tokens=16)
+
+
+def _openai_setup(latency: float = 0.0):
+    try:
+        from text_transformer import create_client
+    except ImportError as exc:
+        raise SkipBenchmark(f"openai is not installed: {exc}") from exc
+    os.environ.setdefault("OPENAI_API_KEY", "mock")
+    return create_client(base_url=f"{_server(latency).url}/v1")
+
+
+@benchmark(setup=_openai_setup)
+def openai_transform_text(client) -> None:
+    from text_transformer import transform_text
+
+    transform_text("red dress", "Describe the costume.", "costume-xl", client=client, raise_errors=True)
+
+
+@benchmark(setup=lambda: _openai_setup(CONCURRENT_LATENCY), number=1)
+def concurrent_transform_text(client) -> None:
+    from text_transformer import transform_text
+
+    lines = [f"costume {i}" for i in range(CONCURRENT_LINES)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(
+            lambda line: transform_text(line, "Describe the costume.", "costume-xl",
+                                        client=client, raise_errors=True),
+            lines,
+        ))
+
+
+def _cache_setup() -> tuple[ResponseCache, str]:
+    cache = ResponseCache(scratch_dir() / "llm_cache")
+    key = ResponseCache.make_key(model="mock", system_prompt="Reply with one word.", user_prompt="Artist: x")
+    cache.put(key, {"status": "ok", "answer": "painter"})
+    return cache, key
+
+
+@benchmark(setup=_cache_setup)
+def response_cache_hit(state) -> None:
+    cache, key = state
+    cache.get(key)
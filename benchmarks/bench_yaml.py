@@ -0,0 +1,111 @@
+#!/usr/bin/env -S uv run --quiet
+# /// script
+# dependencies = [
+#   "pyyaml",
+# ]
+# ///
+"""Compare YAML load paths over the std/xl wildcard files.
+
+Times, per file and in total: the pure-Python ``SafeLoader`` (what the tools
+used before), libyaml's ``CSafeLoader``, and a cache hit through
+``wildcard_yaml.load_yaml_file``. Run directly for a per-file table (each
+figure the best of ``--repeat`` runs); ``benchmarks/run.py`` times the totals.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+from fixtures import PROJECT_ROOT, scratch_dir
+from harness import benchmark
+from wildcard_yaml import HAS_LIBYAML, load_yaml_file
+
+STD_XL = PROJECT_ROOT / "wildcards" / "std" / "xl"
+
+
+def _texts() -> list[str]:
+    return [path.read_text(encoding="utf-8") for path in sorted(STD_XL.glob("*.yaml"))]
+
+
+def _cached_setup() -> tuple[list[Path], Path]:
+    files = sorted(STD_XL.glob("*.yaml"))
+    cache_dir = scratch_dir() / "yaml"
+    for path in files:
+        load_yaml_file(path, cache_dir=cache_dir)
+    return files, cache_dir
+
+
+@benchmark(setup=_texts)
+def std_xl_pure_python(texts):
+    for text in texts:
+        yaml.load(text, Loader=yaml.SafeLoader)
+
+
+@benchmark(setup=lambda: sorted(STD_XL.glob("*.yaml")))
+def std_xl_libyaml(files):
+    for path in files:
+        load_yaml_file(path, use_cache=False)
+
+
+@benchmark(setup=_cached_setup)
+def std_xl_cache_hit(state):
+    files, cache_dir = state
+    for path in files:
+        load_yaml_file(path, cache_dir=cache_dir)
+
+
+def best_of(repeat: int, func) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark YAML loading of wildcard files.")
+    parser.add_argument("root", nargs="?", type=Path, default=STD_XL,
+                        help="Directory of YAML files (default: wildcards/std/xl)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (default: 5)")
+    args = parser.parse_args()
+
+    files = sorted(args.root.glob("*.yaml"))
+    if not files:
+        print(f"No YAML files in {args.root}", file=sys.stderr)
+        return 1
+    if not HAS_LIBYAML:
+        print("Note: PyYAML was built without libyaml; the C column uses the pure-Python loader.")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = Path(cache_dir)
+        totals = [0.0, 0.0, 0.0]
+        print(f"{'file':<28} {'lines':>6} {'python':>9} {'libyaml':>9} {'cached':>9}")
+        for path in files:
+            text = path.read_text(encoding="utf-8")
+            load_yaml_file(path, cache_dir=cache)  # warm the cache
+            timings = (
+                best_of(args.repeat, lambda: yaml.load(text, Loader=yaml.SafeLoader)),
+                best_of(args.repeat, lambda: load_yaml_file(path, use_cache=False)),
+                best_of(args.repeat, lambda: load_yaml_file(path, cache_dir=cache)),
+            )
+            totals = [total + t for total, t in zip(totals, timings)]
+            print(f"{path.name:<28} {text.count(chr(10)):>6} "
+                  + " ".join(f"{t * 1000:>7.2f}ms" for t in timings))
+
+    python, libyaml, cached = totals
+    print(f"{'total (' + str(len(files)) + ' files)':<35} "
+          + " ".join(f"{t * 1000:>7.2f}ms" for t in totals))
+    print(f"libyaml is {python / libyaml:.1f}x faster than pure Python; "
+          f"a cache hit is {python / cached:.1f}x faster")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
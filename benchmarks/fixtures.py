@@ -0,0 +1,66 @@
+"""Shared, reproducible fixtures for the benchmark suite.
+
+Everything is drawn from the real ``wildcards/`` tree. The wildcard index is
+compiled into a private snapshot, and large files get their line indexes,
+under a temporary directory, so benchmarks never read or rewrite the
+developer's ``.wc_cache``, and all sampling uses fixed seeds.
+"""
+
+from __future__ import annotations
+
+import atexit
+import shutil
+import sys
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+WILDCARDS_ROOT = PROJECT_ROOT / "wildcards"
+sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+
+from wildcard_engine import WildcardEngine, WildcardIndex  # noqa: E402
+
+SEED = 1234
+
+# Templates the suite expands, by short benchmark name
+TEMPLATES = {
+    "outfit_all": "__std/xl/outfit/all__",
+    "omni_std": "__std/xl/omni/templates/std__",
+    "artmix_t7_mixers": (
+        "(__ArtMix_T7/mixers/subject__:1.0) (__ArtMix_T7/mixers/feel__:1.1) "
+        "(__ArtMix_T7/mixers/flavor__:1.2) (__ArtMix_T7/mixers/entities__:1.3) "
+        "(__ArtMix_T7/mixers/flavor__:1.4)"
+    ),
+    "artmix_t8": "__ArtMix_T8/v/*__",
+}
+
+
+@lru_cache(maxsize=None)
+def scratch_dir() -> Path:
+    """A temporary directory removed when the run ends."""
+    path = Path(tempfile.mkdtemp(prefix="wc-bench-"))
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+
+@lru_cache(maxsize=None)
+def snapshot_path() -> Path:
+    """Compile the wildcard tree once into a private snapshot and return its path."""
+    path = scratch_dir() / "wildcards.index.pickle"
+    WildcardIndex.compile(WILDCARDS_ROOT).save(path)
+    return path
+
+
+def load_index() -> WildcardIndex:
+    index = WildcardIndex.load(snapshot_path())
+    index.line_index_dir = scratch_dir() / "lines"
+    return index
+
+
+def load_engine(seed: int = SEED) -> WildcardEngine:
+    return WildcardEngine(load_index(), seed=seed)
+
+
+def close_engine(engine: WildcardEngine) -> None:
+    engine.index.close()
@@ -0,0 +1,102 @@
+"""Minimal timeit-based benchmark harness.
+
+Benchmarks are plain functions registered with :func:`benchmark`. An optional
+``setup`` callable builds the state the function receives, so fixture cost
+stays out of the timings. Warm benchmarks are run in a loop sized by
+``timeit.Timer.autorange`` and reported per call; ``fresh=True`` benchmarks
+re-run ``setup`` before every single call, for cold-start measurements.
+"""
+
+from __future__ import annotations
+
+import gc
+import statistics
+import time
+import timeit
+from dataclasses import dataclass
+from typing import Any, Callable
+
+
+class SkipBenchmark(Exception):
+    """Raised by a setup function when a benchmark cannot run here."""
+
+
+@dataclass(slots=True)
+class Benchmark:
+    name: str
+    func: Callable[[Any], Any]
+    setup: Callable[[], Any] | None = None
+    teardown: Callable[[Any], None] | None = None
+    fresh: bool = False
+    number: int | None = None
+
+
+REGISTRY: dict[str, Benchmark] = {}
+
+
+def benchmark(
+    name: str | None = None,
+    *,
+    setup: Callable[[], Any] | None = None,
+    teardown: Callable[[Any], None] | None = None,
+    fresh: bool = False,
+    number: int | None = None,
+) -> Callable:
+    """Register ``func(state)`` as a benchmark named ``<module>.<name>``."""
+
+    def decorator(func: Callable[[Any], Any]) -> Callable[[Any], Any]:
+        module = func.__module__.removeprefix("bench_")
+        full_name = f"{module}.{name or func.__name__}"
+        if full_name in REGISTRY:
+            raise ValueError(f"Duplicate benchmark name: {full_name}")
+        REGISTRY[full_name] = Benchmark(full_name, func, setup, teardown, fresh, number)
+        return func
+
+    return decorator
+
+
+def _time_once(bench: Benchmark) -> float:
+    state = bench.setup() if bench.setup else None
+    try:
+        gc.collect()
+        started = time.perf_counter()
+        bench.func(state)
+        return time.perf_counter() - started
+    finally:
+        if bench.teardown:
+            bench.teardown(state)
+
+
+def measure(bench: Benchmark, *, repeat: int = 5, warmup: bool = True) -> dict[str, Any]:
+    """Time one benchmark, returning per-call statistics in seconds."""
+    if bench.fresh:
+        samples = [_time_once(bench) for _ in range(repeat)]
+        number = 1
+    else:
+        state = bench.setup() if bench.setup else None
+        try:
+            timer = timeit.Timer(lambda: bench.func(state))
+            if warmup:
+                timer.timeit(1)
+            number = bench.number or timer.autorange()[0]
+            samples = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+        finally:
+            if bench.teardown:
+                bench.teardown(state)
+
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "repeat": repeat,
+        "number": number,
+        "fresh": bench.fresh,
+    }
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g}{unit}"
+    return f"{seconds / 1e-9:.3g}ns"
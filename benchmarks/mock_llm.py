@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Local mock of the OpenAI / OpenRouter chat completions API.
+
+Answers ``POST .../chat/completions`` with a deterministic completion that
+echoes the last line of the prompt, after an optional fixed latency. It keeps
+connections alive like the real services and can inject 429 responses with a
+Retry-After header to exercise retry paths. Run it standalone to point the
+LLM tools at it::
+
+    python benchmarks/mock_llm.py --port 8765 --latency 0.2
+    python scripts/text_transformer.py ... --base-url http://127.0.0.1:8765/v1
+    OPENROUTER_BASE_URL=http://127.0.0.1:8765/api/v1 python scripts/check_artists.py ...
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY, Nagle
+    # plus the client's delayed ACK would add ~40ms to every response
+    disable_nagle_algorithm = True
+    server: "_Server"
+
+    def log_message(self, format, *args):  # noqa: A002 - signature from BaseHTTPRequestHandler
+        pass
+
+    def _send(self, status: int, payload: dict, headers: dict[str, str] | None = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):  # noqa: N802 - name from BaseHTTPRequestHandler
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        mock = self.server.mock
+        with mock.lock:
+            mock.requests += 1
+            fail = mock.rng.random() < mock.error_rate
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send(404, {"error": {"message": f"unknown endpoint {self.path}"}})
+            return
+        if fail:
+            self._send(429, {"error": {"message": "rate limited"}}, {"Retry-After": "0"})
+            return
+        if mock.latency:
+            time.sleep(mock.latency)
+
+        messages = request.get("messages") or [{"content": ""}]
+        last_line = str(messages[-1].get("content", "")).strip().splitlines()[-1:] or [""]
+        content = f"mock: {last_line[0]}"
+        # Rough usage (~4 characters per token) so token accounting has something to count
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in messages) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+        self._send(200, {
+            "id": f"mock-{mock.requests}",
+            "object": "chat.completion",
+            "created": 0,
+            "model": request.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "completion_tokens_details": {"reasoning_tokens": 0},
+            },
+        })
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    mock: "MockLLMServer"
+
+
+class MockLLMServer:
+    """Mock completions server on a background thread; use as a context manager."""
+
+    def __init__(self, *, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 0) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self._server = _Server((host, port), _Handler)
+        self._server.mock = self
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        """Serve on the calling thread until interrupted."""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run a mock OpenAI/OpenRouter chat completions server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before each answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    args = parser.parse_args()
+
+    server = MockLLMServer(host=args.host, port=args.port, latency=args.latency, error_rate=args.error_rate)
+    print(f"Mock LLM server on {server.url} (OpenAI: {server.url}/v1, OpenRouter: {server.url}/api/v1)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
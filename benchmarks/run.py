@@ -0,0 +1,170 @@
+#!/usr/bin/env -S uv run --quiet
+# /// script
+# dependencies = [
+#   "numpy",
+#   "openai",
+#   "pyyaml",
+# ]
+# ///
+"""Run the benchmark suite and store the results as JSON, one file per commit.
+
+Every ``bench_*.py`` module next to this script is imported and its registered
+benchmarks are timed. Results are written to
+``.wc_cache/benchmarks/<commit>.json`` (``<commit>-dirty`` for uncommitted
+trees) unless ``--output`` is given. ``--compare`` reads an earlier results
+file, or the results for a commit, and flags benchmarks that got slower than
+``--threshold``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+RESULTS_DIR = PROJECT_ROOT / ".wc_cache" / "benchmarks"
+
+from harness import REGISTRY, SkipBenchmark, format_seconds, measure  # noqa: E402
+
+
+def git_commit() -> tuple[str | None, bool]:
+    """Return the short HEAD commit and whether the working tree has changes."""
+    def git(*args: str) -> str:
+        return subprocess.run(["git", *args], cwd=PROJECT_ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+
+    try:
+        commit = git("rev-parse", "--short", "HEAD")
+        dirty = bool(git("status", "--porcelain", "--untracked-files=no"))
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit, dirty
+
+
+def load_suites(names: list[str] | None) -> None:
+    for path in sorted(BENCH_DIR.glob("bench_*.py")):
+        suite = path.stem.removeprefix("bench_")
+        if names and suite not in names:
+            continue
+        importlib.import_module(path.stem)
+
+
+def resolve_baseline(ref: str) -> Path:
+    path = Path(ref)
+    if path.exists():
+        return path
+    exact = RESULTS_DIR / f"{ref}.json"
+    if exact.exists():
+        return exact
+    # A prefix may match both runs of a commit; prefer the clean one over "-dirty"
+    matches = sorted(RESULTS_DIR.glob(f"{ref}*.json"), key=lambda p: (p.stem.endswith("-dirty"), p.name))
+    if not matches:
+        raise FileNotFoundError(f"No results file or stored commit matching '{ref}'")
+    return matches[0]
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print a comparison table and return the names of regressed benchmarks."""
+    regressions = []
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} (threshold {threshold:.0%}):")
+    for name, current in results["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if not previous or "min" not in current or "min" not in previous:
+            continue
+        ratio = current["min"] / previous["min"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  SLOWER"
+            regressions.append(name)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"  {name:<48} {format_seconds(previous['min']):>9} -> {format_seconds(current['min']):>9}"
+              f"  {ratio:5.2f}x{flag}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run the wildcard toolchain benchmarks.")
+    parser.add_argument("suites", nargs="*", help="Suites to run, e.g. expansion yaml (default: all)")
+    parser.add_argument("-k", "--filter", help="Only run benchmarks whose name matches this glob")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repeats per benchmark (default: 5)")
+    parser.add_argument("-o", "--output", type=Path, help="Results file (default: .wc_cache/benchmarks/<commit>.json)")
+    parser.add_argument("--compare", metavar="RESULTS", help="Results file or commit to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative slowdown reported as a regression (default: 0.10)")
+    parser.add_argument("--list", action="store_true", help="List benchmarks without running them")
+    args = parser.parse_args()
+
+    load_suites(args.suites)
+    selected = [bench for name, bench in REGISTRY.items()
+                if not args.filter or fnmatch.fnmatchcase(name, args.filter)
+                or fnmatch.fnmatchcase(name, f"*{args.filter}*")]
+    if args.list:
+        for bench in selected:
+            print(bench.name)
+        return 0
+    if not selected:
+        print("No benchmarks selected", file=sys.stderr)
+        return 1
+
+    baseline = None
+    if args.compare:
+        with open(resolve_baseline(args.compare), "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    commit, dirty = git_commit()
+    results = {
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "benchmarks": {},
+    }
+
+    for bench in selected:
+        try:
+            stats = measure(bench, repeat=args.repeat)
+        except SkipBenchmark as exc:
+            results["benchmarks"][bench.name] = {"skipped": str(exc)}
+            print(f"{bench.name:<50} skipped: {exc}")
+            continue
+        results["benchmarks"][bench.name] = stats
+        print(f"{bench.name:<50} {format_seconds(stats['min']):>9} min "
+              f"{format_seconds(stats['median']):>9} median  (x{stats['number']}, {stats['repeat']} runs)",
+              flush=True)
+
+    output = args.output
+    if output is None:
+        output = RESULTS_DIR / f"{commit or 'unknown'}{'-dirty' if dirty else ''}.json"
+    # A partial run updates its benchmarks and keeps the rest of the file
+    stored = dict(results, benchmarks=dict(results["benchmarks"]))
+    try:
+        with open(output, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        if previous.get("commit") == commit:
+            stored["benchmarks"] = {**previous.get("benchmarks", {}), **results["benchmarks"]}
+    except (OSError, ValueError):
+        pass
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(stored, f, indent=2)
+    print(f"\nResults saved to: {output}")
+
+    if baseline is not None and compare(results, baseline, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -9,11 +9,19 @@ import argparse
 import json
 import re
 import sys
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone
 from pathlib import Path
 
-from openrouter_inference import OpenRouterClient, extract_message_text
+from checkpoint import CheckpointJournal, journal_path_for
+from llm_cache import ResponseCache
+from llm_telemetry import Telemetry
+from openrouter_inference import (
+    OpenRouterClient,
+    RateLimiter,
+    call_with_retries,
+    extract_message_text,
+)
 
 
 SYSTEM_PROMPT = (
@@ -66,6 +74,83 @@ def load_existing_results(path: Path) -> dict[str, dict]:
     return existing
 
 
+def check_artist(
+    artist: str,
+    *,
+    client: OpenRouterClient,
+    cache: ResponseCache,
+    limiter: RateLimiter,
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    max_retries: int,
+    telemetry: Telemetry | None = None,
+    source: str | None = None,
+) -> dict:
+    """Query one artist, retrying transient failures; never raises.
+
+    With ``telemetry``, the call is traced as a ``check_artist`` span of ``source``.
+    """
+    user_prompt = USER_PROMPT_TEMPLATE.format(artist=artist)
+    checked_at = utc_now_iso()
+    cache_key = ResponseCache.make_key(
+        model=model,
+        system_prompt=SYSTEM_PROMPT,
+        user_prompt=user_prompt,
+        temperature=temperature,
+        max_tokens=max_tokens,
+    )
+
+    if telemetry is None:
+        telemetry = Telemetry("check_artists", enabled=False)
+    try:
+        with telemetry.span("check_artist", model=model, file=source) as span:
+            response = cache.get(cache_key)
+            retries = 0
+            span.cache_hit = response is not None
+            if response is None:
+                (response, timing), retries = call_with_retries(
+                    lambda: client.chat_completion_timed(
+                        model=model,
+                        messages=[
+                            {"role": "system", "content": SYSTEM_PROMPT},
+                            {"role": "user", "content": user_prompt},
+                        ],
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                    ),
+                    max_retries=max_retries,
+                    limiter=limiter,
+                )
+                span.retries = retries
+                span.ttfb = timing.ttfb
+                span.record_usage(response)
+                cache.put(cache_key, response)
+        text = extract_message_text(response)
+        normalized_text = " ".join(text.split())
+        recognized = bool(normalized_text) and not is_unrecognized(normalized_text)
+        return {
+            "artist": artist,
+            "status": "ok",
+            "recognized": recognized,
+            "response": normalized_text,
+            "checked_at": checked_at,
+            "model": model,
+            "retries": retries,
+        }
+    except Exception as exc:  # noqa: BLE001 - include all request/runtime errors
+        return {
+            "artist": artist,
+            "status": "error",
+            "recognized": False,
+            "response": "",
+            "error": str(exc),
+            "checked_at": checked_at,
+            "model": model,
+            "retries": getattr(exc, "retries", 0),
+        }
+
+
 def main() -> int:
     parser = argparse.ArgumentParser(
         description="Check which artists are recognized by an OpenRouter model."
@@ -99,11 +184,29 @@ def main() -> int:
         default=80,
         help="Max completion tokens per artist (default: 80)",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Maximum requests in flight (default: 4)",
+    )
+    parser.add_argument(
+        "--rps",
+        type=float,
+        default=5.0,
+        help="Maximum requests started per second; 0 disables the limit (default: 5)",
+    )
+    parser.add_argument(
+        "--max-retries",
+        type=int,
+        default=4,
+        help="Retries with exponential backoff on 429/5xx and network errors (default: 4)",
+    )
     parser.add_argument(
         "--sleep-seconds",
         type=float,
-        default=0.2,
-        help="Delay between API calls in seconds (default: 0.2)",
+        default=None,
+        help="Deprecated: minimum delay between request starts; overrides --rps",
     )
     parser.add_argument(
         "--timeout",
@@ -114,10 +217,31 @@ def main() -> int:
     parser.add_argument(
         "--resume",
         action="store_true",
-        help="Resume from existing output file entries.",
+        help="Resume from the checkpoint journal and existing output file entries; errored artists are retried.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Disable the shared LLM response cache (.llm_cache)",
+    )
+    parser.add_argument(
+        "--trace",
+        type=Path,
+        help="LLM call trace file (default: .wc_cache/llm_traces.jsonl)",
+    )
+    parser.add_argument(
+        "--no-trace",
+        action="store_true",
+        help="Don't record LLM call traces",
     )
     args = parser.parse_args()
 
+    if args.concurrency < 1:
+        print("Error: --concurrency must be at least 1", file=sys.stderr)
+        return 1
+    if args.sleep_seconds is not None:
+        args.rps = 1 / args.sleep_seconds if args.sleep_seconds > 0 else 0.0
+
     if not args.artists_file.exists():
         print(f"Error: artists file not found: {args.artists_file}", file=sys.stderr)
         return 1
@@ -130,80 +254,68 @@ def main() -> int:
     existing = load_existing_results(args.output) if args.resume else {}
 
     try:
-        client = OpenRouterClient.from_env(timeout=args.timeout)
+        client = OpenRouterClient.from_env(timeout=args.timeout, pool_size=args.concurrency)
     except ValueError as exc:
         print(f"Error: {exc}", file=sys.stderr)
         print("Set OPENROUTER_API_KEY before running this script.", file=sys.stderr)
         return 1
 
-    results: list[dict] = []
-    recognized_count = 0
-    unrecognized_count = 0
-    error_count = 0
-
-    for idx, artist in enumerate(artists, start=1):
-        if artist in existing:
-            entry = existing[artist]
-            results.append(entry)
-            status = entry.get("status")
-            if status == "ok":
-                if entry.get("recognized"):
-                    recognized_count += 1
-                else:
-                    unrecognized_count += 1
-            elif status == "error":
-                error_count += 1
-            print(f"[{idx}/{len(artists)}] {artist}: reused existing result")
-            continue
-
-        print(f"[{idx}/{len(artists)}] {artist}: querying {args.model}...")
-        user_prompt = USER_PROMPT_TEMPLATE.format(artist=artist)
-        checked_at = utc_now_iso()
-
+    # Each result is journaled as soon as it is known, so a crash loses at most
+    # the artists in flight. Journal entries win over the older output file.
+    journal = CheckpointJournal(journal_path_for(args.output), resume=args.resume)
+    for entry in journal.entries.values():
+        existing[entry["artist"]] = entry
+    existing = {artist: entry for artist, entry in existing.items() if entry.get("status") == "ok"}
+
+    cache = ResponseCache(enabled=not args.no_cache)
+    telemetry = Telemetry("check_artists", args.trace, enabled=not args.no_trace)
+    limiter = RateLimiter(args.rps, burst=args.concurrency, max_in_flight=args.concurrency)
+    pending = [artist for artist in dict.fromkeys(artists) if artist not in existing]
+    reused = len(set(artists)) - len(pending)
+    if reused:
+        print(f"Reusing {reused} existing results")
+
+    def check_and_record(artist: str) -> dict:
+        entry = check_artist(
+            artist,
+            client=client,
+            cache=cache,
+            limiter=limiter,
+            model=args.model,
+            temperature=args.temperature,
+            max_tokens=args.max_tokens,
+            max_retries=args.max_retries,
+            telemetry=telemetry,
+            source=str(args.artists_file),
+        )
+        # Journaled by the worker itself, so a result is kept even if the
+        # main thread is interrupted before it gets to it
+        journal.record(CheckpointJournal.key(artist), entry)
+        return entry
+
+    checked: dict[str, dict] = {}
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = {executor.submit(check_and_record, artist): artist for artist in pending}
         try:
-            response = client.chat_completion(
-                model=args.model,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": user_prompt},
-                ],
-                temperature=args.temperature,
-                max_tokens=args.max_tokens,
-            )
-            text = extract_message_text(response)
-            normalized_text = " ".join(text.split())
-            recognized = bool(normalized_text) and not is_unrecognized(normalized_text)
-            status = "ok"
-            if recognized:
-                recognized_count += 1
-            else:
-                unrecognized_count += 1
-
-            entry = {
-                "artist": artist,
-                "status": status,
-                "recognized": recognized,
-                "response": normalized_text,
-                "checked_at": checked_at,
-                "model": args.model,
-            }
-        except Exception as exc:  # noqa: BLE001 - include all request/runtime errors
-            error_count += 1
-            entry = {
-                "artist": artist,
-                "status": "error",
-                "recognized": False,
-                "response": "",
-                "error": str(exc),
-                "checked_at": checked_at,
-                "model": args.model,
-            }
-            print(f"  Error: {exc}", file=sys.stderr)
-
-        results.append(entry)
-
-        if args.sleep_seconds > 0:
-            time.sleep(args.sleep_seconds)
+            for done, future in enumerate(as_completed(futures), start=1):
+                entry = future.result()
+                artist = entry["artist"]
+                checked[artist] = entry
+                if entry["status"] == "ok":
+                    outcome = "recognized" if entry["recognized"] else "unrecognized"
+                    print(f"[{done}/{len(pending)}] {artist}: {outcome}")
+                else:
+                    print(f"[{done}/{len(pending)}] {artist}: error: {entry['error']}", file=sys.stderr)
+        except KeyboardInterrupt:
+            # Drop queued artists but let in-flight ones finish and journal
+            executor.shutdown(cancel_futures=True)
+            print(f"\nInterrupted; rerun with --resume to continue ({journal.path})", file=sys.stderr)
+            raise
+
+    results = [existing.get(artist) or checked[artist] for artist in artists]
+    recognized_count = sum(1 for entry in results if entry["status"] == "ok" and entry["recognized"])
+    unrecognized_count = sum(1 for entry in results if entry["status"] == "ok" and not entry["recognized"])
+    error_count = sum(1 for entry in results if entry["status"] == "error")
 
     args.output.parent.mkdir(parents=True, exist_ok=True)
     payload = {
@@ -224,6 +336,7 @@ def main() -> int:
     }
 
     args.output.write_text(json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    journal.discard()
 
     print("\nDone.")
     print(f"Wrote: {args.output}")
@@ -233,6 +346,7 @@ def main() -> int:
         f"unrecognized={unrecognized_count}, "
         f"errors={error_count}"
     )
+    print(cache.stats.summary())
     return 0
 
 
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Append-only JSONL checkpoint journals for resumable batch jobs.
+
+Each completed item is written as one JSON line keyed by a hash of its input
+and flushed to disk immediately, so a crashed or rate-limited run can resume
+without repeating finished work. A torn final line from a crash is ignored on
+load.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any
+
+
+def journal_path_for(output_path: Path) -> Path:
+    """Return the journal path that sits next to a job's output file."""
+    output_path = Path(output_path)
+    return output_path.with_name(f"{output_path.name}.journal.jsonl")
+
+
+class CheckpointJournal:
+    """Thread-safe append-only journal of completed items keyed by input hash."""
+
+    def __init__(self, path: Path, *, resume: bool = True) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.entries: dict[str, Any] = self._load() if resume else {}
+        # A resumed journal is opened on its first record, so runs that never
+        # record anything (dry runs) leave no file behind; a fresh one is
+        # truncated now so an interrupted run can't resume from stale entries.
+        self._file = None if resume else self._open("w")
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        """Hash the input (and anything else that shapes its result) into a key."""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _load(self) -> dict[str, Any]:
+        entries: dict[str, Any] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(record, dict) and "key" in record:
+                        entries[record["key"]] = record.get("value")
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _open(self, mode: str):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        return open(self.path, mode, encoding="utf-8")
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.entries.get(key, default)
+
+    def record(self, key: str, value: Any) -> None:
+        """Append one completed item and flush it to disk."""
+        line = json.dumps({"key": key, "value": value}, ensure_ascii=False)
+        with self._lock:
+            self.entries[key] = value
+            if self._file is None:
+                self._file = self._open("a")
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None and not self._file.closed:
+                self._file.close()
+
+    def discard(self) -> None:
+        """Close and delete the journal once its job has written final output."""
+        self.close()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self) -> "CheckpointJournal":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Persistent duplicate-entry indexes for appending to wildcard files.
+
+A :class:`DedupIndex` holds short hashes of a wildcard file's normalized
+entries. It is built by reading the file once, then kept up to date as entries
+are appended, so a batch of appends costs O(new entries) instead of a full
+re-read per append. Indexes are pickled under ``.wc_cache/dedup/`` with the
+file's mtime and size and are rebuilt whenever the file changed underneath
+them.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import re
+from pathlib import Path
+from typing import Iterable
+
+_PUNCT_RE = re.compile(r"[^\w\s]+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_entry(entry: str, loose: bool = False) -> str:
+    """Return the form entries are compared in.
+
+    Strict mode only strips surrounding whitespace, matching a plain line
+    comparison. Loose mode also ignores case, punctuation and runs of
+    whitespace, so ``"Red dress,"`` and ``"red  dress"`` are duplicates.
+    """
+    entry = entry.strip()
+    if loose:
+        entry = _SPACE_RE.sub(" ", _PUNCT_RE.sub(" ", entry.casefold())).strip()
+    return entry
+
+
+def entry_hash(normalized: str) -> bytes:
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest()
+
+
+def default_index_dir() -> Path:
+    return Path(__file__).resolve().parent.parent / ".wc_cache" / "dedup"
+
+
+class DedupIndex:
+    """Hashes of one wildcard file's entries, kept in sync with appends."""
+
+    VERSION = 1
+
+    def __init__(self, file_path: Path, index_path: Path, *, loose: bool = False) -> None:
+        self.file_path = Path(file_path)
+        self.index_path = Path(index_path)
+        self.loose = loose
+        self.hashes: set[bytes] = set()
+        self._stamp: tuple[int, int] | None = None
+        self._dirty = False
+        self._load()
+
+    def _file_stamp(self) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(self.file_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self) -> None:
+        stamp = self._file_stamp()
+        try:
+            with open(self.index_path, "rb") as f:
+                data = pickle.load(f)
+            if (data.get("version") == self.VERSION and data.get("loose") == self.loose
+                    and data.get("stamp") == stamp):
+                self.hashes = data["hashes"]
+                self._stamp = stamp
+                return
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError, TypeError):
+            pass
+        self._rebuild(stamp)
+
+    def _rebuild(self, stamp: tuple[int, int] | None) -> None:
+        self.hashes = set()
+        if stamp is not None:
+            with open(self.file_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    normalized = normalize_entry(line, self.loose)
+                    if normalized:
+                        self.hashes.add(entry_hash(normalized))
+        self._stamp = stamp
+        self._dirty = True
+
+    def _refresh(self) -> None:
+        """Rebuild if the file was modified by someone else since it was indexed."""
+        stamp = self._file_stamp()
+        if stamp != self._stamp:
+            self._rebuild(stamp)
+
+    def __contains__(self, entry: str) -> bool:
+        return entry_hash(normalize_entry(entry, self.loose)) in self.hashes
+
+    def filter_new(self, entries: Iterable[str]) -> list[str]:
+        """Return the entries not yet in the file, also dropping repeats among them."""
+        self._refresh()
+        seen: set[bytes] = set()
+        new_entries = []
+        for entry in entries:
+            normalized = normalize_entry(entry, self.loose)
+            if not normalized:
+                continue
+            digest = entry_hash(normalized)
+            if digest in self.hashes or digest in seen:
+                continue
+            seen.add(digest)
+            new_entries.append(entry.strip())
+        return new_entries
+
+    def append(self, entries: Iterable[str]) -> list[str]:
+        """Append the new entries to the file and return the ones written."""
+        new_entries = self.filter_new(entries)
+        if not new_entries:
+            return []
+
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+        # Never glue the first entry onto a last line that lacks its newline
+        needs_newline = False
+        if self._stamp is not None and self._stamp[1] > 0:
+            with open(self.file_path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        with open(self.file_path, "a", encoding="utf-8") as f:
+            if needs_newline:
+                f.write("\n")
+            for entry in new_entries:
+                f.write(f"{entry}\n")
+
+        for entry in new_entries:
+            self.hashes.add(entry_hash(normalize_entry(entry, self.loose)))
+        self._stamp = self._file_stamp()
+        self._dirty = True
+        return new_entries
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_name(f"{self.index_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                {"version": self.VERSION, "loose": self.loose, "stamp": self._stamp, "hashes": self.hashes},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
+
+
+class DedupIndexes:
+    """Per-file :class:`DedupIndex` objects shared across a batch of appends."""
+
+    def __init__(self, index_dir: Path | None = None, *, loose: bool = False) -> None:
+        self.index_dir = Path(index_dir) if index_dir else default_index_dir()
+        self.loose = loose
+        self._indexes: dict[Path, DedupIndex] = {}
+
+    def index_path(self, file_path: Path) -> Path:
+        resolved = Path(file_path).resolve()
+        key = hashlib.sha1(str(resolved).encode("utf-8")).hexdigest()[:16]
+        mode = "loose" if self.loose else "strict"
+        return self.index_dir / f"{resolved.stem}-{key}-{mode}.pickle"
+
+    def get(self, file_path: Path) -> DedupIndex:
+        file_path = Path(file_path)
+        index = self._indexes.get(file_path)
+        if index is None:
+            index = DedupIndex(file_path, self.index_path(file_path), loose=self.loose)
+            self._indexes[file_path] = index
+        return index
+
+    def save(self) -> None:
+        for index in self._indexes.values():
+            index.save()
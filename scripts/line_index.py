@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Memory-mapped random access to the entries of large txt wildcard files.
+
+A sidecar ``.lidx`` file stores the byte offsets of every entry (non-blank,
+non-comment line) as a packed uint32/uint64 array; repeated entries are
+indexed once, at their first occurrence. Both the text file and the
+sidecar are mmapped, so picking entry N costs one slice and one decode no
+matter how large the file is. The sidecar records the source file's mtime and
+size and is rebuilt whenever either changes.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+from array import array
+from pathlib import Path
+from typing import Iterator, Sequence
+
+MAGIC = b"WCLIDX2\0"
+# magic, source mtime_ns, source size, entry count, typecode (+ padding to 8 bytes)
+HEADER = struct.Struct("<8sQQQ1s7x")
+
+
+def build_line_index(text_path: Path, index_path: Path) -> None:
+    """Scan ``text_path`` and write its entry offsets to ``index_path``."""
+    stat = os.stat(text_path)
+    typecode = "I" if stat.st_size < 2**32 else "Q"
+    starts = array(typecode)
+    ends = array(typecode)
+
+    with open(text_path, "rb") as f:
+        data = f.read()
+    pos = 0
+    size = len(data)
+    seen: set[bytes] = set()
+    while pos < size:
+        newline = data.find(b"\n", pos)
+        line_end = size if newline == -1 else newline
+        start, end = pos, line_end
+        while start < end and data[start] in b" \t\r\f\v":
+            start += 1
+        while end > start and data[end - 1] in b" \t\r\f\v":
+            end -= 1
+        if start < end and data[start] != ord("#"):
+            entry = data[start:end]
+            if entry not in seen:
+                seen.add(entry)
+                starts.append(start)
+                ends.append(end)
+        pos = line_end + 1
+
+    index_path = Path(index_path)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, stat.st_mtime_ns, stat.st_size, len(starts), typecode.encode()))
+        starts.tofile(f)
+        ends.tofile(f)
+    os.replace(tmp_path, index_path)
+
+
+def _read_header(index_path: Path) -> tuple[int, int, int, str] | None:
+    try:
+        with open(index_path, "rb") as f:
+            raw = f.read(HEADER.size)
+    except OSError:
+        return None
+    if len(raw) != HEADER.size:
+        return None
+    magic, mtime_ns, size, count, typecode = HEADER.unpack(raw)
+    if magic != MAGIC:
+        return None
+    return mtime_ns, size, count, typecode.decode()
+
+
+def ensure_line_index(text_path: Path, index_path: Path) -> None:
+    """Build or rebuild the sidecar if it is missing or its stamp is stale."""
+    stat = os.stat(text_path)
+    header = _read_header(index_path)
+    if header is None or header[0] != stat.st_mtime_ns or header[1] != stat.st_size:
+        build_line_index(text_path, index_path)
+
+
+class LineIndex(Sequence[str]):
+    """Read-only sequence of a txt wildcard file's entries, served from mmap."""
+
+    def __init__(self, text_path: Path, index_path: Path) -> None:
+        self.text_path = Path(text_path)
+        self.index_path = Path(index_path)
+        ensure_line_index(self.text_path, self.index_path)
+
+        header = _read_header(self.index_path)
+        if header is None:
+            raise ValueError(f"Corrupt line index: {self.index_path}")
+        _, size, self._count, typecode = header
+
+        self._index_file = open(self.index_path, "rb")
+        self._index_map = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        width = struct.calcsize(typecode)
+        self._offsets = memoryview(self._index_map)[HEADER.size:]
+        self._starts = self._offsets[: self._count * width].cast(typecode)
+        self._ends = self._offsets[self._count * width: 2 * self._count * width].cast(typecode)
+
+        self._text_file = open(self.text_path, "rb")
+        # mmap refuses zero-length files; an empty file simply has no entries.
+        self._text_map = mmap.mmap(self._text_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._count))]
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("line index out of range")
+        return self._text_map[self._starts[i]:self._ends[i]].decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._count):
+            yield self[i]
+
+    def close(self) -> None:
+        self._starts.release()
+        self._ends.release()
+        self._offsets.release()
+        self._index_map.close()
+        self._index_file.close()
+        if isinstance(self._text_map, mmap.mmap):
+            self._text_map.close()
+        self._text_file.close()
+
+    def __enter__(self) -> "LineIndex":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
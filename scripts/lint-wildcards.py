@@ -1,83 +1,253 @@
 #!/usr/bin/env -S uv run --quiet --with yamllint
 # /// script
 # dependencies = [
+#   "pyyaml",
 #   "yamllint",
 # ]
 # ///
 """
-YAML Linter for Wildcard Files
-Lints all YAML files in the wildcards/std/xl directory
+Linter for Wildcard Files
+Lints every YAML and txt wildcard file under wildcards/ in parallel.
+
+YAML files are checked with yamllint (loaded as a library, using .yamllint)
+and every value in YAML and txt files is checked for wildcard syntax problems
+such as unbalanced braces or unterminated __references__. Results are cached
+by file content hash in .wc_cache/lint-cache.json, so unchanged files are not
+re-linted; it keeps only the files of the latest run.
 """
 
-import subprocess
-import sys
+import argparse
+import hashlib
+import json
 import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-def lint_wildcards():
-    """Lint all YAML wildcard files in std/xl directory"""
-    
-    # Path to wildcard directory
-    wildcard_dir = Path("wildcards/std/xl")
-    
-    if not wildcard_dir.exists():
-        print(f"Error: Directory {wildcard_dir} not found!")
+import yaml
+
+try:
+    from yamllint import linter
+    from yamllint.config import YamlLintConfig
+except ImportError:
+    linter = YamlLintConfig = None
+
+# Bump when checks change so cached results are invalidated
+CHECKER_VERSION = "1"
+WILDCARD_SUFFIXES = {".txt", ".yaml", ".yml"}
+REFERENCE_RE = re.compile(r"__[^\s{}|$]+?__")
+
+_config = None
+
+
+def _init_worker(config_text):
+    global _config
+    if YamlLintConfig is not None:
+        _config = YamlLintConfig(config_text)
+
+
+def check_value(text):
+    """Return wildcard syntax problems in one value as a list of messages."""
+    problems = []
+    depth = 0
+    for char in text:
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth < 0:
+                problems.append("unbalanced braces: '}' without matching '{'")
+                depth = 0
+    if depth > 0:
+        problems.append(f"unbalanced braces: {depth} unclosed '{{'")
+    if "__" in REFERENCE_RE.sub("", text):
+        problems.append("unterminated __wildcard__ reference")
+    return problems
+
+
+def _problem(line, column, level, rule, message):
+    return {"line": line, "column": column, "level": level, "rule": rule, "message": message}
+
+
+def _check_yaml_values(content):
+    """Check every string scalar of a YAML document, keeping its line number."""
+    problems = []
+    try:
+        stack = [yaml.compose(content, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))]
+    except yaml.YAMLError:
+        return problems  # yamllint already reports syntax errors
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        if isinstance(node, yaml.ScalarNode):
+            if isinstance(node.value, str):
+                for message in check_value(node.value):
+                    problems.append(_problem(node.start_mark.line + 1, node.start_mark.column + 1,
+                                             "error", "wildcard-syntax", message))
+        elif isinstance(node, yaml.SequenceNode):
+            stack.extend(node.value)
+        elif isinstance(node, yaml.MappingNode):
+            stack.extend(value for _, value in node.value)
+    return problems
+
+
+def _check_txt_values(content):
+    problems = []
+    for number, line in enumerate(content.splitlines(), 1):
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        for message in check_value(stripped):
+            problems.append(_problem(number, 1, "error", "wildcard-syntax", message))
+    return problems
+
+
+def lint_file(path):
+    """Lint one file, returning its list of problems."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+    except UnicodeDecodeError as e:
+        return [_problem(1, 1, "error", "encoding", f"not valid UTF-8: {e}")]
+
+    if Path(path).suffix.lower() == ".txt":
+        return _check_txt_values(content)
+
+    problems = []
+    if _config is not None:
+        for p in linter.run(content, _config, path):
+            problems.append(_problem(p.line, p.column, p.level, p.rule or "syntax", p.desc))
+    problems.extend(_check_yaml_values(content))
+    problems.sort(key=lambda p: (p["line"], p["column"]))
+    return problems
+
+
+def discover_files(paths):
+    files = []
+    for path in paths:
+        path = Path(path)
+        if path.is_file():
+            files.append(path)
+        elif path.is_dir():
+            for root, _, names in os.walk(path):
+                for name in names:
+                    if os.path.splitext(name)[1].lower() in WILDCARD_SUFFIXES:
+                        files.append(Path(root) / name)
+        else:
+            print(f"Warning: Path not found: {path}", file=sys.stderr)
+    return sorted(set(files))
+
+
+def load_cache(cache_path):
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache_path, cache):
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, cache_path)
+
+
+def lint_wildcards(paths, config_path, jobs, use_cache=True):
+    """Lint files in parallel, returning ``{path: problems}`` and the number linted fresh."""
+    files = discover_files(paths)
+    config_text = Path(config_path).read_text(encoding="utf-8") if Path(config_path).exists() else "extends: default"
+    salt = hashlib.sha256(f"{CHECKER_VERSION}\0{config_text}".encode("utf-8")).hexdigest()
+
+    cache_path = Path(__file__).resolve().parent.parent / ".wc_cache" / "lint-cache.json"
+    cache = load_cache(cache_path) if use_cache else {}
+
+    results = {}
+    digests = {}
+    pending = []
+    for path in files:
+        digest = hashlib.sha256(salt.encode("utf-8") + path.read_bytes()).hexdigest()
+        digests[path] = digest
+        if digest in cache:
+            results[path] = cache[digest]
+        else:
+            pending.append(path)
+
+    if pending:
+        if jobs > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(config_text,)) as pool:
+                chunksize = max(1, len(pending) // (jobs * 4))
+                for path, problems in zip(pending, pool.map(lint_file, map(str, pending), chunksize=chunksize)):
+                    results[path] = problems
+        else:
+            _init_worker(config_text)
+            for path in pending:
+                results[path] = lint_file(str(path))
+
+    # Keep only this run's files, so results for edited or deleted files don't pile up
+    if use_cache and (pending or len(cache) != len(set(digests.values()))):
+        save_cache(cache_path, {digests[path]: results[path] for path in files})
+
+    return {path: results[path] for path in files}, len(pending)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lint YAML and txt wildcard files.")
+    parser.add_argument("paths", nargs="*", default=["wildcards"],
+                        help="Files or directories to lint (default: wildcards)")
+    parser.add_argument("-c", "--config", default=".yamllint", help="yamllint config file (default: .yamllint)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes (default: number of CPUs)")
+    parser.add_argument("--format", choices=["text", "json"], default="text", help="Output format (default: text)")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore and don't update the lint cache")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Also list files that passed")
+    args = parser.parse_args()
+
+    if linter is None:
+        print("ERROR: yamllint not found! Please install it with: pip install yamllint")
         return 1
-    
-    # Find all YAML files
-    yaml_files = list(wildcard_dir.glob("*.yaml"))
-    
-    if not yaml_files:
-        print(f"No YAML files found in {wildcard_dir}")
+
+    results, fresh = lint_wildcards(args.paths, args.config, args.jobs, use_cache=not args.no_cache)
+    if not results:
+        print(f"No wildcard files found in {', '.join(args.paths)}")
         return 0
-    
-    print(f"Linting {len(yaml_files)} wildcard files in {wildcard_dir}/")
+
+    failed = [path for path, problems in results.items() if any(p["level"] == "error" for p in problems)]
+
+    if args.format == "json":
+        print(json.dumps({
+            "files": len(results),
+            "linted": fresh,
+            "failed": len(failed),
+            "results": [
+                {"file": str(path), "status": "fail" if path in failed else "pass", "problems": problems}
+                for path, problems in results.items()
+            ],
+        }, indent=2, ensure_ascii=False))
+        return 1 if failed else 0
+
+    print(f"Linting {len(results)} wildcard files ({fresh} changed since the last run)")
     print("-" * 50)
-    
-    # Run yamllint on each file
-    errors_found = False
-    
-    for yaml_file in sorted(yaml_files):
-        try:
-            result = subprocess.run(
-                ["yamllint", "-c", ".yamllint", "-f", "parsable", str(yaml_file)], 
-                capture_output=True, 
-                text=True
-            )
-            
-            if result.returncode == 0:
-                print(f"PASS {yaml_file.name}")
-            else:
-                errors_found = True
-                print(f"FAIL {yaml_file.name}")
-                if result.stdout:
-                    # Format the output nicely
-                    for line in result.stdout.strip().split('\n'):
-                        if line:
-                            # Extract just the error part after the filename
-                            parts = line.split(':', 3)
-                            if len(parts) >= 4:
-                                line_num = parts[1]
-                                col_num = parts[2] 
-                                error = parts[3].strip()
-                                print(f"   Line {line_num}, Col {col_num}: {error}")
-                            else:
-                                print(f"   {line}")
-                
-        except FileNotFoundError:
-            print("ERROR: yamllint not found! Please install it with: pip install yamllint")
-            return 1
-        except Exception as e:
-            print(f"ERROR: Error linting {yaml_file.name}: {e}")
-            errors_found = True
-    
+    for path, problems in results.items():
+        if path in failed:
+            print(f"FAIL {path}")
+        elif problems:
+            print(f"WARN {path}")
+        elif args.verbose:
+            print(f"PASS {path}")
+        for p in problems:
+            print(f"   Line {p['line']}, Col {p['column']}: [{p['level']}] {p['message']} ({p['rule']})")
+
     print("-" * 50)
-    if errors_found:
-        print("FAIL: Linting completed with errors")
+    if failed:
+        print(f"FAIL: Linting completed with errors in {len(failed)} files")
         return 1
-    else:
-        print("PASS: All wildcard files passed linting!")
-        return 0
+    print("PASS: All wildcard files passed linting!")
+    return 0
+
 
 if __name__ == "__main__":
-    sys.exit(lint_wildcards())
+    sys.exit(main())
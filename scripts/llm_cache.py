@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Content-addressed on-disk cache for LLM responses.
+
+Responses are stored one JSON file per key under ``.llm_cache/``. The key is a
+SHA-256 of everything that shapes a response (model, sampling parameters such
+as reasoning effort or temperature, system prompt and user prompt), so edited
+inputs never hit stale entries and identical calls from different tools share
+results. File mtimes double as LRU timestamps: hits touch the file, and when
+the cache grows past its size bound the least recently used entries go first.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def default_cache_dir() -> Path:
+    """Return the shared cache directory at the project root."""
+    return Path(__file__).resolve().parent.parent / ".llm_cache"
+
+
+class CacheStats:
+    """Hit/miss counters for one cache instance."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def summary(self) -> str:
+        lookups = self.hits + self.misses
+        rate = (self.hits / lookups * 100) if lookups else 0.0
+        return (
+            f"LLM cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate), "
+            f"{self.writes} writes, {self.evictions} evictions"
+        )
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of LLM responses keyed by request content."""
+
+    def __init__(
+        self,
+        cache_dir: Path | None = None,
+        *,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        enabled: bool = True,
+    ) -> None:
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._total_bytes: int | None = None
+
+    @staticmethod
+    def make_key(*, model: str, system_prompt: str, user_prompt: str, **params: Any) -> str:
+        """Hash the model, prompts and sampling parameters into a cache key."""
+        material = {
+            "model": model,
+            "system_prompt": system_prompt,
+            "user_prompt": user_prompt,
+            "params": params,
+        }
+        encoded = json.dumps(material, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value for ``key`` or None, updating LRU order and stats."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)["value"]
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.stats.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.stats.hits += 1
+        return value
+
+    def put(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value, evicting old entries past the size bound."""
+        if not self.enabled:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"key": key, "value": value}, ensure_ascii=False).encode("utf-8")
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        try:
+            previous = path.stat().st_size
+        except OSError:
+            previous = 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self.stats.writes += 1
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            else:
+                self._total_bytes += len(data) - previous
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def get_or_call(self, key: str, call: Callable[[], Any]) -> tuple[Any, bool]:
+        """Return ``(value, cache_hit)``, calling and caching ``call()`` on a miss."""
+        value = self.get(key)
+        if value is not None:
+            return value, True
+        value = call()
+        self.put(key, value)
+        return value, False
+
+    def _entries(self) -> list[os.DirEntry]:
+        entries = []
+        if not self.cache_dir.exists():
+            return entries
+        with os.scandir(self.cache_dir) as shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                with os.scandir(shard.path) as files:
+                    entries.extend(entry for entry in files if entry.name.endswith(".json"))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache is at 90% of its bound."""
+        target = int(self.max_bytes * 0.9)
+        entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime_ns)
+        for entry in entries:
+            if self._total_bytes <= target:
+                break
+            size = entry.stat().st_size
+            try:
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self._total_bytes -= size
+            self.stats.evictions += 1
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""Per-call LLM telemetry shared by every tool, and a report over the traces.
+
+Tools wrap each chat completion in :meth:`Telemetry.span`, which appends one
+JSON line to ``.wc_cache/llm_traces.jsonl`` when the call ends: tool, stage,
+file, model, prompt/completion/reasoning tokens, latency, retries, cache hit,
+cost and outcome. Every process gets a ``run`` id so one run can be reported
+on its own::
+
+    python scripts/llm_telemetry.py report --run last
+    python scripts/llm_telemetry.py report --by stage --by tool,model
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+# USD per million (prompt, completion) tokens, for responses that don't report cost
+PRICES = {
+    "gpt-5": (1.25, 10.0),
+    "gpt-5-mini": (0.25, 2.0),
+    "gpt-4o": (2.5, 10.0),
+}
+GROUP_FIELDS = ("tool", "stage", "file", "model", "run", "status")
+
+
+def default_trace_path() -> Path:
+    return Path(__file__).resolve().parent.parent / ".wc_cache" / "llm_traces.jsonl"
+
+
+def _get(obj: Any, name: str) -> Any:
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+@dataclass(slots=True)
+class Span:
+    """One LLM call. Tools fill in what they know; the rest stays None."""
+
+    tool: str
+    stage: str
+    model: str
+    run: str
+    file: str | None = None
+    started: float = 0.0
+    latency: float | None = None
+    ttfb: float | None = None
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    reasoning_tokens: int | None = None
+    retries: int = 0
+    cache_hit: bool = False
+    cost: float | None = None
+    status: str = "ok"
+    error: str | None = None
+
+    def record_usage(self, response: Any) -> None:
+        """Take token counts (and cost, if reported) from an OpenAI object or a raw JSON response."""
+        usage = _get(response, "usage")
+        if usage is None:
+            return
+        self.prompt_tokens = _get(usage, "prompt_tokens")
+        self.completion_tokens = _get(usage, "completion_tokens")
+        self.reasoning_tokens = _get(_get(usage, "completion_tokens_details"), "reasoning_tokens")
+        cost = _get(usage, "cost")
+        if cost is None and self.model in PRICES and self.prompt_tokens is not None:
+            prompt_price, completion_price = PRICES[self.model]
+            cost = (self.prompt_tokens * prompt_price + (self.completion_tokens or 0) * completion_price) / 1e6
+        self.cost = cost
+
+
+class Telemetry:
+    """Thread-safe JSONL writer of :class:`Span` records for one tool run."""
+
+    def __init__(self, tool: str, path: Path | None = None, *, enabled: bool = True) -> None:
+        self.tool = tool
+        self.path = Path(path) if path else default_trace_path()
+        self.enabled = enabled
+        self.run = uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+        self._file = None
+
+    @contextmanager
+    def span(self, stage: str, *, model: str, file: str | os.PathLike | None = None) -> Iterator[Span]:
+        """Time the enclosed call and write its span, marking it failed if it raises."""
+        span = Span(tool=self.tool, stage=stage, model=model, run=self.run,
+                    file=str(file) if file is not None else None, started=time.time())
+        started = time.perf_counter()
+        try:
+            yield span
+        except BaseException as exc:
+            span.status = "error"
+            span.error = str(exc) or type(exc).__name__
+            # Errors from call_with_retries carry the retries spent before giving up
+            span.retries = getattr(exc, "retries", span.retries)
+            raise
+        finally:
+            if span.latency is None:
+                span.latency = time.perf_counter() - started
+            self.write(span)
+
+    def write(self, span: Span) -> None:
+        if not self.enabled:
+            return
+        line = json.dumps(asdict(span), ensure_ascii=False)
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+# --- report -----------------------------------------------------------------
+
+
+def load_spans(paths: Iterable[Path]) -> list[dict[str, Any]]:
+    spans = []
+    for path in paths:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn line from a crash
+                    if isinstance(record, dict) and "stage" in record:
+                        spans.append(record)
+        except FileNotFoundError:
+            print(f"Warning: trace file not found: {path}", file=sys.stderr)
+    return spans
+
+
+def _percentile(values: list[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def aggregate(spans: list[dict[str, Any]], fields: tuple[str, ...]) -> list[dict[str, Any]]:
+    """Group spans by ``fields`` and sum their calls, tokens, latency and cost."""
+    groups: dict[tuple, list[dict[str, Any]]] = defaultdict(list)
+    for span in spans:
+        groups[tuple(span.get(field) or "-" for field in fields)].append(span)
+
+    rows = []
+    for key, members in groups.items():
+        live = [s for s in members if not s.get("cache_hit")]
+        latencies = [s.get("latency") or 0.0 for s in live]
+        reasoning_time = 0.0
+        for s in live:
+            # Share of the call spent reasoning, estimated from its share of output tokens
+            completion, reasoning = s.get("completion_tokens") or 0, s.get("reasoning_tokens") or 0
+            if completion:
+                reasoning_time += (s.get("latency") or 0.0) * reasoning / completion
+        costs = [s["cost"] for s in members if s.get("cost") is not None]
+        rows.append({
+            **dict(zip(fields, key)),
+            "calls": len(members),
+            "cache_hits": len(members) - len(live),
+            "errors": sum(1 for s in members if s.get("status") != "ok"),
+            "retries": sum(s.get("retries") or 0 for s in members),
+            "prompt_tokens": sum(s.get("prompt_tokens") or 0 for s in live),
+            "completion_tokens": sum(s.get("completion_tokens") or 0 for s in live),
+            "reasoning_tokens": sum(s.get("reasoning_tokens") or 0 for s in live),
+            "latency_total": sum(latencies),
+            "latency_mean": sum(latencies) / len(latencies) if latencies else 0.0,
+            "latency_p95": _percentile(latencies, 0.95),
+            "reasoning_time": reasoning_time,
+            "cost": sum(costs) if costs else None,
+        })
+    rows.sort(key=lambda row: -row["latency_total"])
+    return rows
+
+
+def print_table(fields: tuple[str, ...], rows: list[dict[str, Any]], top: int) -> None:
+    label = " / ".join(fields)
+    width = max([len(label)] + [len(" / ".join(str(row[f]) for f in fields)) for row in rows[:top]])
+    width = min(width, 60)
+    print(f"\n{label:<{width}} {'calls':>6} {'hits':>5} {'err':>4} {'retry':>5} {'prompt':>9} {'compl':>8} "
+          f"{'reason':>8} {'time':>9} {'mean':>7} {'p95':>7} {'~reason':>8} {'cost':>8}")
+    for row in rows[:top]:
+        name = " / ".join(str(row[f]) for f in fields)
+        if len(name) > width:
+            name = "..." + name[-(width - 3):]
+        cost = f"${row['cost']:.3f}" if row["cost"] is not None else "-"
+        print(f"{name:<{width}} {row['calls']:>6} {row['cache_hits']:>5} {row['errors']:>4} {row['retries']:>5} "
+              f"{row['prompt_tokens']:>9} {row['completion_tokens']:>8} {row['reasoning_tokens']:>8} "
+              f"{row['latency_total']:>8.1f}s {row['latency_mean']:>6.1f}s {row['latency_p95']:>6.1f}s "
+              f"{row['reasoning_time']:>7.1f}s {cost:>8}")
+    if len(rows) > top:
+        print(f"... {len(rows) - top} more (use --top)")
+
+
+def report(args: argparse.Namespace) -> int:
+    spans = load_spans(args.traces or [default_trace_path()])
+    if args.tool:
+        spans = [s for s in spans if s.get("tool") == args.tool]
+    if args.run == "last" and spans:
+        last = max(spans, key=lambda s: s.get("started") or 0.0)["run"]
+        spans = [s for s in spans if s.get("run") == last]
+    elif args.run and args.run != "last":
+        spans = [s for s in spans if str(s.get("run", "")).startswith(args.run)]
+    if not spans:
+        print("No matching spans")
+        return 1
+
+    tables = [tuple(field.strip() for field in group.split(",")) for group in (args.by or ["stage", "file"])]
+    for fields in tables:
+        unknown = [field for field in fields if field not in GROUP_FIELDS]
+        if unknown:
+            print(f"Error: cannot group by {', '.join(unknown)} (choose from {', '.join(GROUP_FIELDS)})",
+                  file=sys.stderr)
+            return 1
+
+    if args.format == "json":
+        print(json.dumps({",".join(fields): aggregate(spans, fields) for fields in tables}, indent=2))
+        return 0
+
+    start = min(s.get("started") or 0.0 for s in spans)
+    end = max((s.get("started") or 0.0) + (s.get("latency") or 0.0) for s in spans)
+    runs = len({s.get("run") for s in spans})
+    total = aggregate(spans, ())[0]
+    cost = f", ${total['cost']:.3f}" if total["cost"] is not None else ""
+    print(f"{total['calls']} calls in {runs} run(s): {total['cache_hits']} cache hits, {total['errors']} errors, "
+          f"{total['prompt_tokens'] + total['completion_tokens']} tokens{cost}")
+    print(f"Wall time {end - start:.1f}s, summed call latency {total['latency_total']:.1f}s")
+    for fields in tables:
+        print_table(fields, aggregate(spans, fields), args.top)
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Inspect LLM call telemetry.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    report_parser = subparsers.add_parser("report", help="Aggregate traces into per-stage and per-file breakdowns")
+    report_parser.add_argument("traces", nargs="*", type=Path,
+                               help="Trace files (default: .wc_cache/llm_traces.jsonl)")
+    report_parser.add_argument("--by", action="append", metavar="FIELDS",
+                               help="Comma-separated fields to group by, one table per use "
+                                    f"({', '.join(GROUP_FIELDS)}; default: stage, then file)")
+    report_parser.add_argument("--run", help="Only spans from this run id (prefix), or 'last'")
+    report_parser.add_argument("--tool", help="Only spans from this tool")
+    report_parser.add_argument("--top", type=int, default=20, help="Rows per table (default: 20)")
+    report_parser.add_argument("--format", choices=["text", "json"], default="text",
+                               help="Output format (default: text)")
+    args = parser.parse_args()
+    return report(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
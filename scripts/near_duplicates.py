@@ -0,0 +1,431 @@
+#!/usr/bin/env -S uv run --quiet
+# /// script
+# dependencies = [
+#   "numpy",
+#   "pyyaml",
+# ]
+# ///
+"""Find near-duplicate wildcard entries with MinHash and LSH banding.
+
+Every entry is normalized (case, punctuation and whitespace ignored), cut
+into character shingles, and summarized by a MinHash signature, so the share
+of matching signature slots estimates the Jaccard similarity of two entries'
+shingle sets. Signatures are split into bands and entries sharing a band land
+in the same bucket; only entries that share a bucket are compared, and pairs
+whose estimated similarity clears the threshold are grouped into clusters.
+Hashing, bucketing and scoring are vectorized with NumPy, so a run over the
+whole tree takes seconds::
+
+    python scripts/near_duplicates.py                          # every file, clusters within a file
+    python scripts/near_duplicates.py wildcards/std/poses.txt --threshold 0.6
+    python scripts/near_duplicates.py --scope tree --format json
+
+``wct.py --dedupe`` uses the clusters to have the model adjudicate only the
+candidates instead of rereading the whole file.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import numpy as np
+
+from dedup_index import normalize_entry
+from wildcard_engine import WILDCARD_SUFFIXES, compile_file, iter_wildcard_files, parse_weighted_value
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+WILDCARD_ROOT = PROJECT_ROOT / "wildcards"
+
+DEFAULT_THRESHOLD = 0.7
+DEFAULT_NUM_PERM = 64
+DEFAULT_SHINGLE = 5
+# Upper bound on the (permutations x shingles) matrix hashed at once
+MAX_HASH_MATRIX = 8_000_000
+
+_YAML_ITEM_RE = re.compile(r"^\s*-\s+(.*?)\s*$")
+
+
+@dataclass(frozen=True, slots=True)
+class Entry:
+    """One wildcard value and where it came from (``line`` is 1-based, None if unknown)."""
+
+    file: str
+    key: str
+    line: int | None
+    text: str
+
+
+@dataclass(slots=True)
+class Cluster:
+    """Near-duplicate entries; ``similarity[i]`` is member i's estimated Jaccard with member 0."""
+
+    members: list[Entry]
+    similarity: list[float] = field(default_factory=list)
+
+    @property
+    def min_similarity(self) -> float:
+        return min(self.similarity[1:], default=1.0)
+
+
+# --- entries ----------------------------------------------------------------
+
+
+def _yaml_lines(content: str) -> dict[str, list[int]]:
+    """Map block-list item values to the line numbers they appear on, in order."""
+    lines: dict[str, list[int]] = defaultdict(list)
+    for number, line in enumerate(content.splitlines(), 1):
+        match = _YAML_ITEM_RE.match(line)
+        if match:
+            value = match.group(1)
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+                value = value[1:-1]
+            lines[parse_weighted_value(value)[1]].append(number)
+    return lines
+
+
+def load_entries(path: Path, label: str | None = None) -> list[Entry]:
+    """Return the entries of one txt or YAML wildcard file.
+
+    YAML values are located on their ``- value`` lines where possible, so
+    callers can remove them from the source; values that can't be located
+    (flow lists, multi-line scalars) get ``line=None``.
+    """
+    path = Path(path)
+    label = label or str(path)
+    content = path.read_text(encoding="utf-8")
+    if path.suffix.lower() == ".txt":
+        key = label.rsplit(".", 1)[0]
+        return [Entry(label, key, number, line.strip())
+                for number, line in enumerate(content.splitlines(), 1)
+                if line.strip() and not line.strip().startswith("#")]
+
+    positions = _yaml_lines(content)
+    used: dict[str, int] = defaultdict(int)
+    entries = []
+    for key, values in compile_file(path.parent, path.name)[0].items():
+        for value in values:
+            candidates = positions.get(value, [])
+            line = candidates[used[value]] if used[value] < len(candidates) else None
+            used[value] += 1
+            entries.append(Entry(label, key or label.rsplit(".", 1)[0], line, value))
+    return entries
+
+
+def collect_entries(paths: Sequence[Path], root: Path = WILDCARD_ROOT) -> list[Entry]:
+    """Load entries from files and directories; labels are relative to ``root`` when inside it."""
+    root = Path(root).resolve()
+    files: list[tuple[Path, str]] = []
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            base = path.resolve()
+            for rel, _ in sorted(iter_wildcard_files(path)):
+                files.append((path / rel, _label(base / rel, root)))
+        elif path.suffix.lower() in WILDCARD_SUFFIXES:
+            files.append((path, _label(path.resolve(), root)))
+        else:
+            raise FileNotFoundError(f"Not a wildcard file or directory: {path}")
+    entries: list[Entry] = []
+    for path, label in files:
+        entries.extend(load_entries(path, label))
+    return entries
+
+
+def _label(path: Path, root: Path) -> str:
+    try:
+        return path.relative_to(root).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+# --- MinHash ----------------------------------------------------------------
+
+
+class MinHasher:
+    """MinHash signatures of character shingles, computed for many texts at once.
+
+    Shingles are packed byte-wise into integers (up to 8 bytes, so no
+    collisions below that), mixed down to 32 bits, and put through
+    ``num_perm`` random affine permutations of the 32-bit range drawn from a
+    fixed seed, so signatures are reproducible between runs.
+    """
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, shingle: int = DEFAULT_SHINGLE, seed: int = 1) -> None:
+        if not 1 <= shingle <= 8:
+            raise ValueError("shingle size must be between 1 and 8 bytes")
+        self.num_perm = num_perm
+        self.shingle = shingle
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(0, 2**32, size=(num_perm, 1), dtype=np.uint32) | np.uint32(1)
+        self._b = rng.integers(0, 2**32, size=(num_perm, 1), dtype=np.uint32)
+
+    def _shingles(self, texts: Sequence[str]) -> tuple[np.ndarray, np.ndarray]:
+        """Return all texts' shingle keys concatenated, and each text's start offset."""
+        k = self.shingle
+        encoded = [f" {text} ".encode("utf-8").ljust(k) for text in texts]
+        lengths = np.fromiter((len(data) for data in encoded), dtype=np.int64, count=len(encoded))
+        buffer = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.uint64)
+        starts = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=starts[1:])
+
+        # Pack k consecutive bytes at every position, then keep the positions
+        # whose k-gram lies entirely inside one text
+        count = len(buffer) - k + 1
+        keys = np.zeros(count, dtype=np.uint64)
+        for offset in range(k):
+            keys = (keys << np.uint64(8)) | buffer[offset:offset + count]
+        valid = np.ones(count, dtype=bool)
+        for offset in range(1, k):
+            valid[starts[1:-1] - offset] = False
+        offsets = np.zeros(len(encoded), dtype=np.int64)
+        np.cumsum(lengths[:-1] - k + 1, out=offsets[1:])
+        return keys[valid], offsets
+
+    def signatures(self, texts: Sequence[str]) -> np.ndarray:
+        """Return a ``(len(texts), num_perm)`` uint32 signature matrix."""
+        if not texts:
+            return np.zeros((0, self.num_perm), dtype=np.uint32)
+        keys, offsets = self._shingles(texts)
+        keys = ((keys * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)).astype(np.uint32)
+        out = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        bounds = np.append(offsets, len(keys))
+
+        step = max(1, MAX_HASH_MATRIX // self.num_perm)
+        first = 0
+        while first < len(texts):
+            # Take whole texts until the chunk holds about `step` shingles
+            last = int(np.searchsorted(bounds, bounds[first] + step, side="right")) - 1
+            last = min(max(last, first + 1), len(texts))
+            lo, hi = bounds[first], bounds[last]
+            hashed = self._a * keys[lo:hi]
+            hashed += self._b
+            out[first:last] = np.minimum.reduceat(hashed, offsets[first:last] - lo, axis=1).T
+            first = last
+        return out
+
+
+def lsh_params(threshold: float, num_perm: int) -> tuple[int, int]:
+    """Pick ``(bands, rows)`` whose S-curve midpoint ``(1/b)**(1/r)`` is closest to ``threshold``.
+
+    The midpoint is then nudged below the threshold (an extra band where one
+    fits), trading some extra candidates for recall.
+    """
+    best = (num_perm, 1)
+    best_error = float("inf")
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        midpoint = (1 / bands) ** (1 / rows)
+        # Prefer midpoints below the threshold: candidates are verified, misses are not
+        error = abs(midpoint - threshold) * (1.0 if midpoint <= threshold else 2.0)
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+def candidate_pairs(signatures: np.ndarray, partitions: np.ndarray, bands: int, rows: int) -> np.ndarray:
+    """Return ``(n, 2)`` index pairs ``a < b`` that share an LSH band within the same partition.
+
+    Each bucket contributes a star around its first member plus each member's
+    predecessor, so large buckets add O(size) pairs rather than O(size^2).
+    """
+    if len(signatures) < 2:
+        return np.zeros((0, 2), dtype=np.int64)
+    weights = np.random.default_rng(0).integers(0, 2**63, size=rows, dtype=np.uint64) | np.uint64(1)
+    partition_salt = partitions.astype(np.uint64) * np.uint64(0xD6E8FEB86659FD93)
+    found = []
+    for band in range(bands):
+        block = signatures[:, band * rows:(band + 1) * rows].astype(np.uint64)
+        bucket = (block * weights).sum(axis=1, dtype=np.uint64) ^ partition_salt
+        # Stable sort keeps every bucket's members in input order
+        order = np.argsort(bucket, kind="stable")
+        ordered = bucket[order]
+        same = ordered[1:] == ordered[:-1]
+        if not same.any():
+            continue
+        run_first = np.maximum.accumulate(np.where(np.r_[True, ~same], np.arange(len(order)), 0))
+        later = np.flatnonzero(same) + 1
+        found.append(np.stack([order[run_first[later]], order[later]], axis=1))
+        found.append(np.stack([order[later - 1], order[later]], axis=1))
+    if not found:
+        return np.zeros((0, 2), dtype=np.int64)
+    pairs = np.concatenate(found)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    # Deduplicate as flat keys; much faster than np.unique(axis=0)
+    n = np.int64(len(signatures))
+    keys = np.unique(pairs[:, 0] * n + pairs[:, 1])
+    return np.stack([keys // n, keys % n], axis=1)
+
+
+def estimate_similarity(signatures: np.ndarray, pairs: np.ndarray, chunk: int = 1 << 16) -> np.ndarray:
+    """MinHash Jaccard estimates for index pairs: the share of matching signature slots."""
+    out = np.empty(len(pairs), dtype=np.float64)
+    for start in range(0, len(pairs), chunk):
+        a, b = pairs[start:start + chunk].T
+        out[start:start + chunk] = (signatures[a] == signatures[b]).mean(axis=1)
+    return out
+
+
+# --- clustering -------------------------------------------------------------
+
+
+def find_clusters(entries: Sequence[Entry], threshold: float = DEFAULT_THRESHOLD, *,
+                  scope: str = "file", num_perm: int = DEFAULT_NUM_PERM,
+                  shingle: int = DEFAULT_SHINGLE) -> list[Cluster]:
+    """Group entries whose estimated shingle Jaccard similarity is at least ``threshold``.
+
+    With ``scope="file"`` only entries of the same file are compared; with
+    ``scope="tree"`` clusters may span files. Entries are clustered around
+    leaders in input order: an entry joins the most similar earlier leader it
+    clears the threshold with, otherwise it leads a cluster of its own. That
+    keeps every member close to the cluster's first entry instead of chaining
+    through a run of gradually changing ones (``A, B, C`` ... ``D, E, F``).
+    Entries that normalize to the same text always share a cluster
+    (similarity 1.0). Clusters are ordered by size, largest first.
+    """
+    if scope not in ("file", "tree"):
+        raise ValueError(f"Unknown scope: {scope}")
+
+    # One node per distinct normalized text within a partition, in input order
+    nodes: dict[tuple[str, str], int] = {}
+    node_entries: list[list[int]] = []
+    texts: list[str] = []
+    partitions: list[int] = []
+    partition_ids: dict[str, int] = {}
+    for index, entry in enumerate(entries):
+        normalized = normalize_entry(entry.text, loose=True)
+        if not normalized:
+            continue
+        partition = entry.file if scope == "file" else ""
+        node = nodes.get((partition, normalized))
+        if node is None:
+            node = nodes[(partition, normalized)] = len(texts)
+            texts.append(normalized)
+            partitions.append(partition_ids.setdefault(partition, len(partition_ids)))
+            node_entries.append([])
+        node_entries[node].append(index)
+
+    hasher = MinHasher(num_perm=num_perm, shingle=shingle)
+    signatures = hasher.signatures(texts)
+    pairs = candidate_pairs(signatures, np.asarray(partitions, dtype=np.int64),
+                            *lsh_params(threshold, num_perm))
+    similarity = estimate_similarity(signatures, pairs)
+    keep = similarity >= threshold
+    pairs, similarity = pairs[keep], similarity[keep]
+
+    # Edges to earlier nodes, strongest first (pairs are (earlier, later))
+    order = np.lexsort((-similarity, pairs[:, 1]))
+    earlier: dict[int, list[tuple[int, float]]] = defaultdict(list)
+    for (a, b), score in zip(pairs[order].tolist(), similarity[order].tolist()):
+        earlier[b].append((a, score))
+
+    leader = list(range(len(texts)))
+    score_to_leader = [1.0] * len(texts)
+    for node in sorted(earlier):
+        for other, score in earlier[node]:
+            if leader[other] == other:
+                leader[node], score_to_leader[node] = other, score
+                break
+
+    groups: dict[int, list[int]] = defaultdict(list)
+    for node in range(len(texts)):
+        groups[leader[node]].append(node)
+
+    clusters = []
+    for head, members in groups.items():
+        if len(members) == 1 and len(node_entries[head]) == 1:
+            continue
+        cluster = Cluster([])
+        for node in members:
+            for index in node_entries[node]:
+                cluster.members.append(entries[index])
+                cluster.similarity.append(score_to_leader[node])
+        clusters.append(cluster)
+    clusters.sort(key=lambda c: (-len(c.members), c.members[0].file, c.members[0].line or 0))
+    return clusters
+
+
+# --- CLI --------------------------------------------------------------------
+
+
+def cluster_to_dict(cluster: Cluster) -> dict:
+    return {
+        "size": len(cluster.members),
+        "min_similarity": round(cluster.min_similarity, 3),
+        "members": [
+            {"file": entry.file, "key": entry.key, "line": entry.line, "text": entry.text,
+             "similarity": round(similarity, 3)}
+            for entry, similarity in zip(cluster.members, cluster.similarity)
+        ],
+    }
+
+
+def print_clusters(clusters: Iterable[Cluster]) -> None:
+    for cluster in clusters:
+        files = sorted({entry.file for entry in cluster.members})
+        print(f"\n{', '.join(files)}  ({len(cluster.members)} entries, "
+              f"min similarity {cluster.min_similarity:.2f})")
+        for entry, similarity in zip(cluster.members, cluster.similarity):
+            where = f"L{entry.line}" if entry.line else "-"
+            prefix = f"{entry.file}:" if len(files) > 1 else ""
+            print(f"  {prefix}{where:<6} {similarity:.2f}  {entry.text}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Find near-duplicate wildcard entries with MinHash/LSH.")
+    parser.add_argument("paths", nargs="*", type=Path,
+                        help="Wildcard files or directories (default: wildcards/)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Minimum shingle Jaccard similarity (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument("--scope", choices=["file", "tree"], default="file",
+                        help="Compare entries within each file, or across all files (default: file)")
+    parser.add_argument("--num-perm", type=int, default=DEFAULT_NUM_PERM,
+                        help=f"MinHash signature length (default: {DEFAULT_NUM_PERM})")
+    parser.add_argument("--shingle", type=int, default=DEFAULT_SHINGLE,
+                        help=f"Shingle size in characters (default: {DEFAULT_SHINGLE})")
+    parser.add_argument("--top", type=int, help="Only show the N largest clusters")
+    parser.add_argument("--format", choices=["text", "json"], default="text",
+                        help="Output format (default: text)")
+    args = parser.parse_args()
+
+    if not 0 < args.threshold <= 1:
+        print("Error: --threshold must be in (0, 1]", file=sys.stderr)
+        return 1
+
+    started = time.perf_counter()
+    try:
+        entries = collect_entries(args.paths or [WILDCARD_ROOT])
+    except (FileNotFoundError, OSError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    clusters = find_clusters(entries, args.threshold, scope=args.scope,
+                             num_perm=args.num_perm, shingle=args.shingle)
+    elapsed = time.perf_counter() - started
+    shown = clusters[:args.top] if args.top else clusters
+
+    if args.format == "json":
+        json.dump({"threshold": args.threshold, "scope": args.scope, "entries": len(entries),
+                   "clusters": [cluster_to_dict(cluster) for cluster in shown]},
+                  sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return 0
+
+    redundant = sum(len(cluster.members) - 1 for cluster in clusters)
+    files = len({entry.file for entry in entries})
+    print(f"{len(entries)} entries in {files} file(s): {len(clusters)} clusters, "
+          f"{redundant} redundant entries ({elapsed:.1f}s)")
+    print_clusters(shown)
+    if len(shown) < len(clusters):
+        print(f"\n... {len(clusters) - len(shown)} more (use --top)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
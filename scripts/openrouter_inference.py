@@ -3,23 +3,152 @@
 
 from __future__ import annotations
 
+import base64
+import http.client
 import json
 import os
-from typing import Any
-from urllib import error, request
+import random
+import ssl
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, TypeVar
+from urllib.parse import unquote, urlsplit
+from urllib.request import getproxies, proxy_bypass
+
+T = TypeVar("T")
+
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+# Statuses worth retrying: timeouts, rate limits and transient server errors
+RETRYABLE_STATUSES = frozenset({408, 409, 425, 429, 500, 502, 503, 504})
+
+
+class OpenRouterError(RuntimeError):
+    """Failed OpenRouter request; ``status`` is None for network errors.
+
+    ``retries`` is set by :func:`call_with_retries` to the retries spent
+    before giving up.
+    """
+
+    def __init__(self, message: str, *, status: int | None = None, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.retries = 0
+
+    @property
+    def retryable(self) -> bool:
+        return self.status is None or self.status in RETRYABLE_STATUSES
+
+
+def _parse_retry_after(value: str | None) -> float | None:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+@dataclass(frozen=True, slots=True)
+class RequestTiming:
+    """Wall-clock phases of one request, in seconds."""
+
+    connect: float  # TCP + TLS setup; 0.0 when a pooled connection was reused
+    ttfb: float  # request sent until response headers arrived
+    total: float  # whole call, including connect and reading the body
+    reused: bool
+
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections to one host, reused across threads.
+
+    Idle connections are kept up to ``size``; extra connections opened under
+    higher concurrency are closed when returned. HTTP/1.1 only: the standard
+    library has no HTTP/2 client.
+
+    Honors the ``HTTPS_PROXY``/``HTTP_PROXY``/``NO_PROXY`` environment the way
+    urllib does: HTTPS goes through a CONNECT tunnel on the proxy, plain HTTP
+    sends absolute URLs to it.
+    """
+
+    def __init__(self, base_url: str, *, size: int = 8, timeout: float = 60) -> None:
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported URL scheme: {base_url}")
+        self.scheme = parts.scheme
+        self.host = parts.hostname or ""
+        self.port = parts.port
+        self.path_prefix = parts.path.rstrip("/")
+        self.size = size
+        self.timeout = timeout
+        self._ssl_context = ssl.create_default_context() if self.scheme == "https" else None
+        self._idle: list[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+
+        # Headers every request needs (proxy credentials for plain HTTP proxies)
+        self.headers: dict[str, str] = {}
+        self._proxy: tuple[str, int | None] | None = None
+        self._tunnel_headers: dict[str, str] = {}
+        proxy_url = getproxies().get(self.scheme)
+        if proxy_url and not proxy_bypass(self.host):
+            self._use_proxy(proxy_url, parts.netloc)
+
+    def _use_proxy(self, proxy_url: str, netloc: str) -> None:
+        proxy = urlsplit(proxy_url if "://" in proxy_url else f"http://{proxy_url}")
+        self._proxy = (proxy.hostname or "", proxy.port)
+        auth = {}
+        if proxy.username is not None:
+            credentials = f"{unquote(proxy.username)}:{unquote(proxy.password or '')}"
+            auth["Proxy-Authorization"] = "Basic " + base64.b64encode(credentials.encode()).decode("ascii")
+        if self._ssl_context is not None:
+            self._tunnel_headers = auth
+        else:
+            self.headers.update(auth)
+            self.path_prefix = f"{self.scheme}://{netloc}{self.path_prefix}"
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        host, port = self._proxy if self._proxy is not None else (self.host, self.port)
+        if self._ssl_context is None:
+            return http.client.HTTPConnection(host, port, timeout=self.timeout)
+        conn = http.client.HTTPSConnection(host, port, timeout=self.timeout, context=self._ssl_context)
+        if self._proxy is not None:
+            conn.set_tunnel(self.host, self.port, headers=self._tunnel_headers)
+        return conn
+
+    def acquire(self) -> tuple[http.client.HTTPConnection, bool]:
+        """Return ``(connection, reused)``; new connections are not yet connected."""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self._new_connection(), False
+
+    def release(self, conn: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
 
 
 class OpenRouterClient:
-    """Minimal OpenRouter chat completions client."""
+    """Minimal OpenRouter chat completions client over pooled keep-alive connections."""
 
     def __init__(
         self,
         api_key: str,
         *,
-        base_url: str = "https://openrouter.ai/api/v1",
+        base_url: str = DEFAULT_BASE_URL,
         timeout: int = 60,
         referer: str | None = None,
         title: str | None = None,
+        pool_size: int = 8,
     ) -> None:
         if not api_key:
             raise ValueError("OpenRouter API key is required")
@@ -29,11 +158,22 @@ class OpenRouterClient:
         self.timeout = timeout
         self.referer = referer
         self.title = title
+        self.pool = ConnectionPool(self.base_url, size=pool_size, timeout=timeout)
 
     @classmethod
-    def from_env(cls, *, timeout: int = 60) -> "OpenRouterClient":
+    def from_env(cls, *, timeout: int = 60, pool_size: int = 8) -> "OpenRouterClient":
         api_key = os.getenv("OPENROUTER_API_KEY", "")
-        return cls(api_key=api_key, timeout=timeout)
+        base_url = os.getenv("OPENROUTER_BASE_URL", DEFAULT_BASE_URL)
+        return cls(api_key=api_key, base_url=base_url, timeout=timeout, pool_size=pool_size)
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def __enter__(self) -> "OpenRouterClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
     def chat_completion(
         self,
@@ -43,6 +183,20 @@ class OpenRouterClient:
         temperature: float = 0.0,
         max_tokens: int | None = None,
     ) -> dict[str, Any]:
+        response, _ = self.chat_completion_timed(
+            model=model, messages=messages, temperature=temperature, max_tokens=max_tokens
+        )
+        return response
+
+    def chat_completion_timed(
+        self,
+        *,
+        model: str,
+        messages: list[dict[str, str]],
+        temperature: float = 0.0,
+        max_tokens: int | None = None,
+    ) -> tuple[dict[str, Any], RequestTiming]:
+        """Like :meth:`chat_completion`, also returning the request's timing."""
         payload: dict[str, Any] = {
             "model": model,
             "messages": messages,
@@ -61,28 +215,134 @@ class OpenRouterClient:
         if self.title:
             headers["X-Title"] = self.title
 
-        req = request.Request(
-            url=f"{self.base_url}/chat/completions",
-            data=body,
-            headers=headers,
-            method="POST",
-        )
+        status, reason, response_headers, raw, timing = self._post("/chat/completions", body, headers)
+        if status >= 400:
+            details = raw.decode("utf-8", errors="replace")
+            raise OpenRouterError(
+                f"OpenRouter request failed ({status} {reason}): {details.strip()}",
+                status=status,
+                retry_after=_parse_retry_after(response_headers.get("Retry-After")),
+            )
+        return json.loads(raw.decode("utf-8")), timing
 
-        try:
-            with request.urlopen(req, timeout=self.timeout) as resp:
-                raw = resp.read().decode("utf-8")
-                return json.loads(raw)
-        except error.HTTPError as exc:
-            details = ""
+    def _post(
+        self, path: str, body: bytes, headers: dict[str, str]
+    ) -> tuple[int, str, http.client.HTTPMessage, bytes, RequestTiming]:
+        url = f"{self.pool.path_prefix}{path}"
+        headers = {**self.pool.headers, **headers}
+        # A pooled connection may have been closed by the server while idle;
+        # that surfaces on first use, so retry such failures once on a fresh one.
+        for attempt in range(2):
+            conn, reused = self.pool.acquire()
+            started = time.perf_counter()
+            connect = 0.0
             try:
-                details = exc.read().decode("utf-8")
-            except Exception:
-                details = ""
-            raise RuntimeError(
-                f"OpenRouter request failed ({exc.code} {exc.reason}): {details.strip()}"
-            ) from exc
-        except error.URLError as exc:
-            raise RuntimeError(f"OpenRouter network error: {exc.reason}") from exc
+                if not reused:
+                    conn.connect()
+                    connect = time.perf_counter() - started
+                conn.request("POST", url, body=body, headers=headers)
+                resp = conn.getresponse()
+                ttfb = time.perf_counter() - started - connect
+                raw = resp.read()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError) as exc:
+                conn.close()
+                if reused and attempt == 0:
+                    continue
+                raise OpenRouterError(f"OpenRouter network error: {exc}") from exc
+            except (OSError, http.client.HTTPException) as exc:
+                conn.close()
+                raise OpenRouterError(f"OpenRouter network error: {exc}") from exc
+
+            if resp.will_close:
+                conn.close()
+            else:
+                self.pool.release(conn)
+            timing = RequestTiming(
+                connect=connect,
+                ttfb=ttfb,
+                total=time.perf_counter() - started,
+                reused=reused,
+            )
+            return resp.status, resp.reason, resp.headers, raw, timing
+        raise AssertionError("unreachable")
+
+
+class RateLimiter:
+    """Token bucket on request starts per second, plus a cap on requests in flight.
+
+    Use as a context manager around each request. ``rate=None`` disables the
+    per-second limit; ``max_in_flight=None`` disables the concurrency cap.
+    """
+
+    def __init__(self, rate: float | None = None, *, burst: int = 1, max_in_flight: int | None = None) -> None:
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._in_flight = threading.BoundedSemaphore(max_in_flight) if max_in_flight else None
+
+    def _take_token(self) -> None:
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def acquire(self) -> None:
+        if self._in_flight is not None:
+            self._in_flight.acquire()
+        self._take_token()
+
+    def release(self) -> None:
+        if self._in_flight is not None:
+            self._in_flight.release()
+
+    def __enter__(self) -> "RateLimiter":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+def call_with_retries(
+    call: Callable[[], T],
+    *,
+    max_retries: int = 4,
+    limiter: RateLimiter | None = None,
+    base_delay: float = 1.0,
+    max_delay: float = 30.0,
+) -> tuple[T, int]:
+    """Run ``call`` under ``limiter``, retrying retryable OpenRouterErrors.
+
+    Backoff is exponential with full jitter, and a server-sent Retry-After
+    takes precedence. Returns ``(result, retries_used)``; an error that is
+    finally raised carries the retries used in its ``retries`` attribute.
+    """
+    attempt = 0
+    while True:
+        try:
+            if limiter is None:
+                return call(), attempt
+            with limiter:
+                return call(), attempt
+        except OpenRouterError as exc:
+            if not exc.retryable or attempt >= max_retries:
+                exc.retries = attempt
+                raise
+            delay = exc.retry_after
+            if delay is None:
+                delay = random.uniform(0, min(max_delay, base_delay * 2**attempt))
+            attempt += 1
+            time.sleep(delay)
 
 
 def extract_message_text(response: dict[str, Any]) -> str:
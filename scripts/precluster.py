@@ -0,0 +1,289 @@
+#!/usr/bin/env -S uv run --quiet
+# /// script
+# dependencies = [
+#   "numpy",
+#   "pyyaml",
+#   "scipy",
+# ]
+# ///
+"""Cluster a wildcard file's entries locally before the LLM names them.
+
+Entries become TF-IDF vectors over word unigrams/bigrams and character
+3-5-grams (SciPy sparse matrices, rows L2-normalized), and spherical k-means
+with a seeded k-means++ start groups them by cosine similarity. Each cluster
+is summarized by its size, its highest-weighted terms and the entries closest
+to its centroid, which is all ``wct.py --precluster`` sends to the model; the
+category the model gives a cluster is then propagated to its members locally.
+The same file always produces the same clusters::
+
+    python scripts/precluster.py wildcards/std/uniforms.txt
+    python scripts/precluster.py wildcards/std/xl/pose.yaml --clusters 12 --format json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import re
+import sys
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+from scipy import sparse
+
+from dedup_index import normalize_entry
+
+WORD_RE = re.compile(r"[a-z0-9]{2,}")
+# Wildcard paths repeat across a file and say little beyond their last segment
+WILDCARD_REF_RE = re.compile(r"__(?:[\w.-]+/)*([\w.*-]+)__")
+
+MAX_CLUSTERS = 30
+DEFAULT_EXEMPLARS = 3
+DEFAULT_TERMS = 5
+MAX_EXEMPLAR_CHARS = 160
+MAX_ITERATIONS = 100
+# Clusters whose members fit their centroid worse than this on average are
+# grab-bags of entries with no vocabulary in common, and are split up
+MIN_COHESION = 0.2
+MAX_SINGLETONS = 100
+
+
+@dataclass(slots=True)
+class EntryCluster:
+    """One k-means cluster: member indices, closest-to-centroid exemplars and top terms."""
+
+    id: int
+    members: list[int]
+    exemplars: list[str] = field(default_factory=list)
+    terms: list[str] = field(default_factory=list)
+
+    @property
+    def size(self) -> int:
+        return len(self.members)
+
+
+# --- features ---------------------------------------------------------------
+
+
+def _features(text: str) -> tuple[Counter, Counter]:
+    """Word uni/bigram and within-word character 3-5-gram counts of one entry."""
+    text = WILDCARD_REF_RE.sub(r" \1 ", text)
+    words = WORD_RE.findall(normalize_entry(text, loose=True).replace("_", " "))
+    word_features = Counter(words)
+    word_features.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    char_features: Counter = Counter()
+    for word in words:
+        padded = f" {word} "
+        for n in (3, 4, 5):
+            char_features.update(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return word_features, char_features
+
+
+def _tfidf_block(counts: Sequence[Counter], min_df: int) -> tuple[sparse.csr_matrix, list[str]]:
+    """Sublinear-tf, smoothed-idf matrix of one feature family, rows L2-normalized."""
+    columns: dict[str, int] = {}
+    column_ids: list[int] = []
+    term_counts: list[int] = []
+    lengths = np.fromiter((len(row) for row in counts), dtype=np.int64, count=len(counts))
+    for row in counts:
+        for term, count in row.items():
+            column_ids.append(columns.setdefault(term, len(columns)))
+            term_counts.append(count)
+
+    cols = np.asarray(column_ids, dtype=np.int64)
+    df = np.bincount(cols, minlength=len(columns))
+    kept = df >= min_df
+    remap = np.cumsum(kept) - 1
+    mask = kept[cols]
+    rows = np.repeat(np.arange(len(counts)), lengths)[mask]
+    cols = remap[cols[mask]]
+
+    n = len(counts)
+    idf = np.log((1 + n) / (1 + df[kept])) + 1
+    data = (1.0 + np.log(np.asarray(term_counts, dtype=np.float64)[mask])) * idf[cols]
+    matrix = sparse.csr_matrix((data, (rows, cols)), shape=(n, int(kept.sum())))
+    vocabulary = [term for term, column in columns.items() if kept[column]]
+    return _normalize_rows(matrix), vocabulary
+
+
+def _normalize_rows(matrix: sparse.csr_matrix) -> sparse.csr_matrix:
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return (sparse.diags(1 / norms) @ matrix).tocsr()
+
+
+def tfidf_matrix(texts: Sequence[str], min_df: int = 2) -> tuple[sparse.csr_matrix, list[str]]:
+    """Return the combined TF-IDF matrix of ``texts`` and the names of its word columns.
+
+    Word and character features are normalized separately and weighted
+    equally, so long entries don't let the far more numerous character
+    n-grams drown out the words. Features seen in fewer than ``min_df``
+    entries can't pull entries together and are dropped. Word columns come
+    first, followed by the character n-gram columns.
+    """
+    word_counts, char_counts = zip(*(_features(text) for text in texts)) if texts else ((), ())
+    words, word_vocabulary = _tfidf_block(word_counts, min_df)
+    chars, _ = _tfidf_block(char_counts, min_df)
+    matrix = sparse.hstack([words, chars], format="csr") * (1 / math.sqrt(2))
+    return _normalize_rows(matrix).tocsr(), word_vocabulary
+
+
+# --- k-means ----------------------------------------------------------------
+
+
+def default_cluster_count(entries: int) -> int:
+    """About sqrt(n/2) clusters: finer than the final categories, few enough to name cheaply."""
+    return max(2, min(MAX_CLUSTERS, round(math.sqrt(entries / 2))))
+
+
+def _kmeans_plus_plus(matrix: sparse.csr_matrix, k: int, rng: np.random.Generator) -> np.ndarray:
+    n = matrix.shape[0]
+    chosen = [int(rng.integers(n))]
+    distance = 1.0 - (matrix @ matrix[chosen[0]].T).toarray().ravel()
+    for _ in range(1, k):
+        weights = np.clip(distance, 0, None)
+        total = weights.sum()
+        index = int(rng.choice(n, p=weights / total)) if total > 0 else int(rng.integers(n))
+        chosen.append(index)
+        distance = np.minimum(distance, 1.0 - (matrix @ matrix[index].T).toarray().ravel())
+    return matrix[chosen].toarray()
+
+
+def spherical_kmeans(matrix: sparse.csr_matrix, k: int, *, seed: int = 0,
+                     max_iterations: int = MAX_ITERATIONS) -> tuple[np.ndarray, np.ndarray]:
+    """Cluster L2-normalized rows by cosine similarity; return ``(labels, centroids)``.
+
+    Centroids are renormalized means. A cluster that empties out is reseeded
+    with the entry that currently fits its own centroid worst.
+    """
+    n = matrix.shape[0]
+    k = max(1, min(k, n))
+    rng = np.random.default_rng(seed)
+    centroids = _kmeans_plus_plus(matrix, k, rng)
+    labels = np.full(n, -1)
+    for _ in range(max_iterations):
+        similarity = np.asarray(matrix @ centroids.T)
+        new_labels = similarity.argmax(axis=1)
+        best = similarity[np.arange(n), new_labels]
+        for cluster in np.setdiff1d(np.arange(k), new_labels):
+            worst = int(best.argmin())
+            new_labels[worst] = cluster
+            best[worst] = np.inf
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        indicator = sparse.csr_matrix((np.ones(n), (labels, np.arange(n))), shape=(k, n))
+        sums = np.asarray((indicator @ matrix).todense())
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        centroids = sums / np.where(norms == 0, 1.0, norms)
+    return labels, centroids
+
+
+# --- clustering -------------------------------------------------------------
+
+
+def cluster_entries(texts: Sequence[str], k: int | None = None, *, exemplars: int = DEFAULT_EXEMPLARS,
+                    terms: int = DEFAULT_TERMS, min_cohesion: float = MIN_COHESION,
+                    max_singletons: int = MAX_SINGLETONS, seed: int = 0) -> list[EntryCluster]:
+    """Cluster ``texts`` and summarize each cluster; clusters are ordered largest first.
+
+    Entries that normalize to the same text are clustered once and count
+    once per occurrence. Lexical features can't group entries that share no
+    words (``Dentist``, ``Magician``), and k-means lumps those into one
+    incoherent cluster whose label would be wrong for most members. Members
+    of clusters with a mean cosine similarity to their centroid below
+    ``min_cohesion`` therefore become single-entry clusters for the model to
+    place individually, up to ``max_singletons`` of them, loosest first.
+    """
+    positions: dict[str, list[int]] = {}
+    for index, text in enumerate(texts):
+        positions.setdefault(normalize_entry(text, loose=True), []).append(index)
+    unique = [texts[indices[0]] for indices in positions.values()]
+    members_of = list(positions.values())
+    if not unique:
+        return []
+    if len(unique) == 1:
+        return [EntryCluster(1, list(range(len(texts))), [unique[0][:MAX_EXEMPLAR_CHARS]])]
+
+    matrix, vocabulary = tfidf_matrix(unique)
+    labels, centroids = spherical_kmeans(matrix, k or default_cluster_count(len(unique)), seed=seed)
+    similarity = np.asarray(matrix @ centroids.T)
+    fit = similarity[np.arange(len(unique)), labels]
+
+    cohesion = np.array([fit[labels == cluster].mean() if (labels == cluster).any() else 1.0
+                         for cluster in range(centroids.shape[0])])
+    loose = np.flatnonzero(cohesion[labels] < min_cohesion)
+    loose = loose[np.argsort(fit[loose], kind="stable")][:max_singletons]
+    clusters = [EntryCluster(0, sorted(members_of[row]), [unique[row][:MAX_EXEMPLAR_CHARS]]) for row in loose]
+    labels = labels.copy()
+    labels[loose] = -1
+
+    for cluster in range(centroids.shape[0]):
+        rows = np.flatnonzero(labels == cluster)
+        if not len(rows):
+            continue
+        closest = rows[np.argsort(-similarity[rows, cluster], kind="stable")][:exemplars]
+        # Terms come from the word columns only; character n-grams don't read well
+        weights = centroids[cluster, :len(vocabulary)]
+        top = [vocabulary[i] for i in np.argsort(-weights, kind="stable")[:terms] if weights[i] > 0]
+        members = sorted(i for row in rows for i in members_of[row])
+        clusters.append(EntryCluster(0, members, [unique[i][:MAX_EXEMPLAR_CHARS] for i in closest], top))
+    clusters.sort(key=lambda c: (-c.size, c.members[0]))
+    for number, cluster in enumerate(clusters, 1):
+        cluster.id = number
+    return clusters
+
+
+def propagate_labels(clusters: Sequence[EntryCluster], assignments: dict[int, str], count: int,
+                     default: str = "uncategorized") -> list[str]:
+    """Give every entry its cluster's label; entries of unassigned clusters get ``default``."""
+    labels = [default] * count
+    for cluster in clusters:
+        label = assignments.get(cluster.id, default)
+        for index in cluster.members:
+            labels[index] = label
+    return labels
+
+
+# --- CLI --------------------------------------------------------------------
+
+
+def main() -> int:
+    from near_duplicates import load_entries
+
+    parser = argparse.ArgumentParser(description="Cluster a wildcard file's entries with TF-IDF and k-means.")
+    parser.add_argument("file", type=Path, help="Wildcard txt or YAML file")
+    parser.add_argument("--clusters", type=int, help="Number of clusters (default: about sqrt(entries / 2))")
+    parser.add_argument("--exemplars", type=int, default=DEFAULT_EXEMPLARS,
+                        help=f"Entries shown per cluster (default: {DEFAULT_EXEMPLARS})")
+    parser.add_argument("--seed", type=int, default=0, help="k-means++ seed (default: 0)")
+    parser.add_argument("--format", choices=["text", "json"], default="text",
+                        help="Output format (default: text)")
+    args = parser.parse_args()
+
+    if not args.file.is_file():
+        print(f"Error: File not found: {args.file}", file=sys.stderr)
+        return 1
+    texts = [entry.text for entry in load_entries(args.file)]
+    clusters = cluster_entries(texts, args.clusters, exemplars=args.exemplars, seed=args.seed)
+
+    if args.format == "json":
+        json.dump([{"id": c.id, "size": c.size, "terms": c.terms, "exemplars": c.exemplars}
+                   for c in clusters], sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return 0
+
+    print(f"{len(texts)} entries in {len(clusters)} clusters")
+    for cluster in clusters:
+        print(f"\n[{cluster.id}] {cluster.size} entries: {', '.join(cluster.terms)}")
+        for exemplar in cluster.exemplars:
+            print(f"    {exemplar}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,17 +2,26 @@
 # /// script
 # dependencies = [
 #   "dynamicprompts @ file:///mnt/d/dev/ai/dynamicprompts",
+#   "numpy",
 #   "pyyaml",
 # ]
 # ///
 
-import re
 import sys
 import argparse
 from collections import Counter, defaultdict
 from pathlib import Path
-from dynamicprompts.generators import RandomPromptGenerator
-from dynamicprompts.wildcards.wildcard_manager import WildcardManager
+
+from wildcard_analysis import ExactFrequencies, extract_words, filter_counts, template_sources
+from wildcard_engine import iter_chunked, load_engine
+
+
+def format_count(count):
+    """Format a word count; exact mode produces fractional expected counts."""
+    if isinstance(count, float):
+        return f"{count:6.1f}"
+    return f"{count:4d}"
+
 
 def main():
     parser = argparse.ArgumentParser(description='Analyze wildcard prompt generation frequencies')
@@ -24,6 +33,16 @@ def main():
     parser.add_argument('-w', '--wildcards-root', type=str,
                        default='wildcards',
                        help='Path to wildcards directory (default: wildcards)')
+    parser.add_argument('--engine', choices=['native', 'dynamicprompts'], default='native',
+                       help='Expansion engine: native precompiled index or dynamicprompts (default: native)')
+    parser.add_argument('--batch', action='store_true',
+                       help='Draw all wildcard choices at once with NumPy and count words from choice '
+                            'histograms instead of expanding every prompt (native engine only)')
+    parser.add_argument('--exact', action='store_true',
+                       help='Compute exact expected frequencies from the wildcard reference graph '
+                            'instead of sampling; counts are scaled to --num-gens (native engine only)')
+    parser.add_argument('--seed', type=int,
+                       help='Random seed for the native engine (optional)')
     parser.add_argument('-o', '--output', type=str,
                        help='Output file to save results (optional)')
     parser.add_argument('--debug', action='store_true',
@@ -77,6 +96,14 @@ def main():
         print("Error: under-weight-threshold must be between 0 and 1.")
         sys.exit(1)
 
+    if (args.batch or args.exact) and args.engine != 'native':
+        print("Error: --batch and --exact require the native engine.")
+        sys.exit(1)
+
+    if args.batch and args.exact:
+        print("Error: --batch and --exact are mutually exclusive.")
+        sys.exit(1)
+
     # Set up exclusion list (handle both old --blacklist and new --exclude)
     if args.no_blacklist or args.no_exclude:
         excluded_words = set()
@@ -102,69 +129,89 @@ def main():
 
     print(f"Analyzing prompt template: {PROMPT_TEMPLATE}")
     print(f"Using wildcards from: {WILDCARD_ROOT}")
-    print(f"Generating {NGENS} samples...")
+    if args.exact:
+        print(f"Computing exact frequencies (scaled to {NGENS} generations)...")
+    else:
+        print(f"Generating {NGENS} samples...")
     if args.debug:
         print("Debug mode enabled - will show first 5 generated prompts\n")
 
     # --- setup
-    wm = WildcardManager(WILDCARD_ROOT)
-    generator = RandomPromptGenerator(wildcard_manager=wm)
+    if args.engine == 'native':
+        generator = load_engine(WILDCARD_ROOT, seed=args.seed)
+    else:
+        from dynamicprompts.generators import RandomPromptGenerator
+        from dynamicprompts.wildcards.wildcard_manager import WildcardManager
 
-    # --- run generations
-    outputs = generator.generate(PROMPT_TEMPLATE, NGENS)
+        wm = WildcardManager(WILDCARD_ROOT)
+        generator = RandomPromptGenerator(wildcard_manager=wm)
 
     # --- track frequencies
     word_counts = Counter()
     source_counts = defaultdict(Counter)
+    sources = template_sources(PROMPT_TEMPLATE)
+
+    if args.exact:
+        # Expected occurrences per generation, propagated through the reference
+        # graph once; scale to NGENS so the report reads like a sampled run
+        frequencies = ExactFrequencies(generator)
+        for _, source, template_line in sources:
+            expected = filter_counts(frequencies.word_counts(template_line),
+                                     args.min_word_length, blacklist)
+            counts = Counter({w: c * NGENS for w, c in expected.items()})
+            word_counts.update(counts)
+            source_counts[source].update(counts)
+    elif args.batch:
+        from wildcard_sampling import BatchSampler
+
+        if args.debug:
+            for i, p in enumerate(generator.generate(PROMPT_TEMPLATE, min(5, NGENS))):
+                print(f"=== Generated prompt {i+1} ===")
+                print(p)
+                print()
+
+        # Count words per source line straight from the choice histograms
+        sampler = BatchSampler(generator, seed=args.seed)
+        for _, source, template_line in sources:
+            counts = filter_counts(sampler.word_counts(template_line, NGENS),
+                                   args.min_word_length, blacklist)
+            word_counts.update(counts)
+            source_counts[source].update(counts)
+    else:
+        # --- run generations lazily so memory stays flat for any --num-gens
+        if args.engine == 'native':
+            outputs = generator.iter_generate(PROMPT_TEMPLATE, NGENS)
+        else:
+            outputs = (p for chunk in iter_chunked(generator.generate, PROMPT_TEMPLATE, NGENS) for p in chunk)
 
-    # regex to ignore inline sets like {a|b|c}
-    brace_re = re.compile(r"\{[^{}]*\}")
-    # regex to match wildcard references
-    wild_re = re.compile(r"__([a-zA-Z0-9_/.-]+)__")
-
-    for i, p in enumerate(outputs):
-        if args.debug and i < 5:  # Print first 5 for debugging
-            print(f"=== Generated prompt {i+1} ===")
-            print(p)
-            print()
-
-        # Split the generated prompt into lines
-        generated_lines = p.strip().splitlines()
-        template_lines = PROMPT_TEMPLATE.strip().splitlines()
-
-        # Process each line of the template and match it to generated content
-        for template_idx, template_line in enumerate(template_lines):
-            template_line = template_line.strip().strip(",")
-            if not template_line or not template_line.startswith("__"):
-                continue
-
-            # Extract the wildcard source name
-            match = wild_re.match(template_line)
-            if not match:
-                continue
-            source = match.group(1)
-
-            # Get the corresponding generated line
-            if template_idx < len(generated_lines):
-                generated_line = generated_lines[template_idx].strip().strip(",")
-
-                # Remove any inline {a|b|c} sets from the generated content
-                clean_line = brace_re.sub("", generated_line)
-
-                # Extract words (letters, numbers, underscores)
-                words = re.findall(r"[a-zA-Z0-9_]+", clean_line.lower())
-
-                # Count words
-                for w in words:
-                    if len(w) >= args.min_word_length and w not in blacklist:  # Skip short words and blacklisted words
-                        word_counts[w] += 1
-                        source_counts[source][w] += 1
+        for i, p in enumerate(outputs):
+            if args.debug and i < 5:  # Print first 5 for debugging
+                print(f"=== Generated prompt {i+1} ===")
+                print(p)
+                print()
+
+            # Split the generated prompt into lines
+            generated_lines = p.strip().splitlines()
+
+            # Match each wildcard line of the template to its generated content
+            for template_idx, source, _ in sources:
+                if template_idx < len(generated_lines):
+                    generated_line = generated_lines[template_idx].strip().strip(",")
+
+                    # Count words, skipping short words and blacklisted words
+                    for w in extract_words(generated_line):
+                        if len(w) >= args.min_word_length and w not in blacklist:
+                            word_counts[w] += 1
+                            source_counts[source][w] += 1
 
     # --- report
     output_lines = []
-    output_lines.append(f"\n=== ANALYSIS RESULTS ({NGENS} generations) ===")
+    if args.exact:
+        output_lines.append(f"\n=== ANALYSIS RESULTS (exact, scaled to {NGENS} generations) ===")
+    else:
+        output_lines.append(f"\n=== ANALYSIS RESULTS ({NGENS} generations) ===")
     output_lines.append(f"Total unique words: {len(word_counts)}")
-    output_lines.append(f"Total word instances: {sum(word_counts.values())}")
+    output_lines.append(f"Total word instances: {format_count(sum(word_counts.values())).strip()}")
     if blacklist:
         output_lines.append(f"Excluded words: {', '.join(sorted(blacklist))}")
     else:
@@ -173,15 +220,15 @@ def main():
     output_lines.append(f"\n=== top {args.top_words} words overall ===")
     for word, count in word_counts.most_common(args.top_words):
         percentage = (count / NGENS) * 100
-        output_lines.append(f"{word:20s} {count:4d} ({percentage:5.1f}%)")
+        output_lines.append(f"{word:20s} {format_count(count)} ({percentage:5.1f}%)")
 
     output_lines.append("\n=== per-source summary ===")
     for src, counter in source_counts.items():
         total_words = sum(counter.values())
-        output_lines.append(f"\n[{src}] - {total_words} total words, top {args.top_per_source}:")
+        output_lines.append(f"\n[{src}] - {format_count(total_words).strip()} total words, top {args.top_per_source}:")
         for w, c in counter.most_common(args.top_per_source):
             percentage = (c / NGENS) * 100
-            output_lines.append(f"  {w:20s} {c:4d} ({percentage:5.1f}%)")
+            output_lines.append(f"  {w:20s} {format_count(c)} ({percentage:5.1f}%)")
 
     # --- identify potential issues
     output_lines.append("\n=== potential issues ===")
@@ -190,17 +237,19 @@ def main():
     for word, count in word_counts.most_common():
         if count > NGENS * args.over_weight_threshold:
             percentage = (count / NGENS) * 100
-            output_lines.append(f"  {word:20s} {count:4d} ({percentage:5.1f}%)")
+            output_lines.append(f"  {word:20s} {format_count(count)} ({percentage:5.1f}%)")
         else:
             break
 
     under_threshold_pct = args.under_weight_threshold * 100
     output_lines.append(f"\nWords appearing in <{under_threshold_pct:.0f}% of generations (may indicate under-weighting):")
-    rare_words = [(w, c) for w, c in word_counts.items() if c < NGENS * args.under_weight_threshold and c > 1]
+    # Sampled words seen once are mostly noise; exact frequencies have none, so keep every word
+    min_count = 0 if args.exact else 1
+    rare_words = [(w, c) for w, c in word_counts.items() if min_count < c < NGENS * args.under_weight_threshold]
     rare_words.sort(key=lambda x: x[1], reverse=True)
     for word, count in rare_words[:args.rare_words_limit]:
         percentage = (count / NGENS) * 100
-        output_lines.append(f"  {word:20s} {count:4d} ({percentage:5.1f}%)")
+        output_lines.append(f"  {word:20s} {format_count(count)} ({percentage:5.1f}%)")
 
     # Output results
     result_text = '\n'.join(output_lines)
@@ -7,27 +7,107 @@
 """
 Simple token counter that mimics Stable Diffusion 1.5's tokenization.
 SD 1.5 uses OpenAI's CLIP tokenizer with a maximum context length of 77 tokens.
+
+Batch counting tokenizes many texts per tokenizer call and memoizes per-entry
+counts on disk (.wc_cache/tokens/), keyed by a hash of the entry text, so
+repeated library reports only tokenize new or edited entries.
 """
 
 import argparse
+import hashlib
+import os
+import pickle
+import statistics
 import sys
-from typing import List, Optional
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
 
 try:
-    from transformers import CLIPTokenizer
+    from transformers import CLIPTokenizer, CLIPTokenizerFast
 except ImportError:
-    print("Error: transformers library not found. Install with: pip install transformers")
-    sys.exit(1)
+    CLIPTokenizer = CLIPTokenizerFast = None
+
+DEFAULT_MODEL = "openai/clip-vit-large-patch14"
+MAX_TOKENS = 77  # SD 1.5's maximum context length, including start/end tokens
+SPECIAL_TOKENS = 2
+BATCH_SIZE = 1024
+DEFAULT_WILDCARDS_ROOT = Path(__file__).resolve().parent.parent / "wildcards"
+
+
+@lru_cache(maxsize=None)
+def load_tokenizer(model_name: str = DEFAULT_MODEL):
+    """
+    Load the CLIP tokenizer once per process, preferring local files.
+
+    The locally cached copy is tried first so counting works offline; the hub
+    is only contacted when no cached copy exists. The fast (Rust) tokenizer is
+    used when available since it batches natively.
+    """
+    if CLIPTokenizer is None:
+        raise RuntimeError("transformers library not found. Install with: pip install transformers")
+    for tokenizer_class in (CLIPTokenizerFast, CLIPTokenizer):
+        for local_only in (True, False):
+            try:
+                tokenizer = tokenizer_class.from_pretrained(model_name, local_files_only=local_only)
+            except Exception:  # noqa: BLE001 - fall through to the next option
+                continue
+            # Counting never truncates, so don't warn about long inputs
+            tokenizer.model_max_length = sys.maxsize
+            return tokenizer
+    raise RuntimeError(f"Could not load tokenizer '{model_name}' from the local cache or the hub")
+
+
+def entry_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+def default_cache_path(model_name: str = DEFAULT_MODEL) -> Path:
+    slug = model_name.replace("/", "--")
+    return Path(__file__).resolve().parent.parent / ".wc_cache" / "tokens" / f"{slug}.pickle"
+
+
+class TokenCountCache:
+    """On-disk map of entry hash -> token count (without start/end tokens)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.counts: Dict[bytes, int] = {}
+        self._dirty = False
+        try:
+            with open(self.path, "rb") as f:
+                self.counts = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.counts = {}
+
+    def get(self, text: str) -> Optional[int]:
+        return self.counts.get(entry_key(text))
+
+    def put(self, text: str, count: int) -> None:
+        self.counts[entry_key(text)] = count
+        self._dirty = True
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self.counts, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
 
 
 class SD15TokenCounter:
     """Token counter that mimics Stable Diffusion 1.5's tokenization behavior."""
     
-    def __init__(self):
+    def __init__(self, model_name: str = DEFAULT_MODEL, cache_path: Optional[Path] = None,
+                 use_cache: bool = True):
         """Initialize with the same tokenizer used by SD 1.5."""
         # SD 1.5 uses OpenAI's CLIP tokenizer
-        self.tokenizer = CLIPTokenizer.from_pretrained("openai/clip-vit-large-patch14")
-        self.max_tokens = 77  # SD 1.5's maximum context length
+        self.tokenizer = load_tokenizer(model_name)
+        self.max_tokens = MAX_TOKENS
+        self.cache = TokenCountCache(cache_path or default_cache_path(model_name)) if use_cache else None
     
     def count_tokens(self, text: str) -> dict:
         """
@@ -55,6 +135,51 @@ class SD15TokenCounter:
             'tokens_over_limit': max(0, len(tokens) - self.max_tokens)
         }
     
+    def count_batch(self, texts: Iterable[str], add_special_tokens: bool = False) -> List[int]:
+        """
+        Count tokens for many texts, tokenizing only texts missing from the cache.
+
+        Counts exclude the start/end tokens unless ``add_special_tokens`` is set,
+        so entry counts can be summed into prompt lengths. New counts are
+        written to disk by :meth:`save_cache`.
+        """
+        texts = list(texts)
+        counts: Dict[str, int] = {}
+        missing = []
+        for text in dict.fromkeys(texts):
+            cached = self.cache.get(text) if self.cache is not None else None
+            if cached is None:
+                missing.append(text)
+            else:
+                counts[text] = cached
+
+        for start in range(0, len(missing), BATCH_SIZE):
+            batch = missing[start:start + BATCH_SIZE]
+            encoded = self.tokenizer(batch, add_special_tokens=False)["input_ids"]
+            for text, ids in zip(batch, encoded):
+                counts[text] = len(ids)
+                if self.cache is not None:
+                    self.cache.put(text, len(ids))
+
+        extra = SPECIAL_TOKENS if add_special_tokens else 0
+        return [counts[text] + extra for text in texts]
+
+    def save_cache(self):
+        """Persist token counts added since the cache was loaded."""
+        if self.cache is not None:
+            self.cache.save()
+
+    def print_batch_report(self, lines: List[str]):
+        """Print one summary line per prompt, counted in a single batch."""
+        counts = self.count_batch(lines, add_special_tokens=True)
+        over = 0
+        for i, (line, count) in enumerate(zip(lines, counts), 1):
+            flag = "!!" if count > self.max_tokens else "ok"
+            over += count > self.max_tokens
+            print(f"{i:5d}  {count:4d}/{self.max_tokens}  {flag}  {line}")
+        print("-" * 50)
+        print(f"{len(lines)} prompts, {over} over the {self.max_tokens}-token limit")
+
     def print_token_info(self, text: str, verbose: bool = False):
         """Print token information for the given text."""
         result = self.count_tokens(text)
@@ -75,6 +200,135 @@ class SD15TokenCounter:
         print("-" * 50)
 
 
+def _percentile(sorted_values: List[int], fraction: float) -> int:
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def library_report(counter: SD15TokenCounter, root: Path, entry_budget: int, top: int) -> int:
+    """
+    Print per-file token length distributions for every wildcard file under root.
+
+    The distribution columns cover plain entries. Entries containing wildcard
+    references, variants or variables are templated: their maximum expansion
+    is computed with :class:`wildcard_analysis.TokenLengthBounds`. Plain
+    entries and templates that can exceed ``entry_budget`` tokens are flagged,
+    since on their own they leave too little of the window for the rest of a
+    prompt; for a template, the entries its longest expansion picks are
+    listed too. Returns the number of flagged entries.
+    """
+    from wildcard_analysis import TokenLengthBounds
+    from wildcard_engine import Literal, WildcardEngine, WildcardIndex, parse_template
+
+    index = WildcardIndex.load_or_compile(root)
+    analyzer = TokenLengthBounds(WildcardEngine(index), counter.count_batch)
+    per_file: Dict[str, List[str]] = {}
+    templated: Dict[str, list] = {}
+    for rel_path in sorted(index.files):
+        record = index.files[rel_path]
+        plain: List[str] = []
+        templates = []
+        for key, collection in record.collections.items():
+            bounds = None
+            for value in collection:
+                # Only values that could hold template syntax need a parse
+                if ("__" not in value and "{" not in value and "$" not in value) or \
+                        all(type(node) is Literal for node in parse_template(value).parts):
+                    plain.append(value)
+                    continue
+                if bounds is None:
+                    try:
+                        bounds = dict(zip(index.get_values(key), analyzer.value_bounds(key)))
+                    except ValueError as e:
+                        print(f"Warning: {rel_path}: {key}: {e}", file=sys.stderr)
+                        bounds = {}
+                templates.append((value, bounds.get(value)))
+        if record.mapped:
+            plain.extend(index.line_index(rel_path))
+        per_file[rel_path] = plain
+        templated[rel_path] = templates
+
+    all_entries = [value for values in per_file.values() for value in values]
+    counts = dict(zip(all_entries, counter.count_batch(all_entries)))
+    index.close()
+
+    flagged = 0
+    print(f"{'file':60} {'n':>6} {'min':>4} {'med':>4} {'p95':>4} {'max':>4} {'tmpl':>5} {'over':>5}")
+    for rel_path, values in per_file.items():
+        lengths = sorted(counts[value] for value in values)
+        over = [value for value in values if counts[value] > entry_budget]
+        over_templates = [(value, bounds) for value, bounds in templated[rel_path]
+                          if bounds is not None and bounds.maximum > entry_budget]
+        flagged += len(over) + len(over_templates)
+        n_over = len(over) + len(over_templates)
+        if lengths:
+            print(f"{rel_path[:60]:60} {len(lengths):6d} {lengths[0]:4d} {int(statistics.median(lengths)):4d} "
+                  f"{_percentile(lengths, 0.95):4d} {lengths[-1]:4d} {len(templated[rel_path]):5d} {n_over:5d}")
+        else:
+            print(f"{rel_path[:60]:60} {0:6d} {'-':>4} {'-':>4} {'-':>4} {'-':>4} "
+                  f"{len(templated[rel_path]):5d} {n_over:5d}")
+        for value in sorted(over, key=counts.get, reverse=True)[:top]:
+            print(f"    {counts[value]:4d}  {value[:100]}")
+        for value, bounds in sorted(over_templates, key=lambda row: row[1].maximum, reverse=True)[:top]:
+            print(f"   <={bounds.maximum:4d}  {' '.join(value.split())[:100]}")
+            # The first step is the template itself; the rest are the entries it picks
+            for step in bounds.max_path[1:]:
+                print(f"            {step[:140]}")
+
+    print("-" * 50)
+    n_templates = sum(len(templates) for templates in templated.values())
+    print(f"{len(all_entries)} plain entries and {n_templates} templates in {len(per_file)} files; "
+          f"{flagged} can exceed {entry_budget} tokens (window: {MAX_TOKENS - SPECIAL_TOKENS} content tokens)")
+    return flagged
+
+
+def bounds_report(counter: SD15TokenCounter, root: Path, template: str, each: bool, top: int) -> int:
+    """
+    Print static token length bounds for a template, or for every value of a
+    wildcard path with ``each``. Returns how many can exceed the window.
+    """
+    from wildcard_analysis import TokenLengthBounds
+    from wildcard_engine import load_engine
+
+    engine = load_engine(root)
+    analyzer = TokenLengthBounds(engine, counter.count_batch)
+    try:
+        if each:
+            path = template.strip().strip("_")
+            values = engine.index.get_values(path)
+            if not values:
+                print(f"Error: Unknown wildcard path '{path}'")
+                return 0
+            rows = sorted(zip(analyzer.value_bounds(path), values), key=lambda row: row[0].maximum, reverse=True)
+            overflowing = 0
+            print(f"{'min':>5} {'exp':>7} {'max':>5}  value  (token counts include start/end)")
+            for bounds, value in rows:
+                overflowing += bounds.maximum + SPECIAL_TOKENS > counter.max_tokens
+            for bounds, value in rows[:top] if top else rows:
+                flag = "!!" if bounds.maximum + SPECIAL_TOKENS > counter.max_tokens else "  "
+                print(f"{bounds.minimum + SPECIAL_TOKENS:5d} {bounds.expected + SPECIAL_TOKENS:7.1f} "
+                      f"{bounds.maximum + SPECIAL_TOKENS:5d} {flag} {' '.join(value.split())[:100]}")
+            print("-" * 50)
+            print(f"{overflowing} of {len(values)} values can exceed {counter.max_tokens} tokens")
+            return overflowing
+
+        bounds = analyzer.bounds(template)
+        total_max = bounds.maximum + SPECIAL_TOKENS
+        print(f"Template: {' '.join(template.split())[:200]}")
+        print(f"Tokens (incl. start/end): min {bounds.minimum + SPECIAL_TOKENS}, "
+              f"expected {bounds.expected + SPECIAL_TOKENS:.1f}, max {total_max} / {counter.max_tokens}")
+        if total_max > counter.max_tokens:
+            print(f"⚠️  Can exceed the limit by up to {total_max - counter.max_tokens} tokens")
+        else:
+            print("✅ Always within token limit")
+        if bounds.max_path:
+            print("\nChoices reaching the maximum:")
+            for step in bounds.max_path:
+                print(f"  {step[:160]}")
+        return int(total_max > counter.max_tokens)
+    finally:
+        engine.index.close()
+
+
 def main():
     """Main function for command line usage."""
     parser = argparse.ArgumentParser(
@@ -85,6 +339,10 @@ Examples:
   python sd15_token_counter.py "a beautiful landscape"
   python sd15_token_counter.py --verbose "masterpiece, highly detailed"
   python sd15_token_counter.py --file prompts.txt
+  python sd15_token_counter.py --file prompts.txt --summary
+  python sd15_token_counter.py --library wildcards --entry-budget 40
+  python sd15_token_counter.py --bounds "__std/xl/omni/v1__"
+  python sd15_token_counter.py --bounds std/xl/omni/mygirls --each
         """
     )
     
@@ -99,21 +357,103 @@ Examples:
         help='Read text from file (one prompt per line)'
     )
     
+    parser.add_argument(
+        '--summary',
+        action='store_true',
+        help='With --file, print one line per prompt, counted in a single batch'
+    )
+
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
         help='Show detailed token information'
     )
     
+    parser.add_argument(
+        '--library',
+        nargs='?',
+        const=DEFAULT_WILDCARDS_ROOT,
+        type=Path,
+        metavar='ROOT',
+        help='Report token lengths for every wildcard file under ROOT (default: wildcards)'
+    )
+
+    parser.add_argument(
+        '--entry-budget',
+        type=int,
+        default=MAX_TOKENS - SPECIAL_TOKENS,
+        help='Flag library entries and templates that can exceed this many tokens (default: %(default)s)'
+    )
+
+    parser.add_argument(
+        '--top',
+        type=int,
+        default=5,
+        help='Flagged entries to list per file in the library report (default: 5)'
+    )
+
+    parser.add_argument(
+        '--bounds',
+        metavar='TEMPLATE',
+        help='Statically compute min/expected/max token length of a wildcard template'
+    )
+
+    parser.add_argument(
+        '--each',
+        action='store_true',
+        help='With --bounds, treat TEMPLATE as a wildcard path and report each of its values'
+    )
+
+    parser.add_argument(
+        '--wildcards-root', '-w',
+        type=Path,
+        default=DEFAULT_WILDCARDS_ROOT,
+        help='Wildcard directory used by --bounds (default: wildcards)'
+    )
+
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Do not read or write the on-disk token count cache'
+    )
+    
     args = parser.parse_args()
     
-    if not args.text and not args.file:
-        parser.error("Must provide either text or --file argument")
+    if not args.text and not args.file and not args.library and not args.bounds:
+        parser.error("Must provide either text, --file, --library or --bounds argument")
     
     # Initialize token counter
-    counter = SD15TokenCounter()
+    try:
+        counter = SD15TokenCounter(use_cache=not args.no_cache)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
     
-    if args.file:
+    try:
+        run(counter, args)
+    finally:
+        counter.save_cache()
+
+
+def run(counter: SD15TokenCounter, args):
+    """Dispatch to the mode selected on the command line."""
+    if args.library:
+        root = args.library.resolve()
+        if not root.is_dir():
+            print(f"Error: Wildcard directory '{root}' not found")
+            sys.exit(1)
+        library_report(counter, root, args.entry_budget, args.top)
+    elif args.bounds:
+        root = args.wildcards_root.resolve()
+        if not root.is_dir():
+            print(f"Error: Wildcard directory '{root}' not found")
+            sys.exit(1)
+        try:
+            bounds_report(counter, root, args.bounds, args.each, args.top)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    elif args.file:
         # Process file
         try:
             with open(args.file, 'r', encoding='utf-8') as f:
@@ -122,11 +462,14 @@ Examples:
             print(f"Processing {len(lines)} prompts from '{args.file}':")
             print("=" * 50)
             
-            for i, line in enumerate(lines, 1):
-                line = line.strip()
-                if line:  # Skip empty lines
-                    print(f"Prompt {i}:")
-                    counter.print_token_info(line, args.verbose)
+            if args.summary:
+                counter.print_batch_report([line.strip() for line in lines if line.strip()])
+            else:
+                for i, line in enumerate(lines, 1):
+                    line = line.strip()
+                    if line:  # Skip empty lines
+                        print(f"Prompt {i}:")
+                        counter.print_token_info(line, args.verbose)
                     
         except FileNotFoundError:
             print(f"Error: File '{args.file}' not found")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Run a DAG of dependent stages on a bounded thread pool.
+
+Each stage is a callable that receives the results of the stages it depends
+on. A stage is submitted as soon as its last dependency finishes (from that
+dependency's completion callback), so independent stages overlap and no
+thread is ever parked waiting on another stage. When a stage fails, every
+stage downstream of it fails with :class:`DependencyFailed` without running.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Hashable, Sequence
+
+
+class DependencyFailed(RuntimeError):
+    """A stage was skipped because a stage it depends on failed."""
+
+    def __init__(self, key: Hashable, cause: BaseException) -> None:
+        super().__init__(f"dependency {key!r} failed: {cause}")
+        self.key = key
+        self.cause = cause
+
+    @property
+    def root_cause(self) -> BaseException:
+        """The original failure, unwrapped through chains of skipped stages."""
+        cause = self.cause
+        while isinstance(cause, DependencyFailed):
+            cause = cause.cause
+        return cause
+
+
+class _Stage:
+    __slots__ = ("key", "func", "deps", "dependents", "waiting", "done", "result", "error")
+
+    def __init__(self, key: Hashable, func: Callable[..., Any], deps: Sequence[Hashable]) -> None:
+        self.key = key
+        self.func = func
+        self.deps = tuple(deps)
+        self.dependents: list[_Stage] = []
+        self.waiting = len(self.deps)
+        self.done = False
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class StageScheduler:
+    """Collect stages with :meth:`add`, then execute them all with :meth:`run`."""
+
+    def __init__(self, max_workers: int = 4,
+                 on_complete: Callable[[Hashable, Any, BaseException | None], None] | None = None) -> None:
+        self.max_workers = max(1, max_workers)
+        self.on_complete = on_complete
+        self._stages: dict[Hashable, _Stage] = {}
+        self._lock = threading.RLock()
+        self._pending = 0
+        self._finished = threading.Event()
+        self._pool: ThreadPoolExecutor | None = None
+
+    def add(self, key: Hashable, func: Callable[..., Any], deps: Sequence[Hashable] = ()) -> Hashable:
+        """Add a stage; ``func`` is called with the results of ``deps``, in order."""
+        if key in self._stages:
+            raise ValueError(f"Duplicate stage: {key!r}")
+        missing = [dep for dep in deps if dep not in self._stages]
+        if missing:
+            raise ValueError(f"Stage {key!r} depends on unknown stages: {missing}")
+        stage = _Stage(key, func, deps)
+        for dep in stage.deps:
+            self._stages[dep].dependents.append(stage)
+        self._stages[key] = stage
+        return key
+
+    def run(self) -> dict[Hashable, Any]:
+        """Run every stage and return ``{key: result}``; failed stages map to their exception."""
+        self._pending = len(self._stages)
+        if not self._pending:
+            return {}
+        self._finished.clear()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            self._pool = pool
+            with self._lock:
+                for stage in list(self._stages.values()):
+                    if not stage.deps:
+                        self._submit(stage)
+            self._finished.wait()
+        self._pool = None
+        return {key: stage.error if stage.error is not None else stage.result
+                for key, stage in self._stages.items()}
+
+    def _submit(self, stage: _Stage) -> None:
+        args = [self._stages[dep].result for dep in stage.deps]
+        future = self._pool.submit(stage.func, *args)
+        future.add_done_callback(lambda f, stage=stage: self._complete(stage, f))
+
+    def _complete(self, stage: _Stage, future: Future) -> None:
+        error = future.exception()
+        finished = [(stage, None if error else future.result(), error)]
+        with self._lock:
+            stage.result, stage.error, stage.done = finished[0][1], error, True
+            frontier = [stage]
+            while frontier:
+                current = frontier.pop()
+                for dependent in current.dependents:
+                    if dependent.done:
+                        continue
+                    if current.error is not None:
+                        # Skip the whole downstream subgraph without running it
+                        dependent.error = DependencyFailed(current.key, current.error)
+                        dependent.done = True
+                        finished.append((dependent, None, dependent.error))
+                        frontier.append(dependent)
+                        continue
+                    dependent.waiting -= 1
+                    if dependent.waiting == 0:
+                        self._submit(dependent)
+            self._pending -= len(finished)
+            all_done = self._pending == 0
+
+        try:
+            if self.on_complete is not None:
+                for done_stage, result, exc in finished:
+                    self.on_complete(done_stage.key, result, exc)
+        finally:
+            # Even if the hook raises, run() must not be left waiting forever
+            if all_done:
+                self._finished.set()
@@ -10,12 +10,17 @@ Text Transformer - Transform lines of text according to LLM prompts.
 Supports various transformation types with specialized system prompts.
 """
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
 import sys
 from pathlib import Path
 from tqdm import tqdm
 import json
 
+from checkpoint import CheckpointJournal, journal_path_for
+from llm_cache import ResponseCache
+from llm_telemetry import Telemetry
+
 def get_prompt_config():
     """Get predefined prompt types with simple identifiers and descriptions."""
     return {
@@ -100,11 +105,22 @@ def load_system_prompt(prompt_type):
         print(f"Error loading system prompt for '{prompt_type}': {e}", file=sys.stderr)
         return f"Transform the following text according to the '{prompt_type}' style."
 
-def transform_text(input_line, system_prompt, prompt_type, reasoning_effort="medium", verbose=False, output_format="default"):
-    """Transform text using an LLM according to the system prompt."""
-    # Initialize OpenAI client when needed
-    client = OpenAI()
+def create_client(base_url=None):
+    """Create one OpenAI client to share across all requests.
+
+    The client pools HTTP connections, so reusing it keeps connections alive
+    between calls instead of paying a new TLS handshake per line. ``base_url``
+    points it at any OpenAI-compatible server, e.g. a local stub for testing.
+    """
+    return OpenAI(base_url=base_url)
+
+def transform_text(input_line, system_prompt, prompt_type, reasoning_effort="medium", verbose=False, output_format="default", cache=None, client=None, raise_errors=False, telemetry=None, source=None):
+    """Transform text using an LLM according to the system prompt.
 
+    Errors are reported and the input line is returned unchanged, unless
+    ``raise_errors`` is set so callers can tell failures from results.
+    With ``telemetry``, the call is traced as a ``prompt_type`` span of ``source``.
+    """
     # Create the user message - use specific labels for certain prompt types
     type_labels = {
         "costume-booru": "Costume",
@@ -127,14 +143,35 @@ def transform_text(input_line, system_prompt, prompt_type, reasoning_effort="med
             "reasoning_effort": reasoning_effort
         }
 
-        response = client.chat.completions.create(**api_params)
-        output = response.choices[0].message.content
-
-        # If verbose mode is enabled, show reasoning
-        if verbose and hasattr(response.choices[0].message, 'reasoning'):
-            print(f"\n--- Reasoning for '{input_line.strip()}' ---")
-            print(response.choices[0].message.reasoning)
-            print("--- End Reasoning ---\n")
+        # Raw model output is cached so formatting changes never need a new call
+        cache_key = ResponseCache.make_key(
+            model=api_params["model"],
+            system_prompt=system_prompt,
+            user_prompt="",
+            reasoning_effort=reasoning_effort,
+            max_completion_tokens=api_params["max_completion_tokens"],
+        )
+        if telemetry is None:
+            telemetry = Telemetry("text_transformer", enabled=False)
+        with telemetry.span(prompt_type, model=api_params["model"], file=source) as span:
+            output = cache.get(cache_key) if cache is not None else None
+            span.cache_hit = output is not None
+
+            if output is None:
+                if client is None:
+                    client = OpenAI()
+                response = client.chat.completions.create(**api_params)
+                span.record_usage(response)
+                output = response.choices[0].message.content
+
+                # If verbose mode is enabled, show reasoning
+                if verbose and hasattr(response.choices[0].message, 'reasoning'):
+                    print(f"\n--- Reasoning for '{input_line.strip()}' ---")
+                    print(response.choices[0].message.reasoning)
+                    print("--- End Reasoning ---\n")
+
+                if output and cache is not None:
+                    cache.put(cache_key, output)
 
         if output:
             output = output.strip()
@@ -146,6 +183,8 @@ def transform_text(input_line, system_prompt, prompt_type, reasoning_effort="med
         else:
             return input_line.strip()
     except Exception as e:
+        if raise_errors:
+            raise
         print(f"Error processing '{input_line.strip()}': {e}", file=sys.stderr)
         return input_line.strip()
 
@@ -170,6 +209,7 @@ Examples:
   python text_transformer.py input.txt output.txt --type costume-booru
   python text_transformer.py poses.txt pose_tags.txt --type pose-booru --verbose
   python text_transformer.py descriptions.txt transformed.txt --type pose-xl --format plain
+  python text_transformer.py poses.txt pose_tags.txt --type pose-booru --concurrency 16
         """,
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
@@ -186,6 +226,17 @@ Examples:
                         help="Enable verbose reasoning output")
     parser.add_argument("--dry-run", action="store_true",
                         help="Show what would be processed without making API calls")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="Number of lines transformed in parallel (default: 8)")
+    parser.add_argument("--base-url",
+                        help="OpenAI-compatible API base URL (default: OPENAI_BASE_URL or api.openai.com)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Disable the shared LLM response cache (.llm_cache)")
+    parser.add_argument("--trace", type=Path,
+                        help="LLM call trace file (default: .wc_cache/llm_traces.jsonl)")
+    parser.add_argument("--no-trace", action="store_true", help="Don't record LLM call traces")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip lines already completed in the checkpoint journal of a previous run")
     args = parser.parse_args()
     
     if not available_prompts:
@@ -221,7 +272,6 @@ Examples:
     with open(input_path, 'r', encoding='utf-8') as f:
         lines = f.readlines()
 
-    results = []
     # Filter out empty lines for progress tracking
     non_empty_lines = [line.strip() for line in lines if line.strip()]
 
@@ -251,15 +301,55 @@ Examples:
             print(f"  ... and {len(non_empty_lines) - 3} more")
         return
 
-    for line in tqdm(non_empty_lines, desc=f"Transforming text", unit="line"):
-        transformed_line = transform_text(line, system_prompt, args.type, args.reasoning_effort, args.verbose, output_format)
-        results.append(transformed_line)
+    if args.concurrency < 1:
+        print("Error: --concurrency must be at least 1", file=sys.stderr)
+        sys.exit(1)
+
+    cache = ResponseCache(enabled=not args.no_cache)
+    client = create_client(args.base_url)
+    telemetry = Telemetry("text_transformer", args.trace, enabled=not args.no_trace)
+
+    # Every finished line is journaled immediately; the journal is removed
+    # once the output file has been written.
+    journal = CheckpointJournal(journal_path_for(output_path), resume=args.resume)
+
+    def line_key(line):
+        return CheckpointJournal.key(args.type, output_format, args.reasoning_effort, line)
+
+    pending = [line for line in dict.fromkeys(non_empty_lines) if line_key(line) not in journal]
+    if args.resume:
+        print(f"Resuming: {len(non_empty_lines) - len(pending)} lines already completed")
+
+    def transform(line):
+        try:
+            result = transform_text(line, system_prompt, args.type, args.reasoning_effort, args.verbose,
+                                    output_format, cache=cache, client=client, raise_errors=True,
+                                    telemetry=telemetry, source=input_path)
+        except Exception as e:
+            print(f"Error processing '{line}': {e}", file=sys.stderr)
+            return False
+        journal.record(line_key(line), result)
+        return True
+
+    with journal, ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        outcomes = list(tqdm(executor.map(transform, pending), total=len(pending),
+                             desc=f"Transforming text", unit="line"))
+
+    failed = outcomes.count(False)
+    # Output order follows the input; failed lines pass through unchanged
+    results = [journal.get(line_key(line), line) for line in non_empty_lines]
 
     with open(output_path, 'w', encoding='utf-8') as f:
         for result in results:
             f.write(result + '\n')
 
+    if failed:
+        print(f"{failed} lines failed and were copied unchanged; rerun with --resume to retry them",
+              file=sys.stderr)
+    else:
+        journal.discard()
     print(f"Completed! Results saved to {output_path}")
+    print(cache.stats.summary())
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -7,9 +7,11 @@
 # ///
 
 import argparse
+import random
+import sys
 from pathlib import Path
-from dynamicprompts.generators import RandomPromptGenerator
-from dynamicprompts.wildcards.wildcard_manager import WildcardManager
+
+from wildcard_engine import iter_chunked, iter_shards
 
 
 def main():
@@ -26,23 +28,62 @@ def main():
         default=100,
         help="Number of prompt variations to generate (default: 100)"
     )
+    parser.add_argument(
+        "--engine",
+        choices=["native", "dynamicprompts"],
+        default="native",
+        help="Expansion engine: native precompiled index or dynamicprompts (default: native)"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Random seed; output for a seed is the same for any --workers (default: random)"
+    )
+    parser.add_argument(
+        "-j", "--workers",
+        type=int,
+        default=1,
+        help="Number of worker processes for the native engine (default: 1)"
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="Write prompts to this file instead of stdout"
+    )
 
     args = parser.parse_args()
 
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1 and args.engine != "native":
+        parser.error("--workers requires the native engine")
+
     # Initialize wildcard manager with the wildcards directory
     # Get the script directory and navigate to the project root
     script_dir = Path(__file__).parent
     project_root = script_dir.parent
     wildcards_path = project_root / "wildcards"
-    wm = WildcardManager(wildcards_path)
 
     # Generate prompts
-    generator = RandomPromptGenerator(wildcard_manager=wm)
-    generated_prompts = generator.generate(args.prompt, args.count)
+    if args.engine == "native":
+        # Shards are seeded from --seed and streamed in order as they finish
+        seed = args.seed if args.seed is not None else random.randrange(2**63)
+        shards = iter_shards(wildcards_path, args.prompt, args.count, seed=seed, workers=args.workers)
+    else:
+        from dynamicprompts.generators import RandomPromptGenerator
+        from dynamicprompts.wildcards.wildcard_manager import WildcardManager
+
+        wm = WildcardManager(wildcards_path)
+        generator = RandomPromptGenerator(wildcard_manager=wm, seed=args.seed)
+        shards = iter_chunked(generator.generate, args.prompt, args.count)
 
-    # Output generated prompts
-    for p in generated_prompts:
-        print(p)
+    # Output generated prompts, one shard per buffered write
+    out = open(args.output, "w", encoding="utf-8", buffering=1 << 20) if args.output else sys.stdout
+    try:
+        for shard in shards:
+            out.write("".join(f"{p}\n" for p in shard))
+    finally:
+        if args.output:
+            out.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""Static analysis of wildcard templates.
+
+Holds the word extraction shared by the stress-test modes, the exact analytic
+mode, which computes expected per-word frequencies by propagating choice
+probabilities through the wildcard reference graph instead of sampling, and
+the token-length bounds built on the same propagation.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Callable, Iterable, Sequence
+
+from wildcard_engine import (
+    Literal,
+    Template,
+    Variant,
+    VariableAssign,
+    Wildcard,
+    WildcardEngine,
+    Wrap,
+    parse_template,
+)
+
+# regex to ignore inline sets like {a|b|c}
+BRACE_RE = re.compile(r"\{[^{}]*\}")
+# regex to match wildcard references
+WILD_RE = re.compile(r"__([a-zA-Z0-9_/.-]+)__")
+WORD_RE = re.compile(r"[a-zA-Z0-9_]+")
+
+
+def extract_words(text: str) -> list[str]:
+    """Lowercased words of a generated line, ignoring leftover {a|b} sets."""
+    return WORD_RE.findall(BRACE_RE.sub("", text).lower())
+
+
+def template_sources(template: str) -> list[tuple[int, str, str]]:
+    """Return ``(line_index, source, line)`` for template lines that start with a wildcard.
+
+    Only these lines are attributed to a source in the stress-test report.
+    """
+    sources = []
+    for index, line in enumerate(template.strip().splitlines()):
+        line = line.strip().strip(",")
+        if not line.startswith("__"):
+            continue
+        match = WILD_RE.match(line)
+        if match:
+            sources.append((index, match.group(1), line))
+    return sources
+
+
+def filter_counts(counts: Counter, min_word_length: int, excluded: Iterable[str]) -> Counter:
+    """Drop short and excluded words from a word counter."""
+    excluded = set(excluded)
+    return Counter({
+        word: count
+        for word, count in counts.items()
+        if len(word) >= min_word_length and word not in excluded
+    })
+
+
+def _add_scaled(target: Counter, source: Counter, scale: float) -> None:
+    for word, count in source.items():
+        target[word] += count * scale
+
+
+def inclusion_probabilities(weights: Sequence[float], low: int, high: int) -> list[float]:
+    """Probability that each option is picked by a ``{low-high$$...}`` variant.
+
+    The pick count is uniform over ``low..high`` and options are drawn without
+    replacement proportionally to their weights, like the engine does.
+    Uniform weights have the closed form E[k]/m. Weighted variants are solved
+    exactly with a DP over how many options of each distinct weight have been
+    drawn: options sharing a weight are interchangeable, so the state space
+    is polynomial in the number of options for a fixed number of distinct
+    weights (wildcard files use one or two).
+    """
+    m = len(weights)
+    expected_picks = (low + high) / 2
+    if m == 0 or high == 0:
+        return [0.0] * m
+    if all(weight == weights[0] for weight in weights):
+        return [expected_picks / m] * m
+
+    classes = sorted(set(weights))
+    sizes = [0] * len(classes)
+    class_of = [classes.index(weight) for weight in weights]
+    for c in class_of:
+        sizes[c] += 1
+
+    # distribution over (options drawn from each class) after each pick
+    states: dict[tuple[int, ...], float] = {(0,) * len(classes): 1.0}
+    expected = [0.0] * len(classes)
+    for picks in range(1, high + 1):
+        following: dict[tuple[int, ...], float] = defaultdict(float)
+        for state, p in states.items():
+            remaining = sum((sizes[c] - drawn) * classes[c] for c, drawn in enumerate(state))
+            if remaining <= 0:
+                following[state] += p
+                continue
+            for c, drawn in enumerate(state):
+                if drawn < sizes[c]:
+                    chance = (sizes[c] - drawn) * classes[c] / remaining
+                    following[state[:c] + (drawn + 1,) + state[c + 1:]] += p * chance
+        states = following
+        if picks >= low:
+            for state, p in states.items():
+                for c, drawn in enumerate(state):
+                    expected[c] += p * drawn / (high - low + 1)
+    return [expected[c] / sizes[c] for c in class_of]
+
+
+class ExactFrequencies:
+    """Exact expected word counts per expansion, propagated through the reference graph.
+
+    Each wildcard's expected word counter is the mean of its values' counters
+    (weighted by ``N::`` value weights), computed once and memoized, so a template is analyzed by walking its
+    reference graph a single time instead of sampling it. Variable semantics
+    match :class:`wildcard_sampling.BatchSampler`.
+    """
+
+    def __init__(self, engine: WildcardEngine) -> None:
+        self.engine = engine
+        self.index = engine.index
+        self._wildcards: dict[str, Counter] = {}
+        self._values: dict[str, Counter] = {}
+        self._literals: dict[str, Counter] = {}
+        self._active: list[str] = []
+
+    def word_counts(self, template: str) -> Counter:
+        """Return the expected number of occurrences of each word per expansion."""
+        return self._template(self.engine.parse(template), {})
+
+    def _literal(self, text: str) -> Counter:
+        words = self._literals.get(text)
+        if words is None:
+            words = Counter(extract_words(text))
+            self._literals[text] = words
+        return words
+
+    def _value(self, text: str, variables: dict[str, Template]) -> Counter:
+        if variables:
+            return self._template(self.engine.parse(text), variables)
+        counts = self._values.get(text)
+        if counts is None:
+            counts = self._template(self.engine.parse(text), variables)
+            self._values[text] = counts
+        return counts
+
+    def _mean_of_values(self, values: Sequence[str], weights: Sequence[float] | None,
+                        variables: dict[str, Template]) -> Counter:
+        mean: Counter = Counter()
+        if weights is None:
+            weights = [1.0] * len(values)
+        total = sum(weights)
+        for value, weight in zip(values, weights):
+            _add_scaled(mean, self._value(value, variables), weight / total)
+        return mean
+
+    def _wildcard(self, path: str, variables: dict[str, Template]) -> Counter:
+        values = self.index.get_values(path)
+        weights = self.index.get_weights(path)
+        if not values:
+            return self._literal(f"__{path}__")
+        if path in self._active:
+            cycle = " -> ".join(self._active[self._active.index(path):] + [path])
+            raise ValueError(f"Reference cycle: {cycle}")
+        if variables:
+            self._active.append(path)
+            try:
+                return self._mean_of_values(values, weights, variables)
+            finally:
+                self._active.pop()
+        counts = self._wildcards.get(path)
+        if counts is None:
+            self._active.append(path)
+            try:
+                counts = self._mean_of_values(values, weights, variables)
+            finally:
+                self._active.pop()
+            self._wildcards[path] = counts
+        return counts
+
+    def _template(self, template: Template, variables: dict[str, Template]) -> Counter:
+        counts: Counter = Counter()
+        for node in template.parts:
+            kind = type(node)
+            if kind is Literal:
+                _add_scaled(counts, self._literal(node.text), 1)
+            elif kind is Wildcard:
+                _add_scaled(counts, self._wildcard(node.path, variables), 1)
+            elif kind is Variant:
+                _add_scaled(counts, self._variant(node, variables), 1)
+            elif kind is VariableAssign:
+                variables = {**variables, node.name: node.value}
+            elif kind is Wrap:
+                _add_scaled(counts, self._template(node.wrapper, variables), 1)
+                _add_scaled(counts, self._template(node.inner, variables), 1)
+            else:
+                value = variables.get(node.name, node.default)
+                if value is None:
+                    _add_scaled(counts, self._literal(f"${{{node.name}}}"), 1)
+                else:
+                    _add_scaled(counts, self._template(value, variables), 1)
+        return counts
+
+    def _variant(self, variant: Variant, variables: dict[str, Template]) -> Counter:
+        counts: Counter = Counter()
+        values = self.engine._lone_wildcard_values(variant)
+        m = len(values) if values is not None else len(variant.options)
+        high = min(variant.max_count, m)
+        low = min(variant.min_count, high)
+
+        path = self.engine._lone_wildcard_path(variant)
+        weights = self.index.get_weights(path) if values is not None else None
+        if values is not None and (weights is None or low == high == 1):
+            # One draw, or uniform values: E[k] draws of the wildcard's mean
+            _add_scaled(counts, self._wildcard(path, variables), (low + high) / 2)
+        elif values is not None:
+            if path in self._active:
+                cycle = " -> ".join(self._active[self._active.index(path):] + [path])
+                raise ValueError(f"Reference cycle: {cycle}")
+            self._active.append(path)
+            try:
+                probabilities = inclusion_probabilities(weights, low, high)
+                for value, p in zip(values, probabilities):
+                    _add_scaled(counts, self._value(value, variables), p)
+            finally:
+                self._active.pop()
+        elif low == high == 1:
+            total = sum(variant.weights)
+            for option, weight in zip(variant.options, variant.weights):
+                _add_scaled(counts, self._template(option, variables), weight / total)
+        else:
+            probabilities = inclusion_probabilities(variant.weights, low, high)
+            for option, p in zip(variant.options, probabilities):
+                _add_scaled(counts, self._template(option, variables), p)
+
+        expected_separators = sum(max(k - 1, 0) for k in range(low, high + 1)) / (high - low + 1)
+        if expected_separators:
+            _add_scaled(counts, self._literal(variant.separator), expected_separators)
+        return counts
+
+
+@dataclass(frozen=True, slots=True)
+class TokenBounds:
+    """Token length range of a template fragment, plus the choices reaching the maximum."""
+
+    minimum: int
+    maximum: int
+    expected: float
+    max_path: tuple[str, ...] = ()
+
+
+def _concat_bounds(parts: Sequence[TokenBounds]) -> TokenBounds:
+    return TokenBounds(
+        sum(part.minimum for part in parts),
+        sum(part.maximum for part in parts),
+        sum(part.expected for part in parts),
+        tuple(step for part in parts for step in part.max_path),
+    )
+
+
+def _is_plain(value: str) -> bool:
+    if "__" not in value and "{" not in value and "$" not in value:
+        return True
+    return all(type(node) is Literal for node in parse_template(value).parts)
+
+
+class TokenLengthBounds:
+    """Exact min/max/expected token length of templates, without sampling.
+
+    Per-entry token counts come from ``count_tokens`` (a batch counter such as
+    :meth:`sd15_token_counter.SD15TokenCounter.count_batch`, counting without
+    start/end tokens) and are combined over the reference graph: a wildcard
+    spans its values' range, and a variant picks its cheapest or most
+    expensive options. Wildcard results are memoized, so a template library
+    costs one pass over the files it reaches.
+
+    Lengths are additive approximations: the length of a concatenation is
+    taken as the sum of its fragments' lengths. CLIP pre-tokenizes on
+    whitespace and punctuation, so this is exact whenever fragments meet at
+    such a boundary, which is how wildcard templates are written; words glued
+    across a fragment boundary (``__a__s``) may be off by a token, and a
+    wrap's ellipsis marker is still counted although expansion removes it.
+    """
+
+    def __init__(self, engine: WildcardEngine, count_tokens: Callable[[list[str]], list[int]]) -> None:
+        self.engine = engine
+        self.index = engine.index
+        self.count_tokens = count_tokens
+        self._literals: dict[str, int] = {}
+        self._wildcards: dict[str, list[TokenBounds]] = {}
+        self._active: list[str] = []
+
+    def bounds(self, template: str) -> TokenBounds:
+        """Return the token length bounds of one expansion of ``template``."""
+        return self._template(self.engine.parse(template), {})
+
+    def value_bounds(self, path: str) -> list[TokenBounds]:
+        """Return the bounds of each value of a wildcard, in file order."""
+        return self._wildcard_values(path, {})
+
+    def _literal(self, text: str) -> int:
+        count = self._literals.get(text)
+        if count is None:
+            count = self.count_tokens([text])[0] if text.strip() else 0
+            self._literals[text] = count
+        return count
+
+    def _fixed(self, text: str) -> TokenBounds:
+        count = self._literal(text)
+        return TokenBounds(count, count, float(count))
+
+    def _wildcard_values(self, path: str, variables: dict[str, Template]) -> list[TokenBounds]:
+        if not variables and path in self._wildcards:
+            return self._wildcards[path]
+        if path in self._active:
+            cycle = " -> ".join(self._active[self._active.index(path):] + [path])
+            raise ValueError(f"Reference cycle: {cycle}")
+
+        values = self.index.get_values(path)
+        self._active.append(path)
+        try:
+            plain = [value for value in values if _is_plain(value)]
+            plain_counts = dict(zip(plain, self.count_tokens(plain))) if plain else {}
+            result = []
+            for value in values:
+                count = plain_counts.get(value)
+                if count is not None:
+                    result.append(TokenBounds(count, count, float(count), (f"__{path}__ -> {value!r}",)))
+                else:
+                    inner = self._template(self.engine.parse(value), variables)
+                    result.append(TokenBounds(inner.minimum, inner.maximum, inner.expected,
+                                              (f"__{path}__ -> {value!r}",) + inner.max_path))
+        finally:
+            self._active.pop()
+        if not variables:
+            self._wildcards[path] = result
+        return result
+
+    def _wildcard(self, path: str, variables: dict[str, Template]) -> TokenBounds:
+        values = self._wildcard_values(path, variables)
+        if not values:
+            return self._fixed(f"__{path}__")
+        weights = self.index.get_weights(path) or [1.0] * len(values)
+        longest = max(values, key=lambda bounds: bounds.maximum)
+        return TokenBounds(
+            min(bounds.minimum for bounds in values),
+            longest.maximum,
+            sum(weight * bounds.expected for weight, bounds in zip(weights, values)) / sum(weights),
+            longest.max_path,
+        )
+
+    def _template(self, template: Template, variables: dict[str, Template]) -> TokenBounds:
+        parts = []
+        for node in template.parts:
+            kind = type(node)
+            if kind is Literal:
+                parts.append(self._fixed(node.text))
+            elif kind is Wildcard:
+                parts.append(self._wildcard(node.path, variables))
+            elif kind is Variant:
+                parts.append(self._variant(node, variables))
+            elif kind is VariableAssign:
+                variables = {**variables, node.name: node.value}
+            elif kind is Wrap:
+                parts.append(self._template(node.wrapper, variables))
+                parts.append(self._template(node.inner, variables))
+            else:
+                value = variables.get(node.name, node.default)
+                if value is None:
+                    parts.append(self._fixed(f"${{{node.name}}}"))
+                else:
+                    parts.append(self._template(value, variables))
+        return _concat_bounds(parts)
+
+    def _variant(self, variant: Variant, variables: dict[str, Template]) -> TokenBounds:
+        if self.engine._lone_wildcard_values(variant) is not None:
+            path = self.engine._lone_wildcard_path(variant)
+            options = self._wildcard_values(path, variables)
+            weights: Sequence[float] = self.index.get_weights(path) or [1.0] * len(options)
+        else:
+            options = []
+            for number, option in enumerate(variant.options, start=1):
+                bounds = self._template(option, variables)
+                options.append(TokenBounds(bounds.minimum, bounds.maximum, bounds.expected,
+                                           (f"{{...}} option {number}",) + bounds.max_path))
+            weights = variant.weights
+
+        m = len(options)
+        high = min(variant.max_count, m)
+        low = min(variant.min_count, high)
+        if high == 0:
+            return TokenBounds(0, 0, 0.0)
+        separator = self._literal(variant.separator)
+
+        # Lengths only grow with more picks, so the extremes use low and high picks
+        shortest = sorted(bounds.minimum for bounds in options)[:low]
+        longest = sorted(options, key=lambda bounds: bounds.maximum, reverse=True)[:high]
+        minimum = sum(shortest) + max(low - 1, 0) * separator
+        maximum = sum(bounds.maximum for bounds in longest) + (high - 1) * separator
+
+        if low == high == 1:
+            total = sum(weights)
+            probabilities = [weight / total for weight in weights]
+        else:
+            probabilities = inclusion_probabilities(weights, low, high)
+        expected_separators = sum(max(k - 1, 0) for k in range(low, high + 1)) / (high - low + 1)
+        expected = sum(p * bounds.expected for p, bounds in zip(probabilities, options))
+        expected += expected_separators * separator
+
+        max_path = tuple(step for bounds in longest for step in bounds.max_path)
+        return TokenBounds(minimum, maximum, expected, max_path)
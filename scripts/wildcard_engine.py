@@ -0,0 +1,877 @@
+#!/usr/bin/env -S uv run --quiet
+# /// script
+# dependencies = [
+#   "pyyaml",
+# ]
+# ///
+"""Native wildcard expansion engine backed by a precompiled wildcard index.
+
+The index compiles every txt and YAML file under ``wildcards/`` into a single
+pickled snapshot keyed by dynamicprompts-style paths such as
+``std/xl/outfit/garment_type``. Later runs load the snapshot instead of
+re-walking and re-parsing the tree, and only recompile files whose mtime or
+size changed since the snapshot was written. Large txt files (the ArtMix
+artist lists) are kept out of the snapshot and served from an mmapped
+line-offset index instead (see ``line_index.py``).
+
+Supported template syntax mirrors what the wildcard files actually use:
+
+- ``__path__`` and glob references such as ``__std/xl/*__``
+- variants ``{a|b|c}`` with ``N::`` weights
+- quantified variants ``{2$$a|b}``, ``{1-3$$a|b}``, ``{2$$ and $$a|b}``
+- variables ``${name=value}``, ``${name=!value}``, ``${name}``, ``${name:default}``
+- wraps ``%{wrapper$$inner}``: ``inner`` replaces the first ellipsis (``...``
+  or a unicode ellipsis) of the expanded wrapper
+
+As in dynamicprompts, ``N::`` weights on values are honored in YAML lists
+(``- 10::value`` or ``{text: value, weight: 10}``) but not in txt files.
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import fnmatch
+import hashlib
+import itertools
+import os
+import pickle
+import random
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator, Sequence, Union
+
+from line_index import LineIndex
+from wildcard_yaml import parse_yaml
+
+
+WILDCARD_SUFFIXES = {".txt", ".yaml", ".yml"}
+# txt files at least this large are mmapped through a line index, not pickled
+LARGE_FILE_BYTES = 256 * 1024
+MAX_DEPTH = 64
+# prompts per shard in sharded generation; fixed so output never depends on worker count
+SHARD_SIZE = 1000
+DEFAULT_SEPARATOR = ", "
+
+_PATH_RE = re.compile(r"[^\s{}|$]+")
+_QUANTIFIER_RE = re.compile(r"\s*(\d*)\s*(?:(-)\s*(\d*))?\s*\$\$")
+_SEPARATOR_RE = re.compile(r"([^{}|$]*)\$\$")
+_WEIGHT_RE = re.compile(r"\s*(\d+(?:\.\d+)?)\s*::")
+_VARIABLE_RE = re.compile(r"\$\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*")
+# the ellipsis a wrap's inner prompt is spliced into (same markers as dynamicprompts)
+WRAP_MARKER_RE = re.compile("[\u1801\u2026\u22ee\u22ef\u22f0\u22f1\ufe19]+|\\.{3,}")
+
+
+# --- template AST -----------------------------------------------------------
+
+
+@dataclass(frozen=True, slots=True)
+class Literal:
+    text: str
+
+
+@dataclass(frozen=True, slots=True)
+class Wildcard:
+    path: str
+
+
+@dataclass(frozen=True, slots=True)
+class Variant:
+    options: tuple["Template", ...]
+    weights: tuple[float, ...]
+    min_count: int = 1
+    max_count: int = 1
+    separator: str = DEFAULT_SEPARATOR
+
+
+@dataclass(frozen=True, slots=True)
+class VariableAssign:
+    name: str
+    value: "Template"
+    immediate: bool
+
+
+@dataclass(frozen=True, slots=True)
+class VariableRef:
+    name: str
+    default: "Template | None"
+
+
+@dataclass(frozen=True, slots=True)
+class Wrap:
+    wrapper: "Template"
+    inner: "Template"
+
+
+Node = Union[Literal, Wildcard, Variant, VariableAssign, VariableRef, Wrap]
+
+
+@dataclass(frozen=True, slots=True)
+class Template:
+    parts: tuple[Node, ...]
+
+
+def parse_template(text: str) -> Template:
+    """Parse a prompt template into a :class:`Template` AST."""
+    template, _ = _parse_sequence(text, 0, "")
+    return template
+
+
+def _parse_sequence(text: str, pos: int, stops: str) -> tuple[Template, int]:
+    """Parse until one of ``stops`` is found at nesting depth zero."""
+    parts: list[Node] = []
+    buf: list[str] = []
+    n = len(text)
+
+    def flush() -> None:
+        if buf:
+            parts.append(Literal("".join(buf)))
+            buf.clear()
+
+    while pos < n:
+        char = text[pos]
+        # "$" as a stop means the "$$" that ends a wrap's wrapper
+        if char in stops and (char != "$" or text.startswith("$$", pos)):
+            break
+        if char == "\\" and pos + 1 < n:
+            buf.append(text[pos + 1])
+            pos += 2
+            continue
+        if char == "{":
+            parsed = _parse_variant(text, pos)
+            if parsed is not None:
+                flush()
+                node, pos = parsed
+                parts.append(node)
+                continue
+        elif char == "$" and text.startswith("${", pos):
+            parsed = _parse_variable(text, pos)
+            if parsed is not None:
+                flush()
+                node, pos = parsed
+                parts.append(node)
+                continue
+        elif char == "%" and text.startswith("%{", pos):
+            parsed = _parse_wrap(text, pos)
+            if parsed is not None:
+                flush()
+                node, pos = parsed
+                parts.append(node)
+                continue
+        elif char == "_" and text.startswith("__", pos):
+            end = text.find("__", pos + 2)
+            if end != -1:
+                path = text[pos + 2:end]
+                if _PATH_RE.fullmatch(path):
+                    flush()
+                    parts.append(Wildcard(path))
+                    pos = end + 2
+                    continue
+        buf.append(char)
+        pos += 1
+
+    flush()
+    return Template(tuple(parts)), pos
+
+
+def _parse_variant(text: str, pos: int) -> tuple[Variant, int] | None:
+    """Parse ``{...}`` starting at ``pos``; return None if it is not closed."""
+    pos += 1
+    min_count = max_count = 1
+    separator = DEFAULT_SEPARATOR
+
+    quantifier = _QUANTIFIER_RE.match(text, pos)
+    if quantifier:
+        low, dash, high = quantifier.groups()
+        if dash:
+            min_count = int(low) if low else 1
+            max_count = int(high) if high else sys.maxsize
+        elif low:
+            min_count = max_count = int(low)
+        pos = quantifier.end()
+        sep_match = _SEPARATOR_RE.match(text, pos)
+        if sep_match:
+            separator = sep_match.group(1)
+            pos = sep_match.end()
+
+    options: list[Template] = []
+    weights: list[float] = []
+    while True:
+        weight = 1.0
+        weight_match = _WEIGHT_RE.match(text, pos)
+        if weight_match:
+            weight = float(weight_match.group(1))
+            pos = weight_match.end()
+        option, pos = _parse_sequence(text, pos, "|}")
+        if pos >= len(text):
+            return None
+        options.append(_strip_template(option))
+        weights.append(weight)
+        if text[pos] == "}":
+            pos += 1
+            break
+        pos += 1
+
+    return Variant(tuple(options), tuple(weights), min_count, max_count, separator), pos
+
+
+def _parse_wrap(text: str, pos: int) -> tuple[Wrap, int] | None:
+    """Parse ``%{wrapper$$inner}`` starting at ``pos``; return None if malformed."""
+    wrapper, pos = _parse_sequence(text, pos + 2, "$}")
+    if not text.startswith("$$", pos):
+        return None
+    inner, pos = _parse_sequence(text, pos + 2, "}")
+    if pos >= len(text):
+        return None
+    return Wrap(wrapper, inner), pos + 1
+
+
+def split_wrapper(text: str) -> tuple[str, str]:
+    """Split an expanded wrapper at its first ellipsis into ``(prefix, suffix)``.
+
+    A wrapper without a marker keeps its whole text as the prefix.
+    """
+    match = WRAP_MARKER_RE.search(text)
+    if match is None:
+        return text, ""
+    return text[:match.start()], text[match.end():]
+
+
+def _parse_variable(text: str, pos: int) -> tuple[Node, int] | None:
+    """Parse ``${name...}`` starting at ``pos``; return None if malformed."""
+    match = _VARIABLE_RE.match(text, pos)
+    if not match:
+        return None
+    name = match.group(1)
+    pos = match.end()
+    if pos >= len(text):
+        return None
+
+    if text[pos] == "}":
+        return VariableRef(name, None), pos + 1
+    if text[pos] == ":":
+        default, pos = _parse_sequence(text, pos + 1, "}")
+        if pos >= len(text):
+            return None
+        return VariableRef(name, default), pos + 1
+    if text[pos] == "=":
+        pos += 1
+        immediate = text.startswith("!", pos)
+        if immediate:
+            pos += 1
+        value, pos = _parse_sequence(text, pos, "}")
+        if pos >= len(text):
+            return None
+        return VariableAssign(name, _strip_template(value), immediate), pos + 1
+    return None
+
+
+def _strip_template(template: Template) -> Template:
+    """Strip surrounding whitespace from a variant option or variable value."""
+    parts = list(template.parts)
+    if parts and isinstance(parts[0], Literal):
+        parts[0] = Literal(parts[0].text.lstrip())
+    if parts and isinstance(parts[-1], Literal):
+        parts[-1] = Literal(parts[-1].text.rstrip())
+    return Template(tuple(part for part in parts if not (isinstance(part, Literal) and not part.text)))
+
+
+# --- wildcard index ---------------------------------------------------------
+
+
+@dataclass(slots=True)
+class FileRecord:
+    """Compiled contents of one wildcard file plus the stamp it was built from."""
+
+    mtime_ns: int
+    size: int
+    collections: dict[str, tuple[str, ...]]
+    # wildcard paths served from this file through a LineIndex
+    mapped: tuple[str, ...] = ()
+    # per-value weights, only for collections with an ``N::`` weighted value
+    weights: dict[str, tuple[float, ...]] = field(default_factory=dict)
+
+
+def default_snapshot_path(root: Path) -> Path:
+    """Return the snapshot location for a wildcard root (next to it, in .wc_cache)."""
+    root = Path(root).resolve()
+    return root.parent / ".wc_cache" / f"{root.name}.index.pickle"
+
+
+def iter_wildcard_files(root: Path) -> Iterator[tuple[str, os.stat_result]]:
+    """Yield ``(relative_posix_path, stat)`` for every wildcard file under root."""
+    stack = [Path(root)]
+    root_str = str(Path(root))
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=True):
+                    stack.append(Path(entry.path))
+                elif os.path.splitext(entry.name)[1].lower() in WILDCARD_SUFFIXES:
+                    rel = os.path.relpath(entry.path, root_str).replace(os.sep, "/")
+                    yield rel, entry.stat()
+
+
+def parse_text_values(content: str) -> tuple[str, ...]:
+    """Return the entries of a txt wildcard file (blank and # lines skipped).
+
+    Repeated entries are kept once, in first-seen order, as dynamicprompts does.
+    """
+    values = []
+    for line in content.splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            values.append(line)
+    return tuple(dict.fromkeys(values))
+
+
+def parse_weighted_value(item: str) -> tuple[float, str]:
+    """Split a structured list item into ``(weight, value)``.
+
+    Follows dynamicprompts: an item starting with a digit and containing
+    ``::`` is weighted (``10::value``); if the prefix is not a number the
+    item is kept as-is with weight 1.
+    """
+    if item[:1].isdigit() and "::" in item:
+        weight_text, _, value = item.rpartition("::")
+        try:
+            return float(weight_text), value
+        except ValueError:
+            pass
+    return 1.0, item
+
+
+def _collect_structured(prefix: str, data: object, out: dict[str, list[tuple[float, str]]]) -> None:
+    if isinstance(data, dict):
+        for key, value in data.items():
+            _collect_structured(f"{prefix}/{key}" if prefix else str(key), value, out)
+    elif isinstance(data, list):
+        values = out.setdefault(prefix, [])
+        for item in data:
+            if isinstance(item, dict) and isinstance(item.get("text") or item.get("content"), str):
+                # {text: value, weight: 10} items
+                values.append((float(item.get("weight", 1)), item.get("text") or item["content"]))
+            elif isinstance(item, (dict, list)):
+                _collect_structured(prefix, item, out)
+            elif item is not None:
+                values.append(parse_weighted_value(str(item)))
+    elif data is not None:
+        out.setdefault(prefix, []).append((1.0, str(data)))
+
+
+def compile_file(root: Path, rel_path: str) -> tuple[dict[str, tuple[str, ...]], dict[str, tuple[float, ...]]]:
+    """Compile one wildcard file into ``({wildcard_path: values}, {wildcard_path: weights})``.
+
+    Weights are only returned for collections where some value is not weight 1.
+    A value listed more than once is kept at its first position with the
+    weights of all its listings summed, so it stays as likely as before.
+    """
+    path = Path(root) / rel_path
+    content = path.read_text(encoding="utf-8")
+    stem_path, suffix = os.path.splitext(rel_path)
+
+    if suffix.lower() == ".txt":
+        return {stem_path: parse_text_values(content)}, {}
+
+    # Structured files are rooted at their parent directory: by convention the
+    # top-level key repeats the file name (outfit.yaml -> outfit: ...).
+    data = parse_yaml(content)
+    parent = os.path.dirname(rel_path)
+    collected: dict[str, list[tuple[float, str]]] = {}
+    _collect_structured(parent, data, collected)
+    merged: dict[str, dict[str, float]] = {}
+    for key, items in collected.items():
+        totals = merged[key] = {}
+        for weight, value in items:
+            totals[value] = totals.get(value, 0.0) + weight
+    collections = {key: tuple(totals) for key, totals in merged.items()}
+    weights = {
+        key: tuple(totals.values())
+        for key, totals in merged.items()
+        if any(weight != 1.0 for weight in totals.values())
+    }
+    return collections, weights
+
+
+class ConcatValues(Sequence[str]):
+    """Read-only concatenation of value sequences (glob matches, mapped files)."""
+
+    def __init__(self, parts: Sequence[Sequence[str]]) -> None:
+        self.parts = [part for part in parts if len(part)]
+        self._offsets = []
+        total = 0
+        for part in self.parts:
+            self._offsets.append(total)
+            total += len(part)
+        self._len = total
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, i):  # type: ignore[override]
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._len))]
+        if i < 0:
+            i += self._len
+        if not 0 <= i < self._len:
+            raise IndexError("value index out of range")
+        part = bisect.bisect_right(self._offsets, i) - 1
+        return self.parts[part][i - self._offsets[part]]
+
+
+class WildcardIndex:
+    """All wildcard collections of a tree, keyed by ``std/xl/outfit/all`` style paths."""
+
+    VERSION = 4
+
+    def __init__(self, root: Path, files: dict[str, FileRecord]) -> None:
+        # Resolved, so a snapshot is valid whatever directory it is used from
+        self.root = Path(root).resolve()
+        self.files = files
+        self.collections: dict[str, tuple[str, ...]] = {}
+        self.mapped: dict[str, str] = {}
+        # parallel to collections, only for keys with a weighted value
+        self.weights: dict[str, tuple[float, ...]] = {}
+        for rel_path in sorted(files):
+            record = files[rel_path]
+            for key, values in record.collections.items():
+                existing = self.collections.get(key, ())
+                if key in record.weights or key in self.weights:
+                    before = self.weights.get(key, (1.0,) * len(existing))
+                    self.weights[key] = before + record.weights.get(key, (1.0,) * len(values))
+                self.collections[key] = existing + values if existing else values
+            for key in record.mapped:
+                self.mapped[key] = rel_path
+        self.line_index_dir = default_snapshot_path(self.root).parent / "lines" / self.root.resolve().name
+        self._line_indexes: dict[str, LineIndex] = {}
+        self._glob_cache: dict[str, Sequence[str]] = {}
+        self._weight_cache: dict[str, tuple[float, ...] | None] = {}
+
+    @classmethod
+    def compile(cls, root: Path, previous: "WildcardIndex | None" = None) -> "WildcardIndex":
+        """Compile the tree, reusing records from ``previous`` for unchanged files."""
+        old_files = previous.files if previous is not None else {}
+        files: dict[str, FileRecord] = {}
+        for rel_path, stat in iter_wildcard_files(root):
+            old = old_files.get(rel_path)
+            if old is not None and old.mtime_ns == stat.st_mtime_ns and old.size == stat.st_size:
+                files[rel_path] = old
+                continue
+            if rel_path.lower().endswith(".txt") and stat.st_size >= LARGE_FILE_BYTES:
+                files[rel_path] = FileRecord(stat.st_mtime_ns, stat.st_size, {}, (os.path.splitext(rel_path)[0],))
+            else:
+                collections, weights = compile_file(root, rel_path)
+                files[rel_path] = FileRecord(stat.st_mtime_ns, stat.st_size, collections, weights=weights)
+        return cls(root, files)
+
+    @classmethod
+    def load(cls, snapshot_path: Path, root: Path | None = None) -> "WildcardIndex":
+        """Load a snapshot; with ``root``, reject one that was built for another tree."""
+        with open(snapshot_path, "rb") as f:
+            version, saved_root, files = pickle.load(f)
+        if version != cls.VERSION:
+            raise ValueError(f"Unsupported wildcard snapshot version: {version}")
+        if root is None:
+            root = Path(saved_root)
+        elif Path(saved_root) != Path(root).resolve():
+            raise ValueError(f"Wildcard snapshot was built for {saved_root}, not {Path(root).resolve()}")
+        return cls(root, files)
+
+    def save(self, snapshot_path: Path) -> None:
+        """Write the snapshot atomically so concurrent readers never see a partial file."""
+        snapshot_path = Path(snapshot_path)
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = snapshot_path.with_name(f"{snapshot_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump((self.VERSION, str(self.root.resolve()), self.files), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, snapshot_path)
+
+    @classmethod
+    def load_or_compile(cls, root: Path, snapshot_path: Path | None = None) -> "WildcardIndex":
+        """Load the snapshot for ``root``, recompiling changed files if it is stale."""
+        root = Path(root).resolve()
+        snapshot_path = Path(snapshot_path) if snapshot_path else default_snapshot_path(root)
+
+        previous = None
+        if snapshot_path.exists():
+            try:
+                previous = cls.load(snapshot_path, root)
+            except Exception:  # noqa: BLE001 - unreadable or other-root snapshots are rebuilt
+                previous = None
+
+        if previous is not None and previous.is_current():
+            return previous
+
+        index = cls.compile(root, previous)
+        try:
+            index.save(snapshot_path)
+        except OSError as exc:
+            print(f"Warning: could not write wildcard snapshot {snapshot_path}: {exc}", file=sys.stderr)
+        return index
+
+    def is_current(self) -> bool:
+        """Return True if no file under the root was added, removed or modified."""
+        seen = 0
+        for rel_path, stat in iter_wildcard_files(self.root):
+            record = self.files.get(rel_path)
+            if record is None or record.mtime_ns != stat.st_mtime_ns or record.size != stat.st_size:
+                return False
+            seen += 1
+        return seen == len(self.files)
+
+    def line_index(self, rel_path: str) -> LineIndex:
+        """Open (once) the mmapped line index for a large txt file."""
+        lines = self._line_indexes.get(rel_path)
+        if lines is None:
+            lines = LineIndex(self.root / rel_path, self.line_index_dir / f"{rel_path}.lidx")
+            self._line_indexes[rel_path] = lines
+        return lines
+
+    def keys(self) -> list[str]:
+        """Return every wildcard path in the index, sorted."""
+        return sorted(self.collections.keys() | self.mapped.keys())
+
+    def get_values(self, path: str) -> Sequence[str]:
+        """Return the values for a wildcard path; globs return the union of matches."""
+        values = self.collections.get(path)
+        if values is not None and path not in self.mapped:
+            return values
+        cached = self._glob_cache.get(path)
+        if cached is not None:
+            return cached
+        keys = self.resolve_keys(path)
+        if len(keys) == 1:
+            cached = self._key_values(keys[0])
+        else:
+            cached = ConcatValues([self._key_values(key) for key in keys]) if keys else ()
+        self._glob_cache[path] = cached
+        return cached
+
+    def resolve_keys(self, path: str) -> list[str]:
+        """Return the keys ``path`` refers to, the way dynamicprompts matches them.
+
+        An exact key wins; otherwise ``path`` is matched as a glob, and a path
+        that matches nothing is retried as ``**/<path>`` so that references
+        relative to a nested directory still resolve.
+        """
+        if path in self.collections or path in self.mapped:
+            return [path]
+        keys = []
+        if any(char in path for char in "*?["):
+            keys = [key for key in self.keys() if fnmatch.fnmatchcase(key, path)]
+        if not keys and not path.startswith("**"):
+            keys = [key for key in self.keys() if fnmatch.fnmatchcase(key, f"**/{path}")]
+        return keys
+
+    def get_weights(self, path: str) -> tuple[float, ...] | None:
+        """Return per-value weights parallel to :meth:`get_values`, or None if all are 1."""
+        if not self.weights:
+            return None
+        if path in self._weight_cache:
+            return self._weight_cache[path]
+        keys = self.resolve_keys(path)
+        weights = None
+        if any(key in self.weights for key in keys):
+            parts = []
+            for key in keys:
+                parts.append(self.weights.get(key) or (1.0,) * len(self.collections.get(key, ())))
+                if key in self.mapped:
+                    parts.append((1.0,) * len(self.line_index(self.mapped[key])))
+            weights = tuple(weight for part in parts for weight in part)
+        self._weight_cache[path] = weights
+        return weights
+
+    def _key_values(self, key: str) -> Sequence[str]:
+        parts: list[Sequence[str]] = []
+        if key in self.collections:
+            parts.append(self.collections[key])
+        if key in self.mapped:
+            parts.append(self.line_index(self.mapped[key]))
+        return parts[0] if len(parts) == 1 else ConcatValues(parts)
+
+    def close(self) -> None:
+        for lines in self._line_indexes.values():
+            lines.close()
+        self._line_indexes.clear()
+        self._glob_cache.clear()
+        self._weight_cache.clear()
+
+    def __contains__(self, path: str) -> bool:
+        return bool(self.get_values(path))
+
+    def __len__(self) -> int:
+        return len(self.collections.keys() | self.mapped.keys())
+
+
+# --- expansion --------------------------------------------------------------
+
+
+class WildcardEngine:
+    """Expand templates against a :class:`WildcardIndex`."""
+
+    def __init__(self, index: WildcardIndex, *, seed: int | None = None) -> None:
+        self.index = index
+        self.rng = random.Random(seed)
+        self._parsed: dict[str, Template] = {}
+        self._cum_weights: dict[str, list[float]] = {}
+
+    def parse(self, text: str) -> Template:
+        """Parse ``text``, memoizing the AST (wildcard values repeat constantly)."""
+        template = self._parsed.get(text)
+        if template is None:
+            template = parse_template(text)
+            self._parsed[text] = template
+        return template
+
+    def expand(self, template: str) -> str:
+        """Expand one prompt from ``template``."""
+        out: list[str] = []
+        self._render(self.parse(template), {}, out, 0)
+        return "".join(out)
+
+    def generate(self, template: str, count: int) -> list[str]:
+        """Expand ``count`` prompts from ``template``."""
+        return list(self.iter_generate(template, count))
+
+    def iter_generate(self, template: str, count: int) -> Iterator[str]:
+        """Lazily expand ``count`` prompts from ``template``, one at a time."""
+        parsed = self.parse(template)
+        for _ in range(count):
+            out: list[str] = []
+            self._render(parsed, {}, out, 0)
+            yield "".join(out)
+
+    def _render(self, template: Template, variables: dict[str, Template], out: list[str], depth: int) -> None:
+        if depth > MAX_DEPTH:
+            raise RuntimeError("Wildcard expansion exceeded maximum depth (reference cycle?)")
+        for node in template.parts:
+            kind = type(node)
+            if kind is Literal:
+                out.append(node.text)
+            elif kind is Wildcard:
+                values = self.index.get_values(node.path)
+                if not values:
+                    out.append(f"__{node.path}__")
+                    continue
+                value = values[self._pick_index(node.path, len(values))]
+                self._render(self.parse(value), variables, out, depth + 1)
+            elif kind is Variant:
+                self._render_variant(node, variables, out, depth)
+            elif kind is VariableAssign:
+                if node.immediate:
+                    rendered: list[str] = []
+                    self._render(node.value, variables, rendered, depth + 1)
+                    variables[node.name] = Template((Literal("".join(rendered)),))
+                else:
+                    variables[node.name] = node.value
+            elif kind is Wrap:
+                wrapper: list[str] = []
+                self._render(node.wrapper, variables, wrapper, depth + 1)
+                prefix, suffix = split_wrapper("".join(wrapper))
+                out.append(prefix)
+                self._render(node.inner, variables, out, depth + 1)
+                out.append(suffix)
+            else:
+                value = variables.get(node.name, node.default)
+                if value is None:
+                    out.append(f"${{{node.name}}}")
+                else:
+                    self._render(value, variables, out, depth + 1)
+
+    def _pick_index(self, path: str, n: int) -> int:
+        """Pick one of the ``n`` values of a wildcard, honoring ``N::`` weights."""
+        weights = self.index.get_weights(path)
+        if weights is None:
+            return self.rng.randrange(n)
+        cum_weights = self._cum_weights.get(path)
+        if cum_weights is None:
+            cum_weights = self._cum_weights[path] = list(itertools.accumulate(weights))
+        return bisect.bisect_right(cum_weights, self.rng.random() * cum_weights[-1])
+
+    @staticmethod
+    def _lone_wildcard_path(variant: Variant) -> str | None:
+        """Path of a variant whose only option is a wildcard, e.g. ``{2$$__a__}``."""
+        options = variant.options
+        if len(options) == 1 and len(options[0].parts) == 1 and type(options[0].parts[0]) is Wildcard:
+            return options[0].parts[0].path
+        return None
+
+    def _lone_wildcard_values(self, variant: Variant) -> Sequence[str] | None:
+        """Values of a variant whose only option is a wildcard, e.g. ``{2$$__a__}``."""
+        path = self._lone_wildcard_path(variant)
+        if path is None:
+            return None
+        return self.index.get_values(path) or None
+
+    def _render_variant(self, variant: Variant, variables: dict[str, Template], out: list[str], depth: int) -> None:
+        # A lone wildcard option means "pick from the wildcard's values"; index
+        # into them directly so mmapped files are never materialized.
+        values = self._lone_wildcard_values(variant)
+        n = len(values) if values is not None else len(variant.options)
+
+        if variant.max_count == 1 and variant.min_count == 1:
+            if values is not None:
+                index = self._pick_index(self._lone_wildcard_path(variant), n)
+                self._render(self.parse(values[index]), variables, out, depth + 1)
+                return
+            weights = variant.weights
+            if n == 1:
+                chosen = variant.options[0]
+            elif all(weight == 1.0 for weight in weights):
+                chosen = variant.options[self.rng.randrange(n)]
+            else:
+                chosen = self.rng.choices(variant.options, weights=weights)[0]
+            self._render(chosen, variables, out, depth + 1)
+            return
+
+        high = min(variant.max_count, n)
+        low = min(variant.min_count, high)
+        count = self.rng.randint(low, high)
+        if values is not None:
+            weights = self.index.get_weights(self._lone_wildcard_path(variant))
+            if weights is None:
+                picked = self.rng.sample(range(n), count)
+            else:
+                picked = _weighted_sample(self.rng, n, weights, count)
+        else:
+            picked = _weighted_sample(self.rng, n, variant.weights, count)
+        for i, option_index in enumerate(picked):
+            if i:
+                out.append(variant.separator)
+            option = self.parse(values[option_index]) if values is not None else variant.options[option_index]
+            self._render(option, variables, out, depth + 1)
+
+
+def _weighted_sample(rng: random.Random, n: int, weights: Sequence[float], count: int) -> list[int]:
+    """Pick ``count`` distinct indices in ``range(n)``, proportionally to weights."""
+    if all(weight == 1.0 for weight in weights):
+        return rng.sample(range(n), count)
+    remaining = list(range(n))
+    remaining_weights = list(weights)
+    picked = []
+    for _ in range(count):
+        i = rng.choices(range(len(remaining)), weights=remaining_weights)[0]
+        picked.append(remaining.pop(i))
+        remaining_weights.pop(i)
+    return picked
+
+
+def load_engine(root: Path, *, seed: int | None = None, snapshot_path: Path | None = None) -> WildcardEngine:
+    """Load (or build) the index snapshot for ``root`` and return an engine over it."""
+    return WildcardEngine(WildcardIndex.load_or_compile(root, snapshot_path), seed=seed)
+
+
+def iter_chunked(generate: Callable[[str, int], list[str]], template: str, count: int,
+                 chunk_size: int = SHARD_SIZE) -> Iterator[list[str]]:
+    """Call a list-returning ``generate(template, n)`` in bounded chunks.
+
+    Lets generators that only offer a batch API (dynamicprompts) stream
+    without holding every prompt in memory.
+    """
+    for start in range(0, count, chunk_size):
+        yield generate(template, min(chunk_size, count - start))
+
+
+def shard_seed(seed: int, shard: int) -> int:
+    """Derive a reproducible, independent seed for one shard of a run."""
+    digest = hashlib.sha256(f"{seed}:{shard}".encode()).digest()
+    return int.from_bytes(digest[:8], "little")
+
+
+_worker_engine: WildcardEngine | None = None
+
+
+def _init_worker(root: Path, snapshot_path: Path | None) -> None:
+    global _worker_engine
+    _worker_engine = load_engine(root, snapshot_path=snapshot_path)
+
+
+def _generate_shard(template: str, seed: int, count: int) -> list[str]:
+    _worker_engine.rng.seed(seed)
+    return _worker_engine.generate(template, count)
+
+
+def iter_shards(
+    root: Path,
+    template: str,
+    count: int,
+    *,
+    seed: int,
+    workers: int = 1,
+    shard_size: int = SHARD_SIZE,
+    snapshot_path: Path | None = None,
+) -> Iterator[list[str]]:
+    """Yield prompts shard by shard, in order, generating shards across processes.
+
+    Shard ``i`` is always seeded with ``shard_seed(seed, i)``, so the output for
+    a given seed is identical for any number of workers. At most two shards
+    per worker are in flight, which keeps memory flat for very large counts.
+    """
+    shards = ((i, min(shard_size, count - start)) for i, start in enumerate(range(0, count, shard_size)))
+
+    if workers <= 1:
+        engine = load_engine(root, snapshot_path=snapshot_path)
+        for i, size in shards:
+            engine.rng.seed(shard_seed(seed, i))
+            yield engine.generate(template, size)
+        return
+
+    # Bring the snapshot up to date once so workers don't all recompile it
+    WildcardIndex.load_or_compile(root, snapshot_path).close()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(root, snapshot_path)) as pool:
+        pending: deque = deque()
+        for i, size in shards:
+            pending.append(pool.submit(_generate_shard, template, shard_seed(seed, i), size))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def main() -> int:
+    project_root = Path(__file__).parent.parent
+    parser = argparse.ArgumentParser(description="Compile or query the native wildcard index.")
+    parser.add_argument(
+        "-w", "--wildcards-root",
+        type=Path,
+        default=project_root / "wildcards",
+        help="Path to wildcards directory (default: wildcards)",
+    )
+    parser.add_argument("--snapshot", type=Path, help="Snapshot path (default: .wc_cache/<root>.index.pickle)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("compile", help="Force a full recompile of the snapshot")
+    expand = subparsers.add_parser("expand", help="Expand a template")
+    expand.add_argument("prompt", help="Prompt template, e.g. '__std/xl/outfit/all__'")
+    expand.add_argument("-c", "--count", type=int, default=1, help="Number of prompts (default: 1)")
+    expand.add_argument("--seed", type=int, help="Random seed")
+    args = parser.parse_args()
+
+    if not args.wildcards_root.exists():
+        print(f"Error: Wildcards directory '{args.wildcards_root}' does not exist.", file=sys.stderr)
+        return 1
+
+    snapshot_path = args.snapshot or default_snapshot_path(args.wildcards_root)
+    if args.command == "compile":
+        started = time.perf_counter()
+        index = WildcardIndex.compile(args.wildcards_root)
+        index.save(snapshot_path)
+        elapsed = time.perf_counter() - started
+        print(f"Compiled {len(index.files)} files into {len(index)} wildcards in {elapsed:.2f}s "
+              f"({len(index.mapped)} served from line indexes)")
+        print(f"Snapshot: {snapshot_path}")
+        return 0
+
+    engine = load_engine(args.wildcards_root, seed=args.seed, snapshot_path=snapshot_path)
+    for prompt in engine.generate(args.prompt, args.count):
+        print(prompt)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
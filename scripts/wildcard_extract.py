@@ -2,6 +2,7 @@
 # /// script
 # dependencies = [
 #   "openai",
+#   "pillow",
 #   "tqdm",
 # ]
 # ///
@@ -15,24 +16,55 @@ wildcard-extractor.md and prompting-guide-sdxl.md.
 
 import os
 import sys
+import io
 import json
 import base64
+import hashlib
 import argparse
+import mimetypes
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, NamedTuple, Optional
 from datetime import datetime
 import glob
 
 import openai
 from tqdm import tqdm
 
+from checkpoint import CheckpointJournal
+from dedup_index import DedupIndexes
+from llm_telemetry import Telemetry
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # downscaling is skipped without Pillow
+    Image = None
+
+# Formats the vision API accepts as-is; anything else is re-encoded
+UPLOAD_MIME_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif"}
+DEFAULT_MAX_EDGE = 1536
+
+
+class EncodedImage(NamedTuple):
+    """An image ready for upload, identified by the hash of its original bytes."""
+    digest: str
+    mime_type: str
+    base64_data: str
+
 
 class WildcardExtractor:
     """Extract wildcard categories from images using OpenAI Vision API."""
     
     def __init__(self, wildcard_base_dir: Optional[str] = None, 
                  api_key: Optional[str] = None,
-                 script_dir: Optional[str] = None):
+                 script_dir: Optional[str] = None,
+                 max_edge: Optional[int] = DEFAULT_MAX_EDGE,
+                 reprocess: bool = False,
+                 ledger_path: Optional[str] = None,
+                 loose_dedup: bool = False,
+                 telemetry: Optional[Telemetry] = None):
         """
         Initialize the WildcardExtractor.
         
@@ -40,6 +72,14 @@ class WildcardExtractor:
             wildcard_base_dir: Base directory containing wildcard files (defaults to ./wildcard)
             api_key: OpenAI API key (defaults to OPENAI_API_KEY env var)
             script_dir: Directory containing the script and markdown files (auto-detected if None)
+            max_edge: Downscale images so their longest edge is at most this many pixels
+                (requires Pillow; None or 0 uploads original bytes)
+            reprocess: If True, process images even if their hash is already in the ledger
+            ledger_path: Extraction ledger file (defaults to one per wildcard directory,
+                .wc_cache/extract_ledgers/<dir name>-<path hash>.jsonl)
+            loose_dedup: If True, entries differing only in case, whitespace or
+                punctuation count as duplicates when appending
+            telemetry: Trace writer for the vision calls (defaults to the shared trace file)
         """
         if wildcard_base_dir is None:
             wildcard_base_dir = str(Path(__file__).parent / "wildcard")
@@ -58,6 +98,28 @@ class WildcardExtractor:
         
         # Load system prompt from markdown file
         self.system_prompt = self._load_system_prompt()
+
+        # Preprocessing and the ledger of already extracted image hashes
+        self.max_edge = max_edge or None
+        if self.max_edge and Image is None:
+            print("Warning: Pillow is not installed; images will be uploaded without downscaling")
+        self.reprocess = reprocess
+        if ledger_path is None:
+            # An image extracted into one wildcard tree is still new to another
+            base_dir = self.wildcard_base_dir.resolve()
+            digest = hashlib.sha256(str(base_dir).encode("utf-8")).hexdigest()[:12]
+            ledger_path = str(self.script_dir.parent / ".wc_cache" / "extract_ledgers" /
+                              f"{base_dir.name}-{digest}.jsonl")
+        self.ledger = CheckpointJournal(Path(ledger_path))
+        self._claimed = set()
+        self._claim_lock = threading.Lock()
+        self.skipped: List[str] = []
+
+        # Entry hashes of each target file, shared across the whole batch
+        self.dedup = DedupIndexes(loose=loose_dedup)
+
+        # One trace span per vision call (see llm_telemetry.py)
+        self.telemetry = telemetry if telemetry is not None else Telemetry("wildcard_extract")
         
         # Map wildcard categories to actual files
         self.wildcard_mapping = self._discover_wildcard_files()
@@ -204,10 +266,61 @@ Return a single JSON object where:
 - Multiple lines under a key = alternate variations, not sequential descriptors.
 - Skip any category irrelevant to the current image."""
 
-    def _encode_image(self, image_path: str) -> str:
-        """Encode image to base64 string."""
+    def _encode_image(self, image_path: str, claim: bool = True) -> Optional[EncodedImage]:
+        """
+        Hash, preprocess and base64-encode an image for upload.
+
+        With ``claim``, returns None if the image's content hash is already in
+        the extraction ledger (unless reprocessing) or was claimed earlier in
+        this run, so identical images are only sent once.
+        """
         with open(image_path, "rb") as image_file:
-            return base64.b64encode(image_file.read()).decode('utf-8')
+            data = image_file.read()
+
+        digest = hashlib.sha256(data).hexdigest()
+        if claim:
+            with self._claim_lock:
+                if digest in self._claimed or (not self.reprocess and digest in self.ledger):
+                    return None
+                self._claimed.add(digest)
+
+        mime_type, data = self._preprocess_image(image_path, data)
+        return EncodedImage(digest, mime_type, base64.b64encode(data).decode('utf-8'))
+
+    def _preprocess_image(self, image_path: str, data: bytes):
+        """
+        Downscale to max_edge and convert unsupported formats, returning (mime type, bytes).
+
+        Images that are already small enough and in an accepted format are sent
+        untouched. Without Pillow the original bytes are sent with their real type.
+        """
+        mime_type = mimetypes.guess_type(image_path)[0] or "image/jpeg"
+        if Image is None:
+            return mime_type, data
+
+        with Image.open(io.BytesIO(data)) as image:
+            too_large = self.max_edge is not None and max(image.size) > self.max_edge
+            if not too_large and mime_type in UPLOAD_MIME_TYPES:
+                return mime_type, data
+
+            # Re-encoding drops EXIF, so apply its orientation to the pixels first
+            image = ImageOps.exif_transpose(image)
+            if too_large:
+                image.thumbnail((self.max_edge, self.max_edge), Image.LANCZOS)
+            out = io.BytesIO()
+            if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+                image.save(out, format="PNG", optimize=True)
+                return "image/png", out.getvalue()
+            image.convert("RGB").save(out, format="JPEG", quality=90)
+            return "image/jpeg", out.getvalue()
+
+    def _record_extraction(self, image_path: str, digest: str, wildcards: Dict[str, List[str]]) -> None:
+        """Add an image's hash to the extraction ledger."""
+        self.ledger.record(digest, {
+            "image": str(image_path),
+            "extracted_at": datetime.now().isoformat(timespec="seconds"),
+            "entries": sum(len(entries) for entries in wildcards.values()),
+        })
 
     def _get_system_prompt(self) -> str:
         """Get the system prompt for wildcard extraction."""
@@ -227,8 +340,22 @@ Return a single JSON object where:
             raise FileNotFoundError(f"Image file not found: {image_path}")
         
         # Encode image
-        base64_image = self._encode_image(image_path)
-        
+        encoded = self._encode_image(image_path, claim=False)
+        return self.request_wildcards(image_path, encoded.base64_data, encoded.mime_type)
+
+    def request_wildcards(self, image_path: str, base64_image: str,
+                          mime_type: str = "image/jpeg") -> Dict[str, List[str]]:
+        """
+        Send an already encoded image to the vision model and parse its wildcards.
+
+        Args:
+            image_path: Path of the image, used for error messages
+            base64_image: Base64-encoded image data
+            mime_type: MIME type of the encoded data
+
+        Returns:
+            Dictionary mapping wildcard filenames to lists of extracted variations
+        """
         # Create the message
         messages = [
             {
@@ -245,7 +372,7 @@ Return a single JSON object where:
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/jpeg;base64,{base64_image}"
+                            "url": f"data:{mime_type};base64,{base64_image}"
                         }
                     }
                 ]
@@ -254,12 +381,14 @@ Return a single JSON object where:
         
         # Call OpenAI API
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=messages,
-                max_tokens=2000,
-                temperature=0.5
-            )
+            with self.telemetry.span("extract", model="gpt-4o", file=image_path) as span:
+                response = self.client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=messages,
+                    max_tokens=2000,
+                    temperature=0.5
+                )
+                span.record_usage(response)
             
             # Parse JSON response
             content = response.choices[0].message.content
@@ -335,22 +464,10 @@ Return a single JSON object where:
                     print(f"  + {entry}")
                 continue
 
-            # Create directory if it doesn't exist
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-
-            # Read existing entries to avoid duplicates
-            existing_entries = set()
-            if file_path.exists():
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    existing_entries = {line.strip() for line in f if line.strip()}
-
-            # Filter out duplicates
-            new_entries = [entry for entry in entries if entry not in existing_entries]
+            # Append only entries missing from the file's dedup index
+            new_entries = self.dedup.get(file_path).append(entries)
 
             if new_entries:
-                with open(file_path, 'a', encoding='utf-8') as f:
-                    for entry in new_entries:
-                        f.write(f"{entry}\n")
                 print(f"Added {len(new_entries)} new entries to {normalized_category} ({file_path})")
             else:
                 print(f"No new entries for {normalized_category} (all were duplicates)")
@@ -372,21 +489,41 @@ Return a single JSON object where:
         """
         print(f"Processing: {os.path.basename(image_path)}")
 
-        wildcards = self.extract_wildcards(image_path)
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"Image file not found: {image_path}")
 
+        encoded = self._encode_image(image_path)
+        if encoded is None:
+            print("Skipping (already extracted; use --reprocess to force)")
+            self.skipped.append(image_path)
+            return {}
+
+        wildcards = self.request_wildcards(image_path, encoded.base64_data, encoded.mime_type)
+        self._write_results(image_path, encoded, wildcards, dry_run=dry_run,
+                            include_categories=include_categories,
+                            exclude_categories=exclude_categories)
+        return wildcards
+
+    def _write_results(self, image_path: str, encoded: EncodedImage,
+                       wildcards: Dict[str, List[str]], dry_run: bool,
+                       include_categories: Optional[List[str]],
+                       exclude_categories: Optional[List[str]]) -> None:
+        """Append an image's wildcards and record it in the ledger (single writer only)."""
         if wildcards:
             print(f"Extracted {sum(len(entries) for entries in wildcards.values())} wildcard entries")
             self.append_to_wildcard_files(wildcards, dry_run=dry_run,
                                         include_categories=include_categories,
                                         exclude_categories=exclude_categories)
+            if not dry_run:
+                self._record_extraction(image_path, encoded.digest, wildcards)
         else:
             print("No wildcards extracted")
 
-        return wildcards
-
     def process_images(self, image_paths: List[str], dry_run: bool = False,
                       include_categories: Optional[List[str]] = None,
-                      exclude_categories: Optional[List[str]] = None) -> Dict[str, Dict[str, List[str]]]:
+                      exclude_categories: Optional[List[str]] = None,
+                      concurrency: int = 1,
+                      encode_workers: int = 2) -> Dict[str, Dict[str, List[str]]]:
         """
         Process multiple images with progress tracking.
 
@@ -395,21 +532,97 @@ Return a single JSON object where:
             dry_run: If True, don't actually write to files
             include_categories: If provided, only write these categories to disk
             exclude_categories: If provided, skip writing these categories to disk
+            concurrency: Maximum vision API calls in flight; above 1 the pipelined mode is used
+            encode_workers: Threads loading and encoding images in the pipelined mode
 
         Returns:
             Dictionary mapping image paths to their extracted wildcards
         """
         results = {}
 
-        for image_path in tqdm(image_paths, desc="Processing images"):
+        try:
+            if concurrency > 1:
+                return self._process_images_pipelined(image_paths, dry_run=dry_run,
+                                                      include_categories=include_categories,
+                                                      exclude_categories=exclude_categories,
+                                                      concurrency=concurrency,
+                                                      encode_workers=encode_workers)
+
+            for image_path in tqdm(image_paths, desc="Processing images"):
+                try:
+                    wildcards = self.process_image(image_path, dry_run=dry_run,
+                                                 include_categories=include_categories,
+                                                 exclude_categories=exclude_categories)
+                    results[image_path] = wildcards
+                except Exception as e:
+                    print(f"Error processing {image_path}: {e}")
+                    results[image_path] = {}
+
+            return results
+        finally:
+            self.dedup.save()
+
+    def _process_images_pipelined(self, image_paths: List[str], dry_run: bool,
+                                  include_categories: Optional[List[str]],
+                                  exclude_categories: Optional[List[str]],
+                                  concurrency: int,
+                                  encode_workers: int) -> Dict[str, Dict[str, List[str]]]:
+        """
+        Process images as a pipeline: encode -> concurrent API calls -> single writer.
+
+        Images are loaded and encoded on one thread pool while up to ``concurrency``
+        vision calls run on another. Only the calling thread appends to wildcard
+        files, in input order, so appends never race. At most ``2 * concurrency``
+        images are in the pipeline at once, which bounds memory for encoded data.
+        """
+        results = {}
+        window = 2 * concurrency
+
+        def extract(image_path: str, encoded_future: Future):
             try:
-                wildcards = self.process_image(image_path, dry_run=dry_run,
-                                             include_categories=include_categories,
-                                             exclude_categories=exclude_categories)
-                results[image_path] = wildcards
+                encoded = encoded_future.result()
             except Exception as e:
-                print(f"Error processing {image_path}: {e}")
-                results[image_path] = {}
+                print(f"Error encoding image {image_path}: {e}")
+                return None, {}
+            if encoded is None:
+                return None, None
+            return encoded, self.request_wildcards(image_path, encoded.base64_data, encoded.mime_type)
+
+        with ThreadPoolExecutor(max_workers=max(1, encode_workers)) as encode_pool, \
+                ThreadPoolExecutor(max_workers=concurrency) as api_pool:
+            pending = iter(image_paths)
+            in_flight = deque()
+
+            def submit_next() -> None:
+                image_path = next(pending, None)
+                if image_path is not None:
+                    encoded = encode_pool.submit(self._encode_image, image_path)
+                    in_flight.append((image_path, api_pool.submit(extract, image_path, encoded)))
+
+            for _ in range(window):
+                submit_next()
+
+            with tqdm(total=len(image_paths), desc="Processing images") as progress:
+                while in_flight:
+                    image_path, future = in_flight.popleft()
+                    try:
+                        encoded, wildcards = future.result()
+                    except Exception as e:
+                        print(f"Error processing {image_path}: {e}")
+                        encoded, wildcards = None, {}
+                    submit_next()
+
+                    print(f"Processed: {os.path.basename(image_path)}")
+                    if wildcards is None:
+                        print("Skipping (already extracted; use --reprocess to force)")
+                        self.skipped.append(image_path)
+                        wildcards = {}
+                    elif encoded is not None:
+                        self._write_results(image_path, encoded, wildcards, dry_run=dry_run,
+                                            include_categories=include_categories,
+                                            exclude_categories=exclude_categories)
+                    results[image_path] = wildcards
+                    progress.update(1)
 
         return results
 
@@ -587,6 +800,46 @@ def main():
              "motion, pose, style, accessories, bunnygirl, dress, skirt, uniform, misc"
     )
 
+    parser.add_argument(
+        "--max-edge",
+        type=int,
+        default=DEFAULT_MAX_EDGE,
+        help=f"Downscale images so the longest edge is at most this many pixels before upload "
+             f"(default: {DEFAULT_MAX_EDGE}; 0 uploads originals; requires Pillow)"
+    )
+    parser.add_argument(
+        "--reprocess",
+        action="store_true",
+        help="Process images even if their content hash is already in the extraction ledger"
+    )
+    parser.add_argument(
+        "--loose-dedup",
+        action="store_true",
+        help="Treat entries that differ only in case, whitespace or punctuation as duplicates"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Maximum vision API calls in flight (default: 4; 1 processes images serially)"
+    )
+    parser.add_argument(
+        "--trace",
+        type=Path,
+        help="LLM call trace file (default: .wc_cache/llm_traces.jsonl)"
+    )
+    parser.add_argument(
+        "--no-trace",
+        action="store_true",
+        help="Don't record LLM call traces"
+    )
+    parser.add_argument(
+        "--encode-workers",
+        type=int,
+        default=2,
+        help="Threads loading and encoding images ahead of the API calls (default: 2)"
+    )
+
     args = parser.parse_args()
 
     # Parse include/exclude categories
@@ -609,7 +862,11 @@ def main():
     try:
         extractor = WildcardExtractor(
             wildcard_base_dir=args.wildcard_dir,
-            api_key=args.api_key
+            api_key=args.api_key,
+            max_edge=args.max_edge,
+            reprocess=args.reprocess,
+            loose_dedup=args.loose_dedup,
+            telemetry=Telemetry("wildcard_extract", args.trace, enabled=not args.no_trace)
         )
 
         # Validate category names
@@ -643,7 +900,9 @@ def main():
         # Process images
         results = extractor.process_images(valid_images, dry_run=args.dry_run,
                                          include_categories=include_categories,
-                                         exclude_categories=exclude_categories)
+                                         exclude_categories=exclude_categories,
+                                         concurrency=args.concurrency,
+                                         encode_workers=args.encode_workers)
         
         # Calculate summary statistics
         total_entries = sum(
@@ -656,6 +915,8 @@ def main():
         print(f"\n=== Summary ===")
         print(f"Processed {len(valid_images)} images")
         print(f"Successfully extracted from {successful_images} images")
+        if extractor.skipped:
+            print(f"Skipped {len(extractor.skipped)} images already in the extraction ledger")
         print(f"Extracted {total_entries} total wildcard entries")
         
         if args.dry_run:
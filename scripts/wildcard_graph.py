@@ -0,0 +1,365 @@
+#!/usr/bin/env -S uv run --quiet
+# /// script
+# dependencies = [
+#   "pyyaml",
+# ]
+# ///
+"""Reference graph of a wildcard tree: dangling references, cycles, fan-out and depth.
+
+Every ``__path__`` in every value is resolved against the compiled wildcard
+index, globs included (``__std/xl/*__`` points at every matching key). The
+references found in each file are cached with the file's mtime and size in
+``.wc_cache/<root>.graph.pickle``, so a rerun only re-parses files that changed
+and then re-resolves the (cheap) global graph.
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import json
+import os
+import pickle
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable
+
+from wildcard_engine import (
+    Template,
+    Variant,
+    VariableAssign,
+    VariableRef,
+    Wildcard,
+    WildcardIndex,
+    Wrap,
+    default_snapshot_path,
+    parse_template,
+)
+
+
+
+def template_references(template: Template, out: set[str] | None = None) -> set[str]:
+    """Collect every wildcard path referenced anywhere in a template."""
+    if out is None:
+        out = set()
+    for node in template.parts:
+        kind = type(node)
+        if kind is Wildcard:
+            out.add(node.path)
+        elif kind is Variant:
+            for option in node.options:
+                template_references(option, out)
+        elif kind is VariableAssign:
+            template_references(node.value, out)
+        elif kind is VariableRef and node.default is not None:
+            template_references(node.default, out)
+        elif kind is Wrap:
+            template_references(node.wrapper, out)
+            template_references(node.inner, out)
+    return out
+
+
+def value_references(values: Iterable[str]) -> tuple[str, ...]:
+    refs: set[str] = set()
+    for value in values:
+        if "__" in value:
+            template_references(parse_template(value), refs)
+    return tuple(sorted(refs))
+
+
+def default_graph_cache_path(root: Path) -> Path:
+    snapshot = default_snapshot_path(root)
+    return snapshot.with_name(snapshot.name.replace(".index.pickle", ".graph.pickle"))
+
+
+class ReferenceCache:
+    """Per-file ``{key: references}``, reused while a file's mtime and size are unchanged."""
+
+    VERSION = 2
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.files: dict[str, tuple[int, int, dict[str, tuple[str, ...]]]] = {}
+        self.reparsed = 0
+        try:
+            with open(self.path, "rb") as f:
+                version, files = pickle.load(f)
+            if version == self.VERSION:
+                self.files = files
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+            self.files = {}
+
+    def file_references(self, index: WildcardIndex, rel_path: str) -> dict[str, tuple[str, ...]]:
+        record = index.files[rel_path]
+        cached = self.files.get(rel_path)
+        if cached is not None and cached[0] == record.mtime_ns and cached[1] == record.size:
+            return cached[2]
+        refs = {key: value_references(values) for key, values in record.collections.items()}
+        for key in record.mapped:
+            refs[key] = value_references(index.line_index(rel_path))
+        self.files[rel_path] = (record.mtime_ns, record.size, refs)
+        self.reparsed += 1
+        return refs
+
+    def save(self, live_files: Iterable[str]) -> None:
+        live = set(live_files)
+        self.files = {rel: entry for rel, entry in self.files.items() if rel in live}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump((self.VERSION, self.files), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
+
+
+@dataclass(slots=True)
+class GraphReport:
+    keys: list[str]
+    edges: dict[str, set[str]]
+    dangling: list[tuple[str, str]]
+    cycles: list[list[str]]
+    unreferenced: list[str]
+    unreachable: list[str] | None
+    depth: dict[str, int | None]
+    files: int = 0
+    reparsed: int = 0
+    elapsed: float = 0.0
+    sources: dict[str, list[str]] = field(default_factory=dict)
+
+    def fan_out(self, key: str) -> int:
+        return len(self.edges.get(key, ()))
+
+    def to_json(self) -> dict:
+        return {
+            "keys": len(self.keys),
+            "edges": sum(len(targets) for targets in self.edges.values()),
+            "files": self.files,
+            "reparsed_files": self.reparsed,
+            "dangling": [{"source": source, "reference": ref} for source, ref in self.dangling],
+            "cycles": self.cycles,
+            "unreferenced": self.unreferenced,
+            "unreachable": self.unreachable,
+            "nodes": {
+                key: {"fan_out": self.fan_out(key), "depth": self.depth[key], "files": self.sources.get(key, [])}
+                for key in self.keys
+            },
+        }
+
+
+def strongly_connected_components(nodes: list[str], edges: dict[str, set[str]]) -> list[list[str]]:
+    """Tarjan's algorithm, iterative so deep reference chains don't hit the recursion limit."""
+    index_of: dict[str, int] = {}
+    lowlink: dict[str, int] = {}
+    on_stack: set[str] = set()
+    stack: list[str] = []
+    components: list[list[str]] = []
+    counter = 0
+
+    for start in nodes:
+        if start in index_of:
+            continue
+        work = [(start, iter(sorted(edges.get(start, ()))))]
+        index_of[start] = lowlink[start] = counter
+        counter += 1
+        stack.append(start)
+        on_stack.add(start)
+        while work:
+            node, children = work[-1]
+            advanced = False
+            for child in children:
+                if child not in index_of:
+                    index_of[child] = lowlink[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(sorted(edges.get(child, ())))))
+                    advanced = True
+                    break
+                if child in on_stack:
+                    lowlink[node] = min(lowlink[node], index_of[child])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                lowlink[parent] = min(lowlink[parent], lowlink[node])
+            if lowlink[node] == index_of[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    # Tarjan emits components in reverse topological order (dependencies first)
+    return components
+
+
+def analyze(index: WildcardIndex, cache: ReferenceCache, roots: list[str] | None = None) -> GraphReport:
+    started = time.perf_counter()
+    keys = index.keys()
+    raw: dict[str, set[str]] = defaultdict(set)
+    sources: dict[str, list[str]] = defaultdict(list)
+    for rel_path in sorted(index.files):
+        for key, refs in cache.file_references(index, rel_path).items():
+            raw[key].update(refs)
+            sources[key].append(rel_path)
+
+    resolved: dict[str, tuple[str, ...]] = {}
+
+    def resolve(ref: str) -> tuple[str, ...]:
+        targets = resolved.get(ref)
+        if targets is None:
+            targets = resolved[ref] = tuple(index.resolve_keys(ref))
+        return targets
+
+    edges: dict[str, set[str]] = {}
+    dangling: list[tuple[str, str]] = []
+    for key in keys:
+        targets: set[str] = set()
+        for ref in sorted(raw.get(key, ())):
+            found = resolve(ref)
+            if not found:
+                dangling.append((key, ref))
+            targets.update(found)
+        edges[key] = targets
+
+    components = strongly_connected_components(keys, edges)
+    cycles = [
+        sorted(component) for component in components
+        if len(component) > 1 or component[0] in edges[component[0]]
+    ]
+
+    # Longest reference chain below each node; None when a cycle is reachable
+    component_of = {key: i for i, component in enumerate(components) for key in component}
+    cyclic = {component_of[cycle[0]] for cycle in cycles}
+    depth: dict[str, int | None] = {}
+    for i, component in enumerate(components):
+        value: int | None = 0
+        if i in cyclic:
+            value = None
+        else:
+            for child in edges[component[0]]:
+                child_depth = depth[child]
+                if child_depth is None:
+                    value = None
+                    break
+                value = max(value, child_depth + 1)
+        for key in component:
+            depth[key] = value
+
+    referenced = {target for key, targets in edges.items() for target in targets if target != key}
+    unreferenced = [key for key in keys if key not in referenced]
+
+    unreachable = None
+    if roots:
+        seen: set[str] = set()
+        frontier = [key for key in keys if any(fnmatch.fnmatchcase(key, root) for root in roots)]
+        while frontier:
+            key = frontier.pop()
+            if key in seen:
+                continue
+            seen.add(key)
+            frontier.extend(edges[key] - seen)
+        unreachable = [key for key in keys if key not in seen]
+
+    return GraphReport(
+        keys=keys,
+        edges=edges,
+        dangling=dangling,
+        cycles=cycles,
+        unreferenced=unreferenced,
+        unreachable=unreachable,
+        depth=depth,
+        files=len(index.files),
+        reparsed=cache.reparsed,
+        elapsed=time.perf_counter() - started,
+        sources=dict(sources),
+    )
+
+
+def print_report(report: GraphReport, top: int, show_unreferenced: bool) -> None:
+    edge_count = sum(len(targets) for targets in report.edges.values())
+    print(f"{len(report.keys)} keys, {edge_count} references across {report.files} files "
+          f"({report.reparsed} re-parsed) in {report.elapsed:.2f}s")
+
+    print(f"\nDangling references ({len(report.dangling)}):")
+    for source, ref in report.dangling:
+        files = ", ".join(report.sources.get(source, []))
+        print(f"  {source} -> __{ref}__  ({files})")
+
+    print(f"\nCycles ({len(report.cycles)}):")
+    for cycle in report.cycles:
+        print(f"  {' <-> '.join(cycle)}")
+
+    if report.unreachable is not None:
+        print(f"\nUnreachable from roots ({len(report.unreachable)}):")
+        for key in report.unreachable:
+            print(f"  {key}")
+    elif show_unreferenced:
+        print(f"\nUnreferenced keys ({len(report.unreferenced)}):")
+        for key in report.unreferenced:
+            print(f"  {key}")
+    else:
+        print(f"\nUnreferenced keys: {len(report.unreferenced)} (use --unreferenced to list)")
+
+    print(f"\nLargest fan-out (top {top}):")
+    print(f"  {'fan-out':>7} {'depth':>5}  key")
+    by_fan_out = sorted(report.keys, key=lambda key: (-report.fan_out(key), key))[:top]
+    for key in by_fan_out:
+        depth = report.depth[key]
+        print(f"  {report.fan_out(key):7d} {'cycle' if depth is None else depth:>5}  {key}")
+
+    deepest = sorted((key for key in report.keys if report.depth[key] is not None),
+                     key=lambda key: (-report.depth[key], key))[:top]
+    print(f"\nDeepest reference chains (top {top}):")
+    for key in deepest:
+        print(f"  {report.depth[key]:5d}  {key}")
+
+
+def main() -> int:
+    project_root = Path(__file__).parent.parent
+    parser = argparse.ArgumentParser(description="Analyze the wildcard reference graph.")
+    parser.add_argument(
+        "-w", "--wildcards-root",
+        type=Path,
+        default=project_root / "wildcards",
+        help="Path to wildcards directory (default: wildcards)",
+    )
+    parser.add_argument(
+        "--root",
+        action="append",
+        dest="roots",
+        metavar="PATTERN",
+        help="Entry-point keys (globs allowed, repeatable); reports keys unreachable from them",
+    )
+    parser.add_argument("--unreferenced", action="store_true", help="List every key nothing refers to")
+    parser.add_argument("--top", type=int, default=20, help="Rows in the fan-out and depth tables (default: 20)")
+    parser.add_argument("--format", choices=["text", "json"], default="text", help="Output format (default: text)")
+    args = parser.parse_args()
+
+    if not args.wildcards_root.exists():
+        print(f"Error: Wildcards directory '{args.wildcards_root}' does not exist.", file=sys.stderr)
+        return 1
+
+    index = WildcardIndex.load_or_compile(args.wildcards_root)
+    cache = ReferenceCache(default_graph_cache_path(args.wildcards_root))
+    try:
+        report = analyze(index, cache, args.roots)
+    finally:
+        index.close()
+    if cache.reparsed:
+        cache.save(index.files)
+
+    if args.format == "json":
+        print(json.dumps(report.to_json(), indent=2, ensure_ascii=False))
+    else:
+        print_report(report, args.top, args.unreferenced)
+    return 1 if report.dangling or report.cycles else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Batched, vectorized wildcard sampling for frequency analysis.
+
+Instead of expanding N prompt strings and re-tokenizing them, the sampler
+draws every choice for all N generations at once as NumPy index arrays and
+recurses into each distinct chosen value with its draw count. Word counts
+are accumulated from those choice histograms, so the cost scales with the
+number of distinct values reached rather than with N.
+
+The counts have the same distribution as tokenizing real expansions, with two
+simplifications: words are counted per template fragment (a word glued across
+a fragment boundary such as ``__a__s`` is counted as two), and variable
+assignments made inside a wildcard value are only visible within that value.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from typing import Sequence
+
+import numpy as np
+
+from wildcard_analysis import extract_words
+from wildcard_engine import (
+    MAX_DEPTH,
+    Literal,
+    Template,
+    Variant,
+    VariableAssign,
+    Wildcard,
+    WildcardEngine,
+    Wrap,
+)
+
+# Upper bound on the (rows x options) key matrix built for multi-pick variants
+MAX_KEY_MATRIX = 4_000_000
+
+
+class BatchSampler:
+    """Draw wildcard choices for many generations at once and count words."""
+
+    def __init__(self, engine: WildcardEngine, seed: int | None = None) -> None:
+        self.engine = engine
+        self.index = engine.index
+        self.rng = np.random.default_rng(seed)
+        self._literal_words: dict[str, Counter] = {}
+
+    def word_counts(self, template: str, n: int) -> Counter:
+        """Return word occurrence counts over ``n`` expansions of ``template``."""
+        counts: Counter = Counter()
+        self._accumulate(self.engine.parse(template), n, {}, counts, 0)
+        return counts
+
+    def _words(self, text: str) -> Counter:
+        words = self._literal_words.get(text)
+        if words is None:
+            words = Counter(extract_words(text))
+            self._literal_words[text] = words
+        return words
+
+    def _add_literal(self, text: str, n: int, counts: Counter) -> None:
+        for word, count in self._words(text).items():
+            counts[word] += count * n
+
+    def _accumulate(self, template: Template, n: int, variables: dict[str, Template],
+                    counts: Counter, depth: int) -> None:
+        if depth > MAX_DEPTH:
+            raise RuntimeError("Wildcard expansion exceeded maximum depth (reference cycle?)")
+        for node in template.parts:
+            kind = type(node)
+            if kind is Literal:
+                self._add_literal(node.text, n, counts)
+            elif kind is Wildcard:
+                values = self.index.get_values(node.path)
+                if not values:
+                    self._add_literal(f"__{node.path}__", n, counts)
+                    continue
+                weights = self.index.get_weights(node.path)
+                if weights is None:
+                    choices = self.rng.integers(0, len(values), size=n)
+                else:
+                    p = np.asarray(weights, dtype=float)
+                    choices = self.rng.choice(len(values), size=n, p=p / p.sum())
+                self._recurse_values(values, choices, variables, counts, depth)
+            elif kind is Variant:
+                self._accumulate_variant(node, n, variables, counts, depth)
+            elif kind is VariableAssign:
+                variables = {**variables, node.name: node.value}
+            elif kind is Wrap:
+                self._accumulate(node.wrapper, n, variables, counts, depth + 1)
+                self._accumulate(node.inner, n, variables, counts, depth + 1)
+            else:
+                value = variables.get(node.name, node.default)
+                if value is None:
+                    self._add_literal(f"${{{node.name}}}", n, counts)
+                else:
+                    self._accumulate(value, n, variables, counts, depth + 1)
+
+    def _recurse_values(self, values: Sequence[str], choices: np.ndarray,
+                        variables: dict[str, Template], counts: Counter, depth: int) -> None:
+        chosen, chosen_counts = np.unique(choices, return_counts=True)
+        for value_index, count in zip(chosen.tolist(), chosen_counts.tolist()):
+            self._accumulate(self.engine.parse(values[value_index]), count, variables, counts, depth + 1)
+
+    def _recurse_options(self, options: Sequence[Template], choices: np.ndarray,
+                         variables: dict[str, Template], counts: Counter, depth: int) -> None:
+        chosen, chosen_counts = np.unique(choices, return_counts=True)
+        for option_index, count in zip(chosen.tolist(), chosen_counts.tolist()):
+            self._accumulate(options[option_index], count, variables, counts, depth + 1)
+
+    def _accumulate_variant(self, variant: Variant, n: int, variables: dict[str, Template],
+                            counts: Counter, depth: int) -> None:
+        values = self.engine._lone_wildcard_values(variant)
+        m = len(values) if values is not None else len(variant.options)
+        weights = None
+        if values is not None:
+            value_weights = self.index.get_weights(self.engine._lone_wildcard_path(variant))
+            if value_weights is not None:
+                weights = np.asarray(value_weights, dtype=float)
+        elif any(weight != 1.0 for weight in variant.weights):
+            weights = np.asarray(variant.weights, dtype=float)
+
+        def recurse(choices: np.ndarray) -> None:
+            if values is not None:
+                self._recurse_values(values, choices, variables, counts, depth)
+            else:
+                self._recurse_options(variant.options, choices, variables, counts, depth)
+
+        if variant.min_count == 1 and variant.max_count == 1:
+            if weights is None:
+                recurse(self.rng.integers(0, m, size=n))
+            else:
+                recurse(self.rng.choice(m, size=n, p=weights / weights.sum()))
+            return
+
+        high = min(variant.max_count, m)
+        low = min(variant.min_count, high)
+        if high == 0:
+            return
+        picks = self.rng.integers(low, high + 1, size=n)
+
+        separators = int(np.maximum(picks - 1, 0).sum())
+        if separators:
+            self._add_literal(variant.separator, separators, counts)
+
+        # Sampling without replacement per row: the top-k of random keys
+        # (Efraimidis-Spirakis keys when weighted), in row chunks so the key
+        # matrix stays bounded even for variants over large wildcard files.
+        rows_per_chunk = max(1, MAX_KEY_MATRIX // m)
+        selected = []
+        for start in range(0, n, rows_per_chunk):
+            chunk_picks = picks[start:start + rows_per_chunk]
+            keys = self.rng.random((len(chunk_picks), m))
+            if weights is not None:
+                keys = np.log(keys) / weights
+            if high < m:
+                top = np.argpartition(-keys, high - 1, axis=1)[:, :high]
+            else:
+                top = np.broadcast_to(np.arange(m), (len(chunk_picks), m))
+            if low != high:
+                # Rows keep only their first k_r columns, so order the top-k
+                # by key: the first k_r are then that row's top-k_r draw.
+                order = np.argsort(-np.take_along_axis(keys, top, axis=1), axis=1)
+                top = np.take_along_axis(top, order, axis=1)
+            mask = np.arange(high) < chunk_picks[:, None]
+            selected.append(top[mask])
+        if selected:
+            recurse(np.concatenate(selected))
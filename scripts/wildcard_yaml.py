@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Shared YAML loading for wildcard files.
+
+Parsing uses libyaml's ``CSafeLoader`` when PyYAML was built with it and falls
+back to the pure-Python ``SafeLoader`` otherwise; both accept the same safe
+subset. :func:`load_yaml_file` additionally keeps the parsed structure in a
+pickle cache with one entry per file path, stamped with a hash of the file's
+content, so unchanged files are never parsed twice, whichever tool reads
+them. An edited file replaces its entry instead of adding one.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+from pathlib import Path
+from typing import Any
+
+import yaml
+
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+HAS_LIBYAML = SafeLoader is not yaml.SafeLoader
+
+
+def default_cache_dir() -> Path:
+    return Path(__file__).resolve().parent.parent / ".wc_cache" / "yaml"
+
+
+def parse_yaml(text: str | bytes) -> Any:
+    """Parse a YAML document with the fastest available safe loader."""
+    return yaml.load(text, Loader=SafeLoader)
+
+
+def load_yaml_file(path: Path | str, *, cache_dir: Path | None = None, use_cache: bool = True) -> Any:
+    """Load a YAML file, reusing the cached parse when its content is unchanged."""
+    path = Path(path)
+    data = path.read_bytes()
+    if not use_cache:
+        return parse_yaml(data)
+
+    digest = hashlib.sha256(data).hexdigest()
+    path_key = hashlib.sha256(str(path.resolve()).encode("utf-8")).hexdigest()
+    cache_path = (Path(cache_dir) if cache_dir else default_cache_dir()) / f"{path_key}.pickle"
+    try:
+        with open(cache_path, "rb") as f:
+            cached_digest, parsed = pickle.load(f)
+        if cached_digest == digest:
+            return parsed
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, TypeError, ValueError):
+        pass
+
+    parsed = parse_yaml(data)
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump((digest, parsed), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # caching is best effort; the parse result is still valid
+    return parsed
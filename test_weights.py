@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+import sys
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "scripts"))
+from wildcard_engine import WildcardEngine, WildcardIndex, compile_file, parse_weighted_value
+from wildcard_sampling import BatchSampler
+from wildcard_analysis import ExactFrequencies
+
+WEIGHTED_FILE = "std/xl/pose.yaml"
+WEIGHTED_KEY = "std/xl/pose/all"
+
+
+def test_weight_parsing():
+    """Check that N:: prefixes are parsed the way dynamicprompts parses them"""
+    cases = {
+        "10::standing": (10.0, "standing"),
+        "0.5::standing": (0.5, "standing"),
+        "standing": (1.0, "standing"),
+        # not a number before the last "::", so kept literally
+        "3d::render": (1.0, "3d::render"),
+        "2::a::b": (1.0, "2::a::b"),
+    }
+    ok = True
+    for item, expected in cases.items():
+        result = parse_weighted_value(item)
+        mark = "✓" if result == expected else "✗"
+        ok &= result == expected
+        print(f"{mark} {item!r} -> {result}")
+    return ok
+
+
+def test_compiled_weights(root):
+    """Check that pose.yaml values are stored without their prefix, with weights"""
+    collections, weights = compile_file(root, WEIGHTED_FILE)
+    values = collections[WEIGHTED_KEY]
+    prefixed = [value for value in values if value.split("::")[0].isdigit()]
+    if prefixed:
+        print(f"✗ {len(prefixed)} values still carry a weight prefix")
+        return False
+    if WEIGHTED_KEY not in weights or len(weights[WEIGHTED_KEY]) != len(values):
+        print(f"✗ No weights stored for {WEIGHTED_KEY}")
+        return False
+    print(f"✓ {WEIGHTED_KEY}: {len(values)} values, weights {sorted(Counter(weights[WEIGHTED_KEY]).items())}")
+    return True
+
+
+def test_duplicate_values():
+    """Check that repeated values collapse in place and keep their combined weight"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / "dup.yaml").write_text("dup:\n  - a\n  - 3::b\n  - c\n  - a\n  - 2::b\n", encoding="utf-8")
+        (root / "dup.txt").write_text("a\nb\na\n", encoding="utf-8")
+        collections, weights = compile_file(root, "dup.yaml")
+        text_collections, _ = compile_file(root, "dup.txt")
+    ok = collections["dup"] == ("a", "b", "c") and weights["dup"] == (2.0, 5.0, 1.0)
+    ok &= text_collections["dup"] == ("a", "b")
+    print(f"{'✓' if ok else '✗'} duplicates merged: {collections['dup']} {weights['dup']}, txt {text_collections['dup']}")
+    return ok
+
+
+def test_weighted_sampling(root, samples=20000):
+    """Check that the engine, batch sampler and exact analysis honor the weights"""
+    with tempfile.TemporaryDirectory() as tmp:
+        # A snapshot outside .wc_cache keeps this check from touching the real one
+        index = WildcardIndex.load_or_compile(root, Path(tmp) / "index.pickle")
+        engine = WildcardEngine(index, seed=1)
+        weights = index.get_weights(WEIGHTED_KEY)
+        share = sum(weight for weight in weights if weight != 1.0) / sum(weights)
+
+        values = index.get_values(WEIGHTED_KEY)
+        counts = Counter(engine._pick_index(WEIGHTED_KEY, len(values)) for _ in range(samples))
+        observed = sum(count for i, count in counts.items() if weights[i] != 1.0) / samples
+        ok = abs(observed - share) < 0.01
+        print(f"{'✓' if ok else '✗'} engine picks weighted values {observed:.3f} of the time (expected {share:.3f})")
+
+        template = f"__{WEIGHTED_KEY}__"
+        exact = ExactFrequencies(engine).word_counts(template)
+        batch = BatchSampler(engine, seed=1).word_counts(template, samples)
+        for word in ("with", "standing"):
+            sampled = batch[word] / samples
+            close = abs(sampled - exact[word]) < 0.02
+            ok &= close
+            print(f"{'✓' if close else '✗'} '{word}': exact {exact[word]:.3f}, batch {sampled:.3f}")
+        index.close()
+    return ok
+
+
+if __name__ == "__main__":
+    root = Path(__file__).parent / "wildcards"
+    print("Testing N:: value weights...")
+    results = [
+        test_weight_parsing(),
+        test_compiled_weights(root),
+        test_duplicate_values(),
+        test_weighted_sampling(root),
+    ]
+    sys.exit(0 if all(results) else 1)
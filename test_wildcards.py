@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
 
-import yaml
 import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "scripts"))
+from wildcard_yaml import load_yaml_file
 
 def load_wildcard_data(filename):
-    with open(filename, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+    return load_yaml_file(filename)
 
 def test_wildcard_categories(data):
     """Test that all referenced categories exist"""
@@ -18,7 +21,7 @@ def test_wildcard_categories(data):
     for pattern in all_patterns:
         # Extract category references like __std/xl/outfit/category__
         import re
-        matches = re.findall(r'__std/xl/outfit/([^_/]+)__', pattern)
+        matches = re.findall(r'__std/xl/outfit/([A-Za-z0-9_]+?)__', pattern)
         referenced_categories.update(matches)
         print(f"Pattern: {pattern}")
         print(f"  Found categories: {matches}")
@@ -65,7 +68,7 @@ def simulate_wildcard_generation(data, num_samples=10):
         import re
         
         # Find all category references
-        matches = re.findall(r'__std/xl/outfit/([^_]+)__', pattern)
+        matches = re.findall(r'__std/xl/outfit/([A-Za-z0-9_]+?)__', pattern)
         for category in matches:
             if category in outfit_data and outfit_data[category]:
                 replacement = random.choice(outfit_data[category])
@@ -2,11 +2,14 @@
 
 import yaml
 import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "scripts"))
+from wildcard_yaml import load_yaml_file
 
 def test_yaml_file(filename):
     try:
-        with open(filename, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
+        data = load_yaml_file(filename)
         
         print(f"✓ YAML file '{filename}' is valid!")
         
@@ -4,28 +4,106 @@ WCT (Wildcard Tool) - Analyze, categorize, and clean wildcard files for Stable D
 Supports multiple modes for comprehensive wildcard file management.
 """
 import argparse
+import glob
+import hashlib
 import json
 import sys
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from openai import OpenAI
 import yaml
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, List, Any, Optional
 import tempfile
 import os
 
+sys.path.insert(0, str(Path(__file__).parent / "scripts"))
+from llm_cache import ResponseCache
+from llm_telemetry import Telemetry
+from stage_scheduler import DependencyFailed, StageScheduler
+from wildcard_yaml import parse_yaml
+
+WILDCARD_SUFFIXES = {".txt", ".yaml", ".yml"}
+# Rough token estimate used to size chunks; good enough for English wildcard text
+CHARS_PER_TOKEN = 4
+DEFAULT_CHUNK_TOKENS = 8000
+# Minimum estimated shingle similarity for --dedupe candidates (see scripts/near_duplicates.py)
+DEFAULT_DEDUPE_THRESHOLD = 0.7
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_chunks(content: str, max_tokens: int) -> List[str]:
+    """Split content on line boundaries into chunks of at most ``max_tokens`` (estimated).
+
+    A single line longer than the budget becomes a chunk of its own.
+    """
+    budget = max_tokens * CHARS_PER_TOKEN
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for line in content.splitlines(keepends=True):
+        if current and size + len(line) > budget:
+            chunks.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def compact_taxonomy(categories: Any) -> Dict[str, Any]:
+    """Reduce a categorization to its purpose and one-line category descriptions."""
+    if not isinstance(categories, dict) or "raw_response" in categories:
+        return categories
+    compact: Dict[str, Any] = {}
+    if "purpose" in categories:
+        compact["purpose"] = str(categories["purpose"]).strip()
+    entries = categories.get("categories")
+    if isinstance(entries, dict):
+        compact["categories"] = {
+            str(name): " ".join(str(description).split()) if description is not None else ""
+            for name, description in entries.items()
+        }
+    elif isinstance(entries, list):
+        compact["categories"] = {str(name): "" for name in entries}
+    return compact
+
+
+class LLMError(RuntimeError):
+    """An LLM call failed."""
+
+
 class WildcardTool:
     """Main class for wildcard file processing."""
     
-    def __init__(self, reasoning_effort: str = "medium", verbose: bool = False):
-        """Initialize the wildcard tool."""
+    def __init__(self, reasoning_effort: str = "medium", verbose: bool = False,
+                 response_cache: Optional[ResponseCache] = None,
+                 telemetry: Optional[Telemetry] = None, chunk_workers: int = 4):
+        """Initialize the wildcard tool.
+
+        ``chunk_workers`` bounds the chunks :meth:`categorize` sends at once;
+        callers that already run calls concurrently (the CLI's StageScheduler)
+        pass 1 so their own limit holds.
+        """
         self.client = OpenAI()
         self.reasoning_effort = reasoning_effort
         self.verbose = verbose
+        self.chunk_workers = max(1, chunk_workers)
         self.prompts_dir = Path(__file__).parent / "prompts" / "wct"
         
         # Cache for categorization results
         self.cache_dir = Path(__file__).parent / ".wct_cache"
         self.cache_dir.mkdir(exist_ok=True)
+
+        # Shared content-addressed cache for every LLM call
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
+
+        # One trace span per LLM call (see scripts/llm_telemetry.py)
+        self.telemetry = telemetry if telemetry is not None else Telemetry("wct")
     
     def load_prompt(self, prompt_name: str) -> str:
         """Load a prompt from the prompts/wct directory."""
@@ -33,8 +111,11 @@ class WildcardTool:
             "sdxl": "sdxl-prompting-guide.md",
             "intro": "wildcard_intro.md",
             "categorize": "categorize.md",
+            "categorize_merge": "categorize_merge.md",
+            "categorize_clusters": "categorize_clusters.md",
             "analyze": "analyze.md",
             "cleanup": "cleanup.md",
+            "dedupe": "dedupe.md",
             "output": "output.md"
         }
 
@@ -52,14 +133,21 @@ class WildcardTool:
         with open(prompt_path, 'r', encoding='utf-8') as f:
             return f.read().strip()
     
-    def get_cache_path(self, input_file: Path) -> Path:
-        """Get cache file path for categorization results."""
-        cache_name = f"{input_file.stem}_categories.json"
+    def get_cache_path(self, input_file: Path, chunk_tokens: Optional[int] = None,
+                       precluster: bool = False) -> Path:
+        """Get cache file path for categorization results, keyed by file content."""
+        digest = hashlib.sha256(input_file.read_bytes()).hexdigest()[:16]
+        if precluster:
+            mode = "-preclustered"
+        else:
+            mode = f"-chunked{chunk_tokens}" if chunk_tokens else ""
+        cache_name = f"{input_file.stem}-{digest}{mode}_categories.json"
         return self.cache_dir / cache_name
     
-    def load_cached_categories(self, input_file: Path) -> Optional[Dict[str, Any]]:
+    def load_cached_categories(self, input_file: Path, chunk_tokens: Optional[int] = None,
+                               precluster: bool = False) -> Optional[Dict[str, Any]]:
         """Load cached categorization results if available."""
-        cache_path = self.get_cache_path(input_file)
+        cache_path = self.get_cache_path(input_file, chunk_tokens, precluster)
         if cache_path.exists():
             try:
                 with open(cache_path, 'r', encoding='utf-8') as f:
@@ -69,43 +157,65 @@ class WildcardTool:
                     print(f"Warning: Could not load cache: {e}")
         return None
     
-    def save_cached_categories(self, input_file: Path, categories: Dict[str, Any]):
+    def save_cached_categories(self, input_file: Path, categories: Dict[str, Any],
+                               chunk_tokens: Optional[int] = None, precluster: bool = False):
         """Save categorization results to cache."""
-        cache_path = self.get_cache_path(input_file)
+        cache_path = self.get_cache_path(input_file, chunk_tokens, precluster)
         try:
-            with open(cache_path, 'w', encoding='utf-8') as f:
+            # Write atomically: batch mode may categorize identical files concurrently
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.cache_dir,
+                                             suffix='.tmp', delete=False) as f:
                 json.dump(categories, f, indent=2)
+            os.replace(f.name, cache_path)
         except Exception as e:
             if self.verbose:
                 print(f"Warning: Could not save cache: {e}")
     
-    def call_llm(self, system_prompt: str, user_prompt: str) -> str:
-        """Make a call to the LLM with the given prompts."""
+    def call_llm(self, system_prompt: str, user_prompt: str, use_cache: bool = True,
+                 stage: str = "llm", input_file: Optional[Path] = None) -> str:
+        """Make a call to the LLM with the given prompts, traced as ``stage`` of ``input_file``."""
+        api_params = {
+            "model": "gpt-5",
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "max_completion_tokens": 10000,
+            "reasoning_effort": self.reasoning_effort
+        }
         try:
-            api_params = {
-                "model": "gpt-5",
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "max_completion_tokens": 10000,
-                "reasoning_effort": self.reasoning_effort
-            }
-            
-            response = self.client.chat.completions.create(**api_params)
-            output = response.choices[0].message.content
-            
-            # Show reasoning if verbose mode is enabled
-            if self.verbose and hasattr(response.choices[0].message, 'reasoning'):
-                print(f"\n--- LLM Reasoning ---")
-                print(response.choices[0].message.reasoning)
-                print("--- End Reasoning ---\n")
-            
-            return output
+            with self.telemetry.span(stage, model=api_params["model"], file=input_file) as span:
+                cache_key = ResponseCache.make_key(
+                    model=api_params["model"],
+                    system_prompt=system_prompt,
+                    user_prompt=user_prompt,
+                    reasoning_effort=self.reasoning_effort,
+                    max_completion_tokens=api_params["max_completion_tokens"],
+                )
+                if use_cache:
+                    cached = self.response_cache.get(cache_key)
+                    if cached is not None:
+                        span.cache_hit = True
+                        if self.verbose:
+                            print("Using cached LLM response")
+                        return cached
+
+                response = self.client.chat.completions.create(**api_params)
+                span.record_usage(response)
+                output = response.choices[0].message.content
+
+                # Show reasoning if verbose mode is enabled
+                if self.verbose and hasattr(response.choices[0].message, 'reasoning'):
+                    print(f"\n--- LLM Reasoning ---")
+                    print(response.choices[0].message.reasoning)
+                    print("--- End Reasoning ---\n")
+
+                if output:
+                    self.response_cache.put(cache_key, output)
+                return output
             
         except Exception as e:
-            print(f"Error calling LLM: {e}", file=sys.stderr)
-            sys.exit(1)
+            raise LLMError(f"Error calling LLM: {e}") from e
 
     def filter_real_categories(self, categories: Dict[str, Any]) -> Dict[str, Any]:
         """Filter out synthetic categories that contain only references like __std/xl/path/category__"""
@@ -133,8 +243,69 @@ class WildcardTool:
 
         return filtered
 
-    def categorize(self, input_file: Path, force_refresh: bool = False) -> Dict[str, Any]:
-        """Categorize the wildcard file and cache results."""
+    def categories_prompt(self, categories: Optional[Dict[str, Any]], removed: Iterable[str] = (),
+                          entries: bool = True) -> str:
+        """Render categories for a prompt.
+
+        With per-entry ``assignments`` (from --precluster) and ``entries``, the
+        taxonomy is followed by every entry listed under its category, leaving
+        out the ``removed`` entries (e.g. dropped by --dedupe).
+        """
+        if not categories:
+            return "No categories available"
+        if not isinstance(categories, dict):
+            return yaml.dump(categories, default_flow_style=False)
+        assignments = categories.get("assignments")
+        taxonomy = {key: value for key, value in categories.items() if key != "assignments"}
+        text = yaml.dump(taxonomy, default_flow_style=False, allow_unicode=True)
+        if entries and isinstance(assignments, dict):
+            removed = set(removed)
+            grouped: Dict[str, List[str]] = defaultdict(list)
+            for entry, category in assignments.items():
+                if entry not in removed:
+                    grouped[category].append(entry)
+            text += "\nEntries by category:\n" + yaml.dump(dict(grouped), default_flow_style=False,
+                                                           allow_unicode=True, width=1000)
+        return text
+
+    def categorize(self, input_file: Path, force_refresh: bool = False,
+                   chunk_tokens: Optional[int] = None, precluster: bool = False) -> Dict[str, Any]:
+        """Categorize the wildcard file and cache results.
+
+        Files estimated above ``chunk_tokens`` are categorized chunk by chunk
+        (up to ``chunk_workers`` at once) and the partial results merged; see
+        :meth:`plan_chunks`.
+        With ``precluster`` the model only names local clusters instead; see
+        :meth:`categorize_clusters`.
+        """
+        if precluster:
+            if not force_refresh:
+                cached = self.load_cached_categories(input_file, precluster=True)
+                # Older cached results predate the per-entry assignments
+                if cached and "assignments" in cached:
+                    if self.verbose:
+                        print("Using cached categorization results")
+                    return cached
+            return self.categorize_clusters(input_file, force_refresh, chunk_tokens)
+
+        chunks = self.plan_chunks(input_file, chunk_tokens)
+        if chunks is not None:
+            if not force_refresh:
+                cached = self.load_cached_categories(input_file, chunk_tokens)
+                if cached:
+                    if self.verbose:
+                        print("Using cached categorization results")
+                    return cached
+            def categorize_chunk(item):
+                return self.categorize_chunk(input_file, item[0], len(chunks), item[1], force_refresh)
+
+            if self.chunk_workers == 1:
+                partials = [categorize_chunk(item) for item in enumerate(chunks)]
+            else:
+                with ThreadPoolExecutor(max_workers=self.chunk_workers) as pool:
+                    partials = list(pool.map(categorize_chunk, enumerate(chunks)))
+            return self.merge_categories(input_file, partials, chunk_tokens, force_refresh)
+
         # Check cache first unless force refresh
         if not force_refresh:
             cached = self.load_cached_categories(input_file)
@@ -147,27 +318,36 @@ class WildcardTool:
         with open(input_file, 'r', encoding='utf-8') as f:
             content = f.read()
         
-        # Combine intro and categorize prompts
-        sdxl_prompt = self.load_prompt("sdxl")
-        intro_prompt = self.load_prompt("intro")
-        categorize_prompt = self.load_prompt("categorize")
-        system_prompt = f"{sdxl_prompt}\n\n---\n\n{intro_prompt}\n\n---\n\n{categorize_prompt}"
-        
         user_prompt = f"Wildcard filename: {input_file.name}\n\nWildcard file content:\n\n{content}"
         
-        response = self.call_llm(system_prompt, user_prompt)
+        response = self.call_llm(self.categorize_system_prompt(), user_prompt, use_cache=not force_refresh,
+                                 stage="categorize", input_file=input_file)
+        categories = self.parse_categories(response)
         
-        # Parse the response as YAML/structured data
+        # Cache the results
+        self.save_cached_categories(input_file, categories)
+        
+        return categories
+
+    def categorize_system_prompt(self) -> str:
+        """Combine intro and categorize prompts."""
+        sdxl_prompt = self.load_prompt("sdxl")
+        intro_prompt = self.load_prompt("intro")
+        categorize_prompt = self.load_prompt("categorize")
+        return f"{sdxl_prompt}\n\n---\n\n{intro_prompt}\n\n---\n\n{categorize_prompt}"
+
+    def parse_categories(self, response: str) -> Dict[str, Any]:
+        """Parse a categorization response as YAML/structured data."""
         try:
             # Try to extract YAML from the response
             if "```yaml" in response:
                 yaml_start = response.find("```yaml") + 7
                 yaml_end = response.find("```", yaml_start)
                 yaml_content = response[yaml_start:yaml_end].strip()
-                categories = yaml.safe_load(yaml_content)
+                categories = parse_yaml(yaml_content)
             elif "purpose:" in response:
                 # Direct YAML response
-                categories = yaml.safe_load(response)
+                categories = parse_yaml(response)
             else:
                 # Fallback: treat as structured text
                 categories = {"raw_response": response}
@@ -175,10 +355,126 @@ class WildcardTool:
             if self.verbose:
                 print(f"Warning: Could not parse categorization as YAML: {e}")
             categories = {"raw_response": response}
-        
-        # Cache the results
-        self.save_cached_categories(input_file, categories)
-        
+        return categories
+
+    def categorize_clusters(self, input_file: Path, force_refresh: bool = False,
+                            chunk_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Categorize from local pre-clusters and cache the result.
+
+        Entries are clustered with TF-IDF and k-means (scripts/precluster.py);
+        the model sees only each cluster's size, top terms and exemplars, and
+        assigns clusters to categories. Every entry then inherits its cluster's
+        category locally; the entry -> category ``assignments`` and the
+        per-category ``counts`` are stored with the taxonomy, and analyze and
+        cleanup see the entries grouped by category. The clusters are deterministic, so the prompt is too.
+        Files whose cluster summary isn't smaller than the file itself (short,
+        unrelated entries cluster poorly) are categorized the regular way.
+        """
+        from near_duplicates import load_entries
+        from precluster import cluster_entries, propagate_labels
+
+        texts = [entry.text for entry in load_entries(input_file, input_file.name)]
+        clusters = cluster_entries(texts)
+        groups = [c for c in clusters if c.size > 1 or c.terms]
+        singles = [c for c in clusters if not (c.size > 1 or c.terms)]
+        listing = "\n".join(
+            f"[{c.id}] {c.size} entries; terms: {', '.join(c.terms)}; e.g. {' | '.join(c.exemplars)}"
+            for c in groups
+        )
+        if singles:
+            listing += "\n\nSingle entries:\n" + "\n".join(f"[{c.id}] {c.exemplars[0]}" for c in singles)
+        with open(input_file, 'r', encoding='utf-8') as f:
+            if len(listing) >= len(f.read()):
+                if self.verbose:
+                    print(f"Pre-clustering doesn't shrink {input_file.name}; categorizing the whole file")
+                return self.categorize(input_file, force_refresh, chunk_tokens)
+
+        sdxl_prompt = self.load_prompt("sdxl")
+        intro_prompt = self.load_prompt("intro")
+        clusters_prompt = self.load_prompt("categorize_clusters")
+        system_prompt = f"{sdxl_prompt}\n\n---\n\n{intro_prompt}\n\n---\n\n{clusters_prompt}"
+        user_prompt = (f"Wildcard filename: {input_file.name}\n"
+                       f"{len(texts)} entries in {len(clusters)} clusters:\n\n{listing}")
+        response = self.call_llm(system_prompt, user_prompt, use_cache=not force_refresh,
+                                 stage="categorize_clusters", input_file=input_file)
+        parsed = self.parse_categories(response)
+        if "raw_response" in parsed:
+            return parsed
+
+        # First category to claim a cluster wins; unclaimed clusters stay uncategorized
+        assignments: Dict[int, str] = {}
+        claimed = parsed.get("clusters")
+        if isinstance(claimed, dict):
+            for name, ids in claimed.items():
+                for cluster_id in ids if isinstance(ids, list) else [ids]:
+                    if isinstance(cluster_id, int):
+                        assignments.setdefault(cluster_id, str(name))
+        labels = propagate_labels(clusters, assignments, len(texts))
+
+        categories = compact_taxonomy(parsed)
+        categories["counts"] = dict(Counter(labels).most_common())
+        categories["assignments"] = dict(zip(texts, labels))
+        self.save_cached_categories(input_file, categories, precluster=True)
+        return categories
+
+    def plan_chunks(self, input_file: Path, chunk_tokens: Optional[int]) -> Optional[List[str]]:
+        """Return the chunks to categorize separately, or None if the file fits one call."""
+        if not chunk_tokens:
+            return None
+        with open(input_file, 'r', encoding='utf-8') as f:
+            content = f.read()
+        if estimate_tokens(content) <= chunk_tokens:
+            return None
+        return split_chunks(content, chunk_tokens)
+
+    def categorize_chunk(self, input_file: Path, index: int, total: int, chunk: str,
+                         force_refresh: bool = False) -> Dict[str, Any]:
+        """Map step: categorize one chunk of a large file."""
+        user_prompt = (f"Wildcard filename: {input_file.name} (part {index + 1} of {total})\n\n"
+                       f"Wildcard file content:\n\n{chunk}")
+        response = self.call_llm(self.categorize_system_prompt(), user_prompt, use_cache=not force_refresh,
+                                 stage="categorize_chunk", input_file=input_file)
+        return compact_taxonomy(self.parse_categories(response))
+
+    def merge_categories(self, input_file: Path, partials: List[Dict[str, Any]],
+                         chunk_tokens: Optional[int] = None, force_refresh: bool = False) -> Dict[str, Any]:
+        """Reduce step: merge partial categorizations into one compact taxonomy and cache it.
+
+        If the partials don't fit one merge call they are merged in groups,
+        repeatedly, until one taxonomy remains.
+        """
+        sdxl_prompt = self.load_prompt("sdxl")
+        intro_prompt = self.load_prompt("intro")
+        merge_prompt = self.load_prompt("categorize_merge")
+        system_prompt = f"{sdxl_prompt}\n\n---\n\n{intro_prompt}\n\n---\n\n{merge_prompt}"
+        budget = chunk_tokens or DEFAULT_CHUNK_TOKENS
+
+        while len(partials) > 1:
+            groups: List[List[str]] = [[]]
+            size = 0
+            for partial in partials:
+                text = yaml.dump(partial, default_flow_style=False, allow_unicode=True)
+                # Every group gets at least two partials so each round makes progress
+                if len(groups[-1]) >= 2 and size + estimate_tokens(text) > budget:
+                    groups.append([])
+                    size = 0
+                groups[-1].append(text)
+                size += estimate_tokens(text)
+            if len(groups[-1]) == 1 and len(groups) > 1:
+                groups[-2].extend(groups.pop())
+
+            merged = []
+            for group in groups:
+                parts_text = "\n---\n".join(group)
+                user_prompt = (f"Wildcard filename: {input_file.name}\n\n"
+                               f"Partial categorizations of {len(group)} parts of the file:\n\n{parts_text}")
+                response = self.call_llm(system_prompt, user_prompt, use_cache=not force_refresh,
+                                         stage="categorize_merge", input_file=input_file)
+                merged.append(compact_taxonomy(self.parse_categories(response)))
+            partials = merged
+
+        categories = partials[0] if partials else {}
+        self.save_cached_categories(input_file, categories, chunk_tokens)
         return categories
     
     def analyze(self, input_file: Path, analysis_type: str = "short", categories: Optional[Dict[str, Any]] = None) -> str:
@@ -201,7 +497,7 @@ class WildcardTool:
         system_prompt = f"{sdxl_prompt}\n\n---\n\n{intro_prompt}\n\n---\n\n{analyze_prompt}"
         
         # Prepare user prompt with categories and mode
-        categories_text = yaml.dump(categories, default_flow_style=False) if categories else "No categories available"
+        categories_text = self.categories_prompt(categories)
         user_prompt = f"""Wildcard filename: {input_file.name}
 Mode: {analysis_type}
 
@@ -211,13 +507,104 @@ Categories:
 Wildcard file content:
 {content}"""
         
-        return self.call_llm(system_prompt, user_prompt)
+        return self.call_llm(system_prompt, user_prompt, stage=f"analyze_{analysis_type}", input_file=input_file)
     
-    def cleanup(self, input_file: Path, categories: Optional[Dict[str, Any]] = None, analysis: Optional[str] = None) -> str:
-        """Clean up and reconstruct the wildcard file."""
-        # Load wildcard file content
+    def dedupe(self, input_file: Path, threshold: float = DEFAULT_DEDUPE_THRESHOLD,
+               chunk_tokens: Optional[int] = None, force_refresh: bool = False) -> Dict[str, Any]:
+        """Remove near-duplicate entries, asking the LLM only about candidate clusters.
+
+        Candidates come from a local MinHash/LSH search (scripts/near_duplicates.py),
+        so the model reviews the clusters instead of rereading the whole file.
+        Clusters are sent in batches of about ``chunk_tokens``, the entries the
+        model picks are deleted by line, and every cluster keeps at least one
+        entry. Returns the new content, the clusters and the removed entries.
+        """
+        from near_duplicates import find_clusters, load_entries
+
         with open(input_file, 'r', encoding='utf-8') as f:
             content = f.read()
+
+        # Only entries that can be located in the source can be removed
+        clusters = []
+        for cluster in find_clusters(load_entries(input_file, input_file.name), threshold):
+            members = [(entry, similarity) for entry, similarity in zip(cluster.members, cluster.similarity)
+                       if entry.line is not None]
+            if len(members) > 1:
+                clusters.append(members)
+        if not clusters:
+            return {"content": content, "clusters": 0, "removed": []}
+
+        sdxl_prompt = self.load_prompt("sdxl")
+        intro_prompt = self.load_prompt("intro")
+        dedupe_prompt = self.load_prompt("dedupe")
+        system_prompt = f"{sdxl_prompt}\n\n---\n\n{intro_prompt}\n\n---\n\n{dedupe_prompt}"
+        budget = chunk_tokens or DEFAULT_CHUNK_TOKENS
+
+        # Number every entry and pack the cluster listings into batches of about
+        # `budget` tokens; a cluster too large for one batch is split across several
+        entries: Dict[int, Any] = {}
+        batches: List[List[tuple]] = [[]]
+        size = 0
+        for number, members in enumerate(clusters, 1):
+            for entry, similarity in members:
+                entries[len(entries) + 1] = entry
+                line = f"  [{len(entries)}] ({entry.key}, similarity {similarity:.2f}) {entry.text}"
+                if batches[-1] and size + estimate_tokens(line) > budget:
+                    batches.append([])
+                    size = 0
+                if not batches[-1] or batches[-1][-1][0] != number:
+                    batches[-1].append((number, []))
+                batches[-1][-1][1].append(line)
+                size += estimate_tokens(line)
+
+        doomed = set()
+        for batch in batches:
+            listing = "\n\n".join(f"cluster {number}:\n" + "\n".join(lines) for number, lines in batch)
+            user_prompt = f"Wildcard filename: {input_file.name}\n\nNear-duplicate clusters:\n\n{listing}"
+            response = self.call_llm(system_prompt, user_prompt, use_cache=not force_refresh,
+                                     stage="dedupe", input_file=input_file)
+            doomed.update(entries[i] for i in self.parse_removals(response) if i in entries)
+
+        removed = []
+        for members in clusters:
+            picked = [entry for entry, _ in members if entry in doomed]
+            if len(picked) == len(members):
+                picked = picked[1:]  # keep the cluster's first entry
+            removed.extend(picked)
+        removed_lines = {entry.line for entry in removed}
+
+        kept = [line for number, line in enumerate(content.splitlines(keepends=True), 1)
+                if number not in removed_lines]
+        return {"content": "".join(kept), "clusters": len(clusters), "removed": removed}
+
+    def parse_removals(self, response: str) -> List[int]:
+        """Parse the ``remove: [ids]`` list from a dedupe response; anything unparsable removes nothing."""
+        text = response
+        if "```" in text:
+            start = text.find("\n", text.find("```")) + 1
+            text = text[start:text.find("```", start)]
+        try:
+            data = parse_yaml(text)
+        except Exception as e:
+            if self.verbose:
+                print(f"Warning: Could not parse dedupe response as YAML: {e}")
+            return []
+        ids = data.get("remove") if isinstance(data, dict) else None
+        if not isinstance(ids, list):
+            return []
+        return [i for i in ids if isinstance(i, int)]
+
+    def cleanup(self, input_file: Path, categories: Optional[Dict[str, Any]] = None, analysis: Optional[str] = None,
+                content: Optional[str] = None, removed: Iterable[str] = ()) -> str:
+        """Clean up and reconstruct the wildcard file (or ``content``, e.g. after --dedupe).
+
+        ``removed`` lists entries already dropped from ``content``; they are
+        left out of the per-entry category listing.
+        """
+        # Load wildcard file content
+        if content is None:
+            with open(input_file, 'r', encoding='utf-8') as f:
+                content = f.read()
         
         # Get categories and analysis if not provided
         if categories is None:
@@ -236,7 +623,7 @@ Wildcard file content:
         system_prompt = f"{sdxl_prompt}\n\n---\n\n{intro_prompt}\n\n---\n\n{cleanup_prompt}"
         
         # Prepare user prompt with all context
-        categories_text = yaml.dump(categories, default_flow_style=False) if categories else "No categories available"
+        categories_text = self.categories_prompt(categories, removed)
         user_prompt = f"""Wildcard filename: {input_file.name}
 
 Categories:
@@ -248,7 +635,7 @@ Analysis Results:
 Original Wildcard Content:
 {content}"""
         
-        return self.call_llm(system_prompt, user_prompt)
+        return self.call_llm(system_prompt, user_prompt, stage="cleanup", input_file=input_file)
     
     def output_format(self, cleaned_content: str, output_type: str = "text", categories: Optional[Dict[str, Any]] = None, input_file: Optional[Path] = None) -> str:
         """Format the output according to the specified type."""
@@ -262,7 +649,7 @@ Original Wildcard Content:
             output_prompt = self.load_prompt("output")
             system_prompt = f"{sdxl_prompt}\n\n---\n\n{intro_prompt}\n\n---\n\n{output_prompt}"
             
-            categories_text = yaml.dump(categories, default_flow_style=False) if categories else "No categories available"
+            categories_text = self.categories_prompt(categories, entries=False)
             filename_text = f"Wildcard filename: {input_file.name}" if input_file else "Wildcard filename: unknown"
             user_prompt = f"""{filename_text}
 Output format: yaml
@@ -273,10 +660,146 @@ Categories:
 Cleaned content to format:
 {cleaned_content}"""
             
-            return self.call_llm(system_prompt, user_prompt)
+            return self.call_llm(system_prompt, user_prompt, stage="format", input_file=input_file)
         else:
             raise ValueError(f"Unknown output type: {output_type}")
 
+def resolve_inputs(inputs: List[str]) -> List[Path]:
+    """Expand input files, directories (recursively) and glob patterns into wildcard files."""
+    files: List[Path] = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_file():
+            files.append(path)
+        elif path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*")
+                                if p.is_file() and p.suffix.lower() in WILDCARD_SUFFIXES))
+        elif glob.has_magic(item):
+            files.extend(sorted(Path(p) for p in glob.glob(item, recursive=True) if Path(p).is_file()))
+        else:
+            raise FileNotFoundError(f"Input '{item}' not found")
+    return list(dict.fromkeys(files))
+
+
+def format_report(args, results: Dict[str, Any]) -> str:
+    """Assemble the output for one file from its stage results."""
+    output_content = ""
+    if args.categorize:
+        output_content += "=== CATEGORIZATION RESULTS ===\n"
+        # Per-entry assignments stay in the cache; the counts summarize them
+        categories = results["categorize"]
+        if isinstance(categories, dict):
+            categories = {key: value for key, value in categories.items() if key != "assignments"}
+        output_content += yaml.dump(categories, default_flow_style=False)
+        output_content += "\n"
+    if args.analyze:
+        output_content += f"=== ANALYSIS ({args.analyze.upper()}) ===\n"
+        output_content += results["analyze"] + "\n\n"
+    if args.dedupe:
+        deduped = results["dedupe"]
+        output_content += "=== NEAR-DUPLICATES ===\n"
+        output_content += (f"{deduped['clusters']} clusters reviewed, "
+                           f"{len(deduped['removed'])} entries removed\n")
+        for entry in deduped["removed"]:
+            output_content += f"- L{entry.line}: {entry.text}\n"
+        output_content += "\n"
+        if not args.cleanup:
+            output_content += "=== DEDUPLICATED OUTPUT ===\n"
+            output_content += deduped["content"]
+    if args.cleanup:
+        output_content += "=== CLEANED OUTPUT ===\n"
+        output_content += results["format"]
+    return output_content
+
+
+def schedule_file(scheduler: StageScheduler, tool: WildcardTool, input_path: Path, args, deliver) -> tuple:
+    """Add one file's stage DAG to the scheduler and return the key of its final stage.
+
+    Files too large for one call are categorized chunk by chunk, each chunk a
+    stage of its own, followed by a merge stage (with --precluster the model
+    only sees cluster exemplars, so no file needs chunks). categorize feeds the
+    requested analysis and the long analysis used by cleanup; those two run
+    concurrently, as does --dedupe, which needs no categories. cleanup waits
+    for the categories, the long analysis and the deduplicated content if
+    any, output formatting waits for cleanup, and the report stage hands the
+    assembled output to ``deliver`` once everything the file needs is done.
+    """
+    def key(stage: str) -> tuple:
+        return (str(input_path), stage)
+
+    parts = {}
+    if args.dedupe:
+        parts["dedupe"] = scheduler.add(
+            key("dedupe"),
+            lambda: tool.dedupe(input_path, args.dedupe_threshold, args.chunk_tokens, args.force_refresh),
+        )
+
+    if args.categorize or args.analyze or args.cleanup:
+        chunks = None if args.precluster else tool.plan_chunks(input_path, args.chunk_tokens)
+        if chunks is not None and (args.force_refresh or not tool.load_cached_categories(input_path, args.chunk_tokens)):
+            # Map-reduce: categorize every chunk as its own stage, then merge
+            chunk_keys = [
+                scheduler.add(key(f"categorize_chunk_{i + 1}"),
+                              lambda i=i, chunk=chunk: tool.categorize_chunk(input_path, i, len(chunks), chunk,
+                                                                             args.force_refresh))
+                for i, chunk in enumerate(chunks)
+            ]
+            categorize = scheduler.add(
+                key("categorize"),
+                lambda *partials: tool.merge_categories(input_path, list(partials), args.chunk_tokens,
+                                                        args.force_refresh),
+                chunk_keys,
+            )
+        else:
+            categorize = scheduler.add(
+                key("categorize"),
+                lambda: tool.categorize(input_path, args.force_refresh, args.chunk_tokens, args.precluster),
+            )
+        parts["categorize"] = categorize
+
+        if args.analyze:
+            parts["analyze"] = scheduler.add(
+                key(f"analyze_{args.analyze}"),
+                lambda categories: tool.analyze(input_path, args.analyze, categories),
+                [categorize],
+            )
+
+        if args.cleanup:
+            long_analysis = key("analyze_long")
+            if args.analyze != "long":
+                scheduler.add(long_analysis, lambda categories: tool.analyze(input_path, "long", categories),
+                              [categorize])
+            cleanup_deps = [categorize, long_analysis] + ([parts["dedupe"]] if args.dedupe else [])
+            cleaned = scheduler.add(
+                key("cleanup"),
+                lambda categories, analysis, deduped=None: tool.cleanup(
+                    input_path, categories, analysis, deduped["content"] if deduped else None,
+                    [entry.text for entry in deduped["removed"]] if deduped else ()),
+                cleanup_deps,
+            )
+            parts["format"] = scheduler.add(
+                key("format"),
+                lambda categories, content: tool.output_format(content, args.output, categories, input_path),
+                [categorize, cleaned],
+            )
+
+    names = list(parts)
+    return scheduler.add(
+        key("report"),
+        lambda *results: deliver(input_path, format_report(args, dict(zip(names, results)))),
+        list(parts.values()),
+    )
+
+
+def batch_output_path(save_dir: Path, input_path: Path, base: Path) -> Path:
+    """Mirror the input's path below ``base`` inside ``save_dir``."""
+    try:
+        relative = input_path.resolve().relative_to(base)
+    except ValueError:
+        relative = Path(input_path.name)
+    return save_dir / relative.with_suffix(".wct.txt")
+
+
 def main():
     """Main CLI entry point."""
     parser = argparse.ArgumentParser(
@@ -290,16 +813,26 @@ Examples:
   wct.py poses.txt --cleanup --output yaml
   wct.py poses.txt --categorize --analyze short --cleanup --save-to cleaned_poses.yaml
   wct.py poses.txt --cleanup --force-refresh --reasoning-effort high
+  wct.py poses.txt --dedupe --save-to poses_deduped.txt
+  wct.py wildcards/std/xl/outfit.yaml --analyze short --precluster
+  wct.py wildcards/std/outfit/ --cleanup --save-dir cleaned/ --concurrency 8
+  wct.py 'wildcards/std/*.txt' --analyze short --save-dir reports/
         """
     )
     
-    parser.add_argument("input", help="Input wildcard file to process")
+    parser.add_argument("inputs", nargs="+", metavar="input",
+                        help="Wildcard files, directories or glob patterns to process")
     parser.add_argument("--analyze", choices=["short", "long"], 
                         help="Analyze the wildcard file (short=frequency table, long=detailed report)")
     parser.add_argument("--categorize", action="store_true",
                         help="Perform categorization step and display results")
     parser.add_argument("--cleanup", action="store_true", 
                         help="Clean up and reconstruct the wildcard file")
+    parser.add_argument("--dedupe", action="store_true",
+                        help="Find near-duplicate entries locally and have the model review only those")
+    parser.add_argument("--dedupe-threshold", type=float, default=DEFAULT_DEDUPE_THRESHOLD,
+                        help="Minimum similarity of --dedupe candidates, 0-1 "
+                             f"(default: {DEFAULT_DEDUPE_THRESHOLD})")
     parser.add_argument("--output", choices=["text", "yaml"], default="text",
                         help="Output format (text=plain lines, yaml=structured format)")
     parser.add_argument("--reasoning-effort", choices=["low", "medium", "high"], default="medium",
@@ -309,64 +842,116 @@ Examples:
     parser.add_argument("--force-refresh", action="store_true",
                         help="Force refresh of cached categorization results")
     parser.add_argument("--save-to", help="Save output to specified file instead of printing")
+    parser.add_argument("--save-dir",
+                        help="Batch mode: write each file's output to <dir>/<path>.wct.txt as it completes")
+    parser.add_argument("--chunk-tokens", type=int, default=DEFAULT_CHUNK_TOKENS,
+                        help="Categorize files estimated above this many tokens in chunks and merge "
+                             f"the results; 0 disables chunking (default: {DEFAULT_CHUNK_TOKENS})")
+    parser.add_argument("--precluster", action="store_true",
+                        help="Cluster entries locally and have the model categorize only cluster exemplars")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Maximum LLM calls in flight across all files (default: 4)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Disable the shared LLM response cache (.llm_cache)")
+    parser.add_argument("--trace", type=Path,
+                        help="LLM call trace file (default: .wc_cache/llm_traces.jsonl)")
+    parser.add_argument("--no-trace", action="store_true", help="Don't record LLM call traces")
     
     args = parser.parse_args()
     
-    # Validate input file
-    input_path = Path(args.input)
-    if not input_path.exists():
-        print(f"Error: Input file '{input_path}' not found", file=sys.stderr)
+    # Validate inputs
+    try:
+        input_paths = resolve_inputs(args.inputs)
+    except FileNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not input_paths:
+        print(f"Error: No wildcard files found in {', '.join(args.inputs)}", file=sys.stderr)
         sys.exit(1)
     
     # At least one action must be specified
-    if not any([args.analyze, args.categorize, args.cleanup]):
-        print("Error: Must specify at least one action (--analyze, --categorize, or --cleanup)", file=sys.stderr)
+    if not any([args.analyze, args.categorize, args.cleanup, args.dedupe]):
+        print("Error: Must specify at least one action (--analyze, --categorize, --cleanup, or --dedupe)",
+              file=sys.stderr)
+        sys.exit(1)
+
+    batch = bool(args.save_dir) or len(args.inputs) > 1 or not Path(args.inputs[0]).is_file()
+    if batch and args.save_to:
+        print("Error: --save-to takes a single input file; use --save-dir for several", file=sys.stderr)
         sys.exit(1)
     
-    # Initialize the tool
-    tool = WildcardTool(reasoning_effort=args.reasoning_effort, verbose=args.verbose)
+    # Initialize the tool. Every call runs inside a scheduler stage, so chunks
+    # categorized from within a stage (--precluster falling back to the whole
+    # file) go one at a time and --concurrency stays the real limit.
+    tool = WildcardTool(reasoning_effort=args.reasoning_effort, verbose=args.verbose,
+                        response_cache=ResponseCache(enabled=not args.no_cache),
+                        telemetry=Telemetry("wct", args.trace, enabled=not args.no_trace),
+                        chunk_workers=1)
+
+    save_dir = Path(args.save_dir) if args.save_dir else None
+    base = Path(os.path.commonpath([p.resolve().parent for p in input_paths]))
+    reports: Dict[Path, str] = {}
+    completed = 0
+
+    def deliver(input_path: Path, output_content: str) -> Optional[Path]:
+        """Write (batch) or keep (single file) a finished file's output."""
+        if not batch:
+            reports[input_path] = output_content
+            return None
+        if save_dir is None:
+            print(f"##### {input_path} #####\n{output_content}\n", flush=True)
+            return None
+        out_path = batch_output_path(save_dir, input_path, base)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(out_path, 'w', encoding='utf-8') as f:
+            f.write(output_content)
+        return out_path
+
+    def on_complete(key, result, error):
+        nonlocal completed
+        path, stage = key
+        if args.verbose and stage != "report":
+            print(f"{path}: {stage} {'failed' if error else 'done'}", file=sys.stderr)
+        if stage == "report" and batch:
+            completed += 1
+            if error is not None:
+                cause = error.root_cause if isinstance(error, DependencyFailed) else error
+                print(f"[{completed}/{len(input_paths)}] FAILED {path}: {cause}", file=sys.stderr)
+            elif result is not None:
+                print(f"[{completed}/{len(input_paths)}] {path} -> {result}", flush=True)
+
+    scheduler = StageScheduler(max_workers=args.concurrency, on_complete=on_complete)
+    report_keys = {path: schedule_file(scheduler, tool, path, args, deliver) for path in input_paths}
     
     try:
-        output_content = ""
-        categories = None
-        
-        # Execute requested operations in logical order
-        if args.categorize or args.analyze or args.cleanup:
-            if args.verbose:
-                print("Performing categorization...")
-            categories = tool.categorize(input_path, args.force_refresh)
-            
-            if args.categorize:
-                output_content += "=== CATEGORIZATION RESULTS ===\n"
-                output_content += yaml.dump(categories, default_flow_style=False)
-                output_content += "\n"
-        
-        if args.analyze:
-            if args.verbose:
-                print(f"Performing {args.analyze} analysis...")
-            analysis = tool.analyze(input_path, args.analyze, categories)
-            output_content += f"=== ANALYSIS ({args.analyze.upper()}) ===\n"
-            output_content += analysis + "\n\n"
-        
-        if args.cleanup:
-            if args.verbose:
-                print("Performing cleanup...")
-            # Get detailed analysis for cleanup if not already done
-            analysis = tool.analyze(input_path, "long", categories) if not args.analyze else None
-            cleaned = tool.cleanup(input_path, categories, analysis)
-            
-            # Format the output
-            formatted_output = tool.output_format(cleaned, args.output, categories, input_path)
-            output_content += "=== CLEANED OUTPUT ===\n"
-            output_content += formatted_output
-        
-        # Output results
-        if args.save_to:
-            with open(args.save_to, 'w', encoding='utf-8') as f:
-                f.write(output_content)
-            print(f"Results saved to {args.save_to}")
+        results = scheduler.run()
+        failures = {path: results[key] for path, key in report_keys.items()
+                    if isinstance(results[key], BaseException)}
+
+        if batch:
+            print(f"Processed {len(input_paths)} files: {len(input_paths) - len(failures)} ok, "
+                  f"{len(failures)} failed")
         else:
-            print(output_content)
+            input_path = input_paths[0]
+            if failures:
+                error = failures[input_path]
+                raise error.root_cause if isinstance(error, DependencyFailed) else error
+
+            # Output results
+            output_content = reports[input_path]
+            if args.save_to:
+                with open(args.save_to, 'w', encoding='utf-8') as f:
+                    f.write(output_content)
+                print(f"Results saved to {args.save_to}")
+            else:
+                print(output_content)
+
+        if args.verbose:
+            print(tool.response_cache.stats.summary())
+            if not args.no_trace:
+                print(f"LLM call traces: {tool.telemetry.path} (run {tool.telemetry.run})")
+        if failures:
+            sys.exit(1)
             
     except KeyboardInterrupt:
         print("\nCancelled by user")